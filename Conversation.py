@@ -1,61 +1,137 @@
-import streamlit as st
-from agent import ConversationContext
-from agent_mock import MockConversationContext
+import os
+import sys
+import time
 
-# System message otimizado para simular um comprador realista
-SYSTEM_MESSAGE = """
-Você é um COMPRADOR POTENCIAL interessado em avaliar produtos ou serviços. Seu papel é participar de uma simulação de venda realística sendo SEMPRE O CLIENTE que está considerando uma compra.
+import streamlit as st
+import metrics
+from prompts import SYSTEM_MESSAGE
 
-## IMPORTANTE - SEU PAPEL:
-- VOCÊ É O CLIENTE/COMPRADOR, NUNCA O VENDEDOR
-- O usuário que está conversando com você é o VENDEDOR
-- Você está interessado em possivelmente comprar algo, mas precisa ser convencido
-- NUNCA ofereça produtos ou serviços - você está do lado de quem compra
+# Perfil opcional da execução inteira da página (PROFILING=1 ou ?profile=1 na URL);
+# profiling só é importado quando o perfil foi pedido
+if os.environ.get("PROFILING") or st.query_params.get("profile"):
+    import profiling
+    if profiling.enabled(st.query_params):
+        profiling.show_summary(profiling.run_script(__file__, globals()))
+        st.stop()
 
-## SEU PERFIL E COMPORTAMENTO:
-- Você é um comprador criterioso, mas aberto a ofertas convincentes
-- Tem necessidades e dúvidas genuínas sobre o produto/serviço
-- Seu orçamento é limitado, mas está disposto a investir se ver valor
-- Faz perguntas relevantes sobre características, benefícios, preço e condições
-- Apresenta objeções realistas quando apropriado (preço, concorrência, necessidade, urgência)
-- Responde de forma natural e conversacional, como um cliente real
-- Sua decisão de compra depende de quão bem o vendedor atende suas necessidades
-- Só fornece feedback quando solicitado explicitamente (digitando "FEEDBACK")
+# Início desta execução do script, para medir o tempo de renderização
+inicio_execucao = time.perf_counter()
 
-## DURANTE A CONVERSA:
-1. Comece demonstrando interesse inicial, mas com reservas
-2. Faça perguntas sobre características, benefícios e diferenciais
-3. Apresente 2-3 objeções ao longo da conversa (escolha entre: preço alto, falta de urgência, comparação com concorrentes, dúvidas sobre ROI)
-4. Avalie como o vendedor lida com suas objeções
-5. Observe se o vendedor: escuta ativamente, identifica suas necessidades, apresenta soluções, cria rapport, usa técnicas de vendas
-6. Mantenha o tom realista - nem muito fácil nem impossível de convencer
+# Nomes dos tempos de cada turno na barra lateral
+ROTULOS_TEMPOS = {
+    metrics.API: "API",
+    metrics.STREAM: "Streaming",
+    metrics.STORAGE: "Armazenamento",
+    metrics.SERIALIZATION: "↳ Serialização",
+    metrics.DISK_WRITE: "↳ Escrita em disco",
+    metrics.DISK_READ: "Leitura do disco",
+    metrics.RENDER: "Renderização",
+}
 
-## LEMBRE-SE: VOCÊ É SEMPRE O CLIENTE QUE QUER COMPRAR, NUNCA O VENDEDOR QUE ESTÁ VENDENDO
 
-## QUANDO O VENDEDOR PEDIR FEEDBACK:
-Forneça uma análise estruturada em português com as seguintes seções:
+@st.cache_resource(show_spinner=False)
+def preparar_modo(use_mock):
+    """
+    Prepara uma única vez por processo os recursos do modo escolhido
+    
+    Os imports ficam aqui para que a página abra sem carregar openai, que só
+    entra no modo real; o armazenamento e o cliente OpenAI são criados na
+    primeira sessão e reaproveitados pelas seguintes
+    
+    Args:
+        use_mock: True para o modo teste, False para o modo real
+        
+    Returns:
+        type: Classe de conversa do modo
+    """
+    from storage import get_storage
+    get_storage('dados.csv')
+    if use_mock:
+        from agent_mock import MockConversationContext
+        return MockConversationContext
+    
+    from agent import ConversationContext
+    from openai_client import get_openai_client
+    get_openai_client()
+    return ConversationContext
 
-**PONTOS FORTES:**
-- Liste 3-4 aspectos positivos específicos do processo de venda
 
-**PONTOS DE MELHORIA:**
-- Identifique 2-3 áreas que podem ser aprimoradas
+def enviar_ao_comprador(mensagem, exibicao, tipo):
+    """
+    Enfileira a mensagem para o comprador e retorna sem esperar a API; a
+    resposta é acompanhada por acompanhar_resposta
+    
+    Args:
+        mensagem: Texto enviado ao comprador
+        exibicao: Texto mostrado no chat como mensagem do vendedor
+        tipo: "mensagem" ou "feedback"
+    """
+    from job_queue import get_job_queue
+    st.session_state.chat_history.append({
+        "role": "user",
+        "content": exibicao
+    })
+    job_id = get_job_queue().submit(st.session_state.conversation.send_message_stream, mensagem)
+    st.session_state.pending_job = {"id": job_id, "tipo": tipo}
 
-**AVALIAÇÃO POR CRITÉRIO (nota de 0 a 10):**
-- Rapport e conexão inicial
-- Identificação de necessidades (perguntas de descoberta)
-- Apresentação de benefícios (não apenas características)
-- Tratamento de objeções
-- Fechamento e call-to-action
-- Comunicação geral
 
-**NOTA GERAL:** X/10
+def mostrar_tempos(painel, turno):
+    """
+    Mostra no painel da barra lateral onde foi o tempo do último turno concluído
+    
+    Args:
+        painel: Espaço (st.empty) da seção de informações
+        turno: metrics.Turn do último envio, ou None
+    """
+    if turno is None or turno.total_ms is None:
+        return
+    with painel.container():
+        st.text(f"⏱️ Último turno: {turno.total_ms:.0f} ms")
+        for nome, rotulo in ROTULOS_TEMPOS.items():
+            if nome in turno.spans:
+                st.text(f"  {rotulo}: {turno.spans[nome]:.0f} ms")
 
-**RECOMENDAÇÕES ESPECÍFICAS:**
-- Dê 2-3 sugestões práticas e acionáveis
 
-Seja construtivo, específico e baseie seu feedback em exemplos concretos da conversa.
-"""
+@st.fragment(run_every=0.5)
+def acompanhar_resposta():
+    """
+    Mostra a resposta do comprador enquanto um worker a recebe, sem bloquear
+    a página; ao terminar, anexa a resposta ao histórico e atualiza a página
+    """
+    from job_queue import FAILED, get_job_queue
+    pendente = st.session_state.pending_job
+    fila = get_job_queue()
+    job = fila.get(pendente["id"])
+    if job is not None and not job.finished:
+        with st.chat_message("assistant", avatar="🤖"):
+            st.markdown(f"**Comprador:** {job.text}▌" if job.text else "**Comprador:** _digitando..._")
+        return
+    
+    st.session_state.pending_job = None
+    if job is not None:
+        fila.discard(job.id)
+    if job is None or job.status == FAILED:
+        # A mensagem não foi respondida: sai do histórico para ser reenviada
+        st.session_state.chat_history.pop()
+        erro = job.error if job is not None else None
+        # openai só está carregado no modo real
+        openai = sys.modules.get("openai")
+        if erro is not None and (openai is None or not isinstance(erro, openai.OpenAIError)):
+            raise erro
+        st.session_state.erro_api = (
+            f"⚠️ A API da OpenAI não respondeu ({type(erro).__name__ if erro else 'resposta expirada'}). "
+            "Aguarde alguns instantes e envie novamente."
+        )
+    else:
+        st.session_state.chat_history.append({
+            "role": "assistant",
+            "content": job.text
+        })
+        if pendente["tipo"] == "feedback":
+            st.session_state.feedback_received = True
+        # A próxima execução do script mostra a resposta: seu tempo entra no turno
+        st.session_state.turno_renderizar = st.session_state.conversation.last_turn
+    st.rerun()
 
 # Configuração da página
 st.set_page_config(
@@ -73,6 +149,14 @@ if "initialized" not in st.session_state:
     st.session_state.use_mock = True
     st.session_state.conversation_id = None
     st.session_state.feedback_received = False
+    # Resposta do comprador sendo recebida por um worker ({"id", "tipo"})
+    st.session_state.pending_job = None
+    st.session_state.erro_api = None
+    # Turno cuja resposta será mostrada na próxima execução do script
+    st.session_state.turno_renderizar = None
+
+# Espaço da barra lateral preenchido ao final da execução com os tempos do turno
+painel_tempos = None
 
 # Sidebar - Configurações
 with st.sidebar:
@@ -103,6 +187,9 @@ with st.sidebar:
         st.session_state.chat_history = []
         st.session_state.conversation_id = None
         st.session_state.feedback_received = False
+        st.session_state.pending_job = None
+        st.session_state.erro_api = None
+        st.session_state.turno_renderizar = None
         st.session_state.clear_input = True
         # Garantir que qualquer resíduo de conversa anterior seja limpo
         if 'user_input_field' in st.session_state:
@@ -120,56 +207,41 @@ with st.sidebar:
         if not st.session_state.use_mock and hasattr(st.session_state.conversation, 'total_tokens_used'):
             st.text(f"Tokens: {st.session_state.conversation.total_tokens_used}")
             st.text(f"Custo: ${st.session_state.conversation.total_cost:.4f}")
+            st.text(f"Cache de prompt: {st.session_state.conversation.get_cache_hit_rate():.0%}")
+            if st.session_state.conversation.history_policy.name != "full":
+                st.text(f"Histórico: {st.session_state.conversation.history_policy.name}")
+                st.text(f"Tokens economizados (último turno): {st.session_state.conversation.last_prompt_tokens_saved}")
+                st.text(f"Tokens economizados (total): {st.session_state.conversation.total_prompt_tokens_saved}")
+        
+        painel_tempos = st.empty()
 
 # Inicializar conversa
 if not st.session_state.initialized:
-    # Garantir que para nova conversa, conversation_id seja None
-    if st.session_state.conversation_id is None:
-        # Nova conversa - garantir contexto limpo
-        if st.session_state.use_mock:
-            st.session_state.conversation = MockConversationContext(
-                model="gpt-4o-mini",
-                system_message=SYSTEM_MESSAGE,
-                conversation_id=None
-            )
-        else:
-            st.session_state.conversation = ConversationContext(
-                model="gpt-4o-mini",
-                system_message=SYSTEM_MESSAGE,
-                conversation_id=None
-            )
-    else:
-        # Carregando conversa existente
-        if st.session_state.use_mock:
-            st.session_state.conversation = MockConversationContext(
-                model="gpt-4o-mini",
-                system_message=SYSTEM_MESSAGE,
-                conversation_id=st.session_state.conversation_id
-            )
-        else:
-            st.session_state.conversation = ConversationContext(
-                model="gpt-4o-mini",
-                system_message=SYSTEM_MESSAGE,
-                conversation_id=st.session_state.conversation_id
-            )
+    # Nova conversa (conversation_id None, contexto limpo) ou conversa existente
+    classe_conversa = preparar_modo(st.session_state.use_mock)
+    st.session_state.conversation = classe_conversa(
+        model="gpt-4o-mini",
+        system_message=SYSTEM_MESSAGE,
+        conversation_id=st.session_state.conversation_id
+    )
+    
+    # Carregar histórico de chat se conversa anterior foi carregada
+    if st.session_state.conversation_id:
+        # Extrair mensagens do histórico (excluindo system message)
+        loaded_count = 0
+        for msg in st.session_state.conversation.messages:
+            if msg["role"] == "system":
+                continue
+            st.session_state.chat_history.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+            loaded_count += 1
         
-        # Carregar histórico de chat se conversa anterior foi carregada
-        if st.session_state.conversation_id:
-            # Extrair mensagens do histórico (excluindo system message)
-            loaded_count = 0
-            for msg in st.session_state.conversation.messages:
-                if msg["role"] == "system":
-                    continue
-                st.session_state.chat_history.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-                loaded_count += 1
-            
-            # Verificar se realmente carregou mensagens
-            if loaded_count == 0:
-                st.warning(f"⚠️ Nenhuma conversa encontrada para o ID: {st.session_state.conversation_id}")
-                st.session_state.conversation_id = None
+        # Verificar se realmente carregou mensagens
+        if loaded_count == 0:
+            st.warning(f"⚠️ Nenhuma conversa encontrada para o ID: {st.session_state.conversation_id}")
+            st.session_state.conversation_id = None
     
     st.session_state.initialized = True
 
@@ -196,6 +268,12 @@ with chat_container:
         else:
             with st.chat_message("assistant", avatar="🤖"):
                 st.markdown(f"**Comprador:** {msg['content']}")
+    if st.session_state.pending_job:
+        acompanhar_resposta()
+
+if st.session_state.erro_api:
+    st.error(st.session_state.erro_api)
+    st.session_state.erro_api = None
 
 # Input área
 st.markdown("---")
@@ -220,29 +298,18 @@ if not st.session_state.feedback_received:
             label_visibility="collapsed"
         )
     
+    # Enquanto o comprador responde, novos envios esperam
+    aguardando = st.session_state.pending_job is not None
+    
     with col2:
-        send_button = st.button("📤 Enviar", use_container_width=True)
+        send_button = st.button("📤 Enviar", use_container_width=True, disabled=aguardando)
     
     with col3:
-        feedback_button = st.button("📊 Solicitar Feedback", use_container_width=True)
+        feedback_button = st.button("📊 Solicitar Feedback", use_container_width=True, disabled=aguardando)
     
     # Processar envio de mensagem
     if send_button and user_input.strip():
-        with st.spinner("Aguardando resposta..."):
-            # Adicionar mensagem do usuário ao histórico
-            st.session_state.chat_history.append({
-                "role": "user",
-                "content": user_input
-            })
-            
-            # Obter resposta do comprador
-            response = st.session_state.conversation.send_message(user_input)
-            
-            # Adicionar resposta ao histórico
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": response
-            })
+        enviar_ao_comprador(user_input, user_input, "mensagem")
         
         # Marcar para limpar o campo de input no próximo rerun
         st.session_state.clear_input = True
@@ -250,23 +317,11 @@ if not st.session_state.feedback_received:
     
     # Processar solicitação de feedback
     if feedback_button:
-        with st.spinner("Solicitando feedback detalhado..."):
-            feedback = st.session_state.conversation.send_message(
-                "Por favor, forneça agora o feedback detalhado sobre o meu processo de venda."
-            )
-            
-            st.session_state.chat_history.append({
-                "role": "user",
-                "content": "FEEDBACK"
-            })
-            
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": feedback
-            })
-            
-            st.session_state.feedback_received = True
-        
+        enviar_ao_comprador(
+            "Por favor, forneça agora o feedback detalhado sobre o meu processo de venda.",
+            "FEEDBACK",
+            "feedback"
+        )
         st.rerun()
 
 else:
@@ -280,3 +335,19 @@ st.markdown(
     "</div>",
     unsafe_allow_html=True
 )
+
+# Tempo desta execução do script; quando ela mostrou uma resposta nova, entra
+# como renderização no turno correspondente
+tempo_execucao = (time.perf_counter() - inicio_execucao) * 1000
+turno_renderizado = st.session_state.turno_renderizar
+st.session_state.turno_renderizar = None
+if turno_renderizado is not None:
+    turno_renderizado.add(metrics.RENDER, tempo_execucao)
+metrics.log_render(
+    tempo_execucao,
+    conversation_id=getattr(st.session_state.conversation, "conversation_id", None),
+    turn_id=turno_renderizado.id if turno_renderizado is not None else None,
+    page="Conversation"
+)
+if painel_tempos is not None:
+    mostrar_tempos(painel_tempos, getattr(st.session_state.conversation, "last_turn", None))
@@ -1,18 +1,40 @@
-from openai import OpenAI
-import os
+from openai.types import CompletionUsage
 from dotenv import load_dotenv
 
-from csv_reader import GerenciadorCSV
+import metrics
+from history_policy import estimate_messages_tokens, extractive_summary, policy_from_env
+from openai_client import get_openai_client
+from rate_limiter import ESTIMATED_COMPLETION_TOKENS, call_with_retry, get_rate_limiter
+from response_cache import get_response_cache
+from storage import get_storage
 from datetime import datetime
+import hashlib
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
+# Preços por 1M tokens (input/input em cache/output) em USD
+PRICING = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-3.5-turbo": {"input": 0.50, "cached_input": 0.50, "output": 1.50},
+    "gpt-4": {"input": 30.00, "cached_input": 30.00, "output": 60.00},
+}
+
+# Campos de uso e custo somados ao turno salvo quando houve chamadas fora dos turnos
+UNSAVED_USAGE_FIELDS = ("total_tokens", "input_cost_usd", "output_cost_usd", "cached_tokens", "uncached_tokens")
+
+
+def prompt_cache_key(system_message):
+    """Chave de cache de prompt das requisições que começam com a mesma mensagem de sistema"""
+    return "sale-simulator-" + hashlib.sha256(system_message.encode("utf-8")).hexdigest()[:16]
+
 
 class ConversationContext:
     """Classe responsável por guardar e gerenciar o contexto de uma conversa com OpenAI"""
     
-    def __init__(self, model="gpt-4o-mini", system_message=None, conversation_id=None):
+    def __init__(self, model="gpt-4o-mini", system_message=None, conversation_id=None, history_policy=None,
+                 response_cache=None):
         """
         Inicializa uma nova conversa
         
@@ -20,22 +42,36 @@ class ConversationContext:
             model: Modelo do OpenAI a ser usado
             conversation_id: ID da conversa para manter contexto
             system_message: Mensagem do sistema para definir comportamento do assistente
+            history_policy: Política que escolhe o histórico enviado à API
+                (padrão: HISTORY_POLICY do .env, ou histórico completo)
+            response_cache: Cache de respostas para históricos idênticos
+                (padrão: ativado por RESPONSE_CACHE no .env)
         """
-        self.client = OpenAI(api_key=os.environ.get('OPEN'))
+        self.client = self._create_client()
         self.model = model
         self.messages = []
         self.total_tokens_used = 0
         self.total_cost = 0.0
+        # Tokens de entrada e quantos deles vieram do cache de prompt da OpenAI
+        self.total_prompt_tokens = 0
+        self.total_cached_tokens = 0
+        self.history_policy = history_policy or policy_from_env(summarize=self._summarize_history)
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        # Tokens de prompt (estimados) que a política deixou de reenviar
+        self.last_prompt_tokens_saved = 0
+        self.total_prompt_tokens_saved = 0
+        # Uso de chamadas que não são turnos (resumos do histórico), salvo junto do próximo turno
+        self.unsaved_usage = dict.fromkeys(UNSAVED_USAGE_FIELDS, 0)
         self.conversation_id = conversation_id if conversation_id else datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Tempos do último turno (API, streaming, armazenamento), ver metrics.py
+        self.last_turn = None
         
-        # Preços por 1M tokens (input/output) em USD
-        self.pricing = {
-            "gpt-4o-mini": {"input": 0.15, "output": 0.60},
-            "gpt-4o": {"input": 2.50, "output": 10.00},
-            "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
-            "gpt-4": {"input": 30.00, "output": 60.00},
-        }
-        self.context = GerenciadorCSV('data/dados.csv')
+        self.pricing = PRICING
+        # O cache de prompt reaproveita prefixos idênticos: a mensagem de sistema
+        # vem sempre primeiro e sem alterações, e a chave agrupa as requisições
+        # com o mesmo prefixo no mesmo servidor de cache
+        self.prompt_cache_key = prompt_cache_key(system_message) if system_message else None
+        self.context = get_storage('data/dados.csv')
         
         # Adicionar system message primeiro
         if system_message:
@@ -45,6 +81,10 @@ class ConversationContext:
         if conversation_id:
             self._load_conversation(conversation_id)
     
+    def _create_client(self):
+        """Retorna o cliente da API OpenAI, compartilhado por todas as conversas"""
+        return get_openai_client()
+    
     def add_user_message(self, content):
         """Adiciona uma mensagem do usuário ao contexto"""
         self.messages.append({"role": "user", "content": content})
@@ -53,20 +93,146 @@ class ConversationContext:
         """Adiciona uma mensagem do assistente ao contexto"""
         self.messages.append({"role": "assistant", "content": content})
     
-    def _calculate_token_usage_and_cost(self, response):
+    def _messages_for_request(self):
+        """
+        Aplica a política de histórico ao contexto e registra quantos tokens de
+        prompt (estimados) deixaram de ser enviados
+        
+        Returns:
+            list: Mensagens a enviar à API
+        """
+        selected = self.history_policy.select(self.messages)
+        saved = estimate_messages_tokens(self.messages) - estimate_messages_tokens(selected)
+        self.last_prompt_tokens_saved = max(saved, 0)
+        self.total_prompt_tokens_saved += self.last_prompt_tokens_saved
+        return selected
+    
+    def _summarize_history(self, previous_summary, messages):
+        """
+        Resume turnos antigos com o próprio modelo (usado pela política summary)
+        
+        Args:
+            previous_summary: Resumo acumulado até aqui
+            messages: Mensagens a incorporar ao resumo
+            
+        Returns:
+            str: Novo resumo
+        """
+        transcricao = extractive_summary("", messages, max_chars=2000, max_lines=len(messages))
+        try:
+            response = self._create_completion(
+                client=get_openai_client(),
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "Resuma a simulação de venda em português, em até 10 linhas, "
+                                                  "mantendo necessidades, objeções e propostas já apresentadas."},
+                    {"role": "user", "content": f"Resumo anterior:\n{previous_summary or '(nenhum)'}\n\n"
+                                                f"Novos turnos:\n{transcricao}"},
+                ]
+            )
+        except Exception as e:
+            print(f"\n⚠️ Erro ao resumir o histórico, usando resumo simples: {e}")
+            return extractive_summary(previous_summary, messages)
+        
+        # O custo do resumo entra nos totais da conversa e é gravado com o próximo turno
+        usage_info = self._calculate_token_usage_and_cost(response.usage)
+        for field in UNSAVED_USAGE_FIELDS:
+            self.unsaved_usage[field] += usage_info[field]
+        return response.choices[0].message.content
+    
+    def _estimate_request_tokens(self, options):
+        """Tokens (estimados) que a requisição consome da cota por minuto do modelo"""
+        return estimate_messages_tokens(options["messages"]) + ESTIMATED_COMPLETION_TOKENS
+    
+    def _create_completion(self, client=None, **options):
+        """
+        Chama a API respeitando o limite de requisições e tokens por minuto do
+        modelo, compartilhado por todas as conversas do processo, e repete a
+        chamada com espera crescente em caso de 429 ou falha temporária
+        
+        Args:
+            client: Cliente da API (padrão: o cliente da conversa)
+            **options: Parâmetros de chat.completions.create
+            
+        Returns:
+            Resposta da API (ou o stream, quando stream=True)
+        """
+        client = client or self.client
+        with metrics.span(metrics.API):
+            return call_with_retry(
+                lambda: client.chat.completions.with_raw_response.create(**options),
+                get_rate_limiter(options["model"]),
+                self._estimate_request_tokens(options),
+            )
+    
+    def _discard_user_message(self, user_message):
+        """Remove a mensagem do usuário que ficou sem resposta após uma falha da API"""
+        if self.messages and self.messages[-1] == {"role": "user", "content": user_message}:
+            self.messages.pop()
+    
+    def _request_options(self):
+        """Parâmetros comuns às requisições de chat da conversa"""
+        options = {"model": self.model, "messages": self._messages_for_request()}
+        if self.prompt_cache_key:
+            options["prompt_cache_key"] = self.prompt_cache_key
+        return options
+    
+    def _lookup_cached_response(self, options):
+        """
+        Procura no cache uma resposta para a mesma requisição (modelo + mensagens)
+        
+        Returns:
+            tuple: (chave no cache, resposta em cache ou None)
+        """
+        if self.response_cache is None:
+            return None, None
+        key = self.response_cache.key(options["model"], options["messages"])
+        cached = self.response_cache.get(key)
+        return key, cached["content"] if cached else None
+    
+    def _store_cached_response(self, key, assistant_message):
+        """Guarda a resposta obtida da API no cache de respostas"""
+        if key is not None and assistant_message:
+            self.response_cache.put(key, {"content": assistant_message, "model": self.model})
+    
+    def _cached_usage_info(self):
+        """Uso e custo de um turno respondido pelo cache (sem chamada à API)"""
+        usage_info = self._calculate_token_usage_and_cost(
+            CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        )
+        usage_info["cached_response"] = True
+        return usage_info
+    
+    @staticmethod
+    def _as_count(value):
+        """Converte um valor salvo (possivelmente vazio/NaN) em contagem de tokens"""
+        if value is None or value != value:
+            return 0
+        return int(value)
+    
+    def get_cache_hit_rate(self):
+        """Retorna a fração dos tokens de entrada servidos pelo cache de prompt"""
+        if not self.total_prompt_tokens:
+            return 0.0
+        return self.total_cached_tokens / self.total_prompt_tokens
+    
+    def _calculate_token_usage_and_cost(self, usage):
         """
         Calcula o uso de tokens e o custo da chamada à API
         
         Args:
-            response: Objeto de resposta da API OpenAI
+            usage: Objeto `usage` da resposta da API OpenAI (ou do último
+                chunk de uma resposta em streaming)
             
         Returns:
             dict: Dicionário com informações de uso e custo
         """
-        usage = response.usage
         prompt_tokens = usage.prompt_tokens
         completion_tokens = usage.completion_tokens
         total_tokens = usage.total_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        uncached_tokens = prompt_tokens - cached_tokens
         
         # Calcula o custo baseado no modelo
         model_key = self.model
@@ -74,25 +240,34 @@ class ConversationContext:
             # Usa preço padrão do gpt-4o-mini se modelo não encontrado
             model_key = "gpt-4o-mini"
         
-        input_cost = (prompt_tokens / 1_000_000) * self.pricing[model_key]["input"]
+        input_cost = (uncached_tokens / 1_000_000) * self.pricing[model_key]["input"] + \
+            (cached_tokens / 1_000_000) * self.pricing[model_key]["cached_input"]
         output_cost = (completion_tokens / 1_000_000) * self.pricing[model_key]["output"]
         total_cost = input_cost + output_cost
         
         # Atualiza totais acumulados
         self.total_tokens_used += total_tokens
         self.total_cost += total_cost
+        self.total_prompt_tokens += prompt_tokens
+        self.total_cached_tokens += cached_tokens
         
         return {
             "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "uncached_tokens": uncached_tokens,
             "completion_tokens": completion_tokens,
             "total_tokens": total_tokens,
             "input_cost_usd": input_cost,
             "output_cost_usd": output_cost,
             "total_cost_usd": total_cost,
+            "prompt_tokens_saved": self.last_prompt_tokens_saved,
             "cumulative_tokens": self.total_tokens_used,
-            "cumulative_cost_usd": self.total_cost
+            "cumulative_cost_usd": self.total_cost,
+            "cache_hit_rate": self.get_cache_hit_rate(),
+            "cached_response": False
         }
     
+    @metrics.instrument_turn("real")
     def send_message(self, user_message):
         """
         Envia uma mensagem e recebe resposta, mantendo o contexto
@@ -105,27 +280,114 @@ class ConversationContext:
         """
         self.add_user_message(user_message)
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=self.messages
-        )
+        options = self._request_options()
+        cache_key, assistant_message = self._lookup_cached_response(options)
+        if assistant_message is not None:
+            # Mesmo histórico já respondido: sem chamada à API e sem custo
+            self.add_assistant_message(assistant_message)
+            self._save_turn(user_message, assistant_message, self._cached_usage_info())
+            return assistant_message
+        
+        try:
+            response = self._create_completion(**options)
+        except Exception:
+            self._discard_user_message(user_message)
+            raise
         
         assistant_message = response.choices[0].message.content
         self.add_assistant_message(assistant_message)
+        self._store_cached_response(cache_key, assistant_message)
         
         # Calcula uso de tokens e custo
-        usage_info = self._calculate_token_usage_and_cost(response)
+        usage_info = self._calculate_token_usage_and_cost(response.usage)
+        self._save_turn(user_message, assistant_message, usage_info)
+
+        return assistant_message
+    
+    @metrics.instrument_turn("real")
+    def send_message_stream(self, user_message):
+        """
+        Envia uma mensagem e devolve a resposta em trechos, à medida que é gerada
+        
+        Ao final do streaming a resposta completa entra no contexto e o turno é
+        salvo com tokens e custo, como em send_message.
+        
+        Args:
+            user_message: Mensagem do usuário
+            
+        Yields:
+            str: Trechos da resposta do assistente
+        """
+        self.add_user_message(user_message)
+        
+        options = self._request_options()
+        cache_key, assistant_message = self._lookup_cached_response(options)
+        if assistant_message is not None:
+            # Mesmo histórico já respondido: a resposta sai inteira, sem custo
+            yield assistant_message
+            self.add_assistant_message(assistant_message)
+            self._save_turn(user_message, assistant_message, self._cached_usage_info())
+            return
+        
+        parts = []
+        usage = None
+        try:
+            with self._create_completion(
+                **options,
+                stream=True,
+                stream_options={"include_usage": True}
+            ) as stream, metrics.span(metrics.STREAM):
+                for chunk in stream:
+                    # O último chunk não tem choices e traz o uso de tokens da chamada
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+        except Exception:
+            self._discard_user_message(user_message)
+            raise
+        
+        assistant_message = "".join(parts)
+        self.add_assistant_message(assistant_message)
+        self._store_cached_response(cache_key, assistant_message)
+        
+        if usage is None:
+            print("\n⚠️ A API não informou o uso de tokens; turno salvo sem custo")
+            usage = CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        usage_info = self._calculate_token_usage_and_cost(usage)
+        self._save_turn(user_message, assistant_message, usage_info)
+    
+    def _save_turn(self, user_message, assistant_message, usage_info):
+        """
+        Salva um turno (mensagem, resposta, tokens e custo) no armazenamento
+        
+        Os tokens e o custo dos resumos feitos desde o último turno salvo
+        entram nos do turno, para que a conversa carregada do armazenamento
+        tenha o mesmo custo total
+        
+        Args:
+            user_message: Mensagem do usuário
+            assistant_message: Resposta do assistente
+            usage_info: Dicionário retornado por _calculate_token_usage_and_cost
+        """
+        usage = {field: usage_info[field] + self.unsaved_usage[field] for field in UNSAVED_USAGE_FIELDS}
         information_message = {}
         information_message['conversation_id'] = self.conversation_id
         information_message['data'] = datetime.now().isoformat()
-        information_message['total_tokens'] = usage_info['total_tokens']
-        information_message['input_cost_usd'] = usage_info['input_cost_usd']
+        information_message['total_tokens'] = usage['total_tokens']
+        information_message['input_cost_usd'] = usage['input_cost_usd']
         information_message['message'] = user_message
         information_message['response'] = assistant_message
-        information_message['output_cost_usd'] = usage_info['output_cost_usd']
-        self.context.save_data(information_message)
-
-        return assistant_message
+        information_message['output_cost_usd'] = usage['output_cost_usd']
+        information_message['prompt_tokens_saved'] = usage_info['prompt_tokens_saved']
+        information_message['cached_tokens'] = usage['cached_tokens']
+        information_message['uncached_tokens'] = usage['uncached_tokens']
+        information_message['cached_response'] = usage_info['cached_response']
+        with metrics.span(metrics.STORAGE):
+            saved = self.context.save_data(information_message)
+        if saved:
+            self.unsaved_usage = dict.fromkeys(UNSAVED_USAGE_FIELDS, 0)
     
     def get_messages(self):
         """Retorna todas as mensagens da conversa"""
@@ -143,6 +405,7 @@ class ConversationContext:
             self.messages = [system_msg]
         else:
             self.messages = []
+        self.history_policy.reset()
     
     def get_context_size(self):
         """Retorna o número de mensagens no contexto"""
@@ -158,6 +421,10 @@ class ConversationContext:
         return {
             "total_tokens": self.total_tokens_used,
             "total_cost_usd": self.total_cost,
+            "prompt_tokens_saved": self.total_prompt_tokens_saved,
+            "cache_hit_rate": self.get_cache_hit_rate(),
+            "history_policy": self.history_policy.name,
+            "rate_limit": get_rate_limiter(self.model).stats(),
             "model": self.model
         }
     
@@ -196,6 +463,9 @@ class ConversationContext:
             # Atualizar totais
             self.total_tokens_used += tokens
             self.total_cost += (input_cost + output_cost)
+            cached = self._as_count(msg_data.get('cached_tokens'))
+            self.total_cached_tokens += cached
+            self.total_prompt_tokens += cached + self._as_count(msg_data.get('uncached_tokens'))
             
             # Exibir mensagem carregada
             print(f"\n[{msg_data.get('data', 'N/A')}]")
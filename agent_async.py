@@ -0,0 +1,134 @@
+"""
+Versão assíncrona da classe ConversationContext, baseada em AsyncOpenAI
+
+Um único event loop pode conduzir centenas de conversas simultâneas (simulação
+em lote, testes de carga) sem ocupar uma thread por chamada à API.
+"""
+import asyncio
+
+from openai.types import CompletionUsage
+
+from agent import ConversationContext
+from openai_client import get_async_openai_client
+from rate_limiter import call_with_retry_async, get_rate_limiter
+
+
+class AsyncConversationContext(ConversationContext):
+    """
+    Conversa com a API OpenAI usando asyncio. Mantém o contexto, o cálculo de
+    custo e a persistência de ConversationContext; as chamadas à API são
+    aguardadas no event loop e a gravação no armazenamento roda em uma thread
+    separada, sem bloquear o loop.
+    
+    Ao criar muitas conversas de uma vez, informe conversation_id: o ID
+    padrão usa a data e hora com resolução de segundos.
+    """
+    
+    def _create_client(self):
+        """Retorna o cliente assíncrono da API OpenAI, compartilhado pelas conversas do event loop"""
+        return get_async_openai_client()
+    
+    async def _create_completion_async(self, **options):
+        """
+        Chama a API respeitando o limite por minuto do modelo, aguardando a
+        cota e as novas tentativas no event loop
+        
+        Args:
+            **options: Parâmetros de chat.completions.create
+            
+        Returns:
+            Resposta da API (ou o stream, quando stream=True)
+        """
+        return await call_with_retry_async(
+            lambda: self.client.chat.completions.with_raw_response.create(**options),
+            get_rate_limiter(options["model"]),
+            self._estimate_request_tokens(options),
+        )
+    
+    async def send_message(self, user_message):
+        """
+        Envia uma mensagem e aguarda a resposta, mantendo o contexto
+        
+        Args:
+            user_message: Mensagem do usuário
+            
+        Returns:
+            str: Resposta do assistente
+        """
+        self.add_user_message(user_message)
+        
+        # A política de histórico pode chamar a API para resumir turnos antigos
+        options = await asyncio.to_thread(self._request_options)
+        cache_key, assistant_message = await asyncio.to_thread(self._lookup_cached_response, options)
+        if assistant_message is not None:
+            # Mesmo histórico já respondido: sem chamada à API e sem custo
+            self.add_assistant_message(assistant_message)
+            await asyncio.to_thread(self._save_turn, user_message, assistant_message, self._cached_usage_info())
+            return assistant_message
+        
+        try:
+            response = await self._create_completion_async(**options)
+        except Exception:
+            self._discard_user_message(user_message)
+            raise
+        
+        assistant_message = response.choices[0].message.content
+        self.add_assistant_message(assistant_message)
+        await asyncio.to_thread(self._store_cached_response, cache_key, assistant_message)
+        
+        # Calcula uso de tokens e custo
+        usage_info = self._calculate_token_usage_and_cost(response.usage)
+        await asyncio.to_thread(self._save_turn, user_message, assistant_message, usage_info)
+        
+        return assistant_message
+    
+    async def send_message_stream(self, user_message):
+        """
+        Envia uma mensagem e devolve a resposta em trechos, à medida que é gerada
+        
+        Args:
+            user_message: Mensagem do usuário
+            
+        Yields:
+            str: Trechos da resposta do assistente
+        """
+        self.add_user_message(user_message)
+        
+        options = await asyncio.to_thread(self._request_options)
+        cache_key, assistant_message = await asyncio.to_thread(self._lookup_cached_response, options)
+        if assistant_message is not None:
+            # Mesmo histórico já respondido: a resposta sai inteira, sem custo
+            yield assistant_message
+            self.add_assistant_message(assistant_message)
+            await asyncio.to_thread(self._save_turn, user_message, assistant_message, self._cached_usage_info())
+            return
+        
+        parts = []
+        usage = None
+        try:
+            stream = await self._create_completion_async(
+                **options,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async with stream:
+                async for chunk in stream:
+                    # O último chunk não tem choices e traz o uso de tokens da chamada
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+        except Exception:
+            self._discard_user_message(user_message)
+            raise
+        
+        assistant_message = "".join(parts)
+        self.add_assistant_message(assistant_message)
+        await asyncio.to_thread(self._store_cached_response, cache_key, assistant_message)
+        
+        if usage is None:
+            print("\n⚠️ A API não informou o uso de tokens; turno salvo sem custo")
+            usage = CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        usage_info = self._calculate_token_usage_and_cost(usage)
+        await asyncio.to_thread(self._save_turn, user_message, assistant_message, usage_info)
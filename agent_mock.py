@@ -2,8 +2,10 @@
 Versão mock da classe ConversationContext para testes sem créditos da OpenAI
 """
 import random
+import re
 import os
-from csv_reader import GerenciadorCSV
+import metrics
+from storage import get_storage
 
 
 class MockConversationContext:
@@ -15,7 +17,9 @@ class MockConversationContext:
         self.messages = []
         self.interaction_count = 0
         self.conversation_id = conversation_id
-        self.context = GerenciadorCSV('dados.csv')  # Será criado em data/dados.csv
+        # Tempos do último turno, ver metrics.py
+        self.last_turn = None
+        self.context = get_storage('dados.csv')  # Será criado em data/dados.csv (ou data/dados.db)
         
         # Adicionar system message primeiro
         if system_message:
@@ -145,13 +149,25 @@ class MockConversationContext:
 **Prática faz o mestre! Continue treinando e aplicando essas técnicas.** 🎯"""
         return feedback
     
+    @metrics.instrument_turn("mock")
     def send_message(self, user_message):
         """Simula envio de mensagem e resposta"""
         self.add_user_message(user_message)
-        assistant_message = self._generate_mock_response(user_message)
+        with metrics.span(metrics.API):
+            assistant_message = self._generate_mock_response(user_message)
         self.add_assistant_message(assistant_message)
         return assistant_message
     
+    @metrics.instrument_turn("mock")
+    def send_message_stream(self, user_message):
+        """Simula o envio com streaming, devolvendo a resposta palavra a palavra"""
+        self.add_user_message(user_message)
+        with metrics.span(metrics.API):
+            assistant_message = self._generate_mock_response(user_message)
+        for word in re.findall(r'\S+\s*', assistant_message):
+            yield word
+        self.add_assistant_message(assistant_message)
+    
     def get_messages(self):
         """Retorna todas as mensagens da conversa"""
         return self.messages.copy()
@@ -0,0 +1,364 @@
+"""
+Simulação em lote: gera respostas do comprador para roteiros de vendedor sem
+sessões interativas
+
+Cada roteiro é uma lista de mensagens do vendedor. As conversas avançam em
+rodadas: a rodada N reúne o N-ésimo turno de todos os roteiros em um único
+lote de requisições no formato da Batch API (JSONL com custom_id, method, url
+e body), com a mesma mensagem de sistema e o mesmo layout de mensagens de
+ConversationContext. As respostas de uma rodada entram no histórico da
+seguinte e são gravadas no armazenamento de uma só vez, com custo calculado
+pelo preço da Batch API (50% do preço interativo).
+
+O envio fica a cargo de um executor plugável, com o método
+run(requisições) -> resultados no formato de saída da Batch API:
+
+- LocalBatchExecutor: responde localmente, sem API (testes e ensaios)
+- OpenAIBatchExecutor: envia o lote à Batch API da OpenAI e aguarda o resultado
+
+Formato dos roteiros (JSONL, um por linha):
+    {"conversation_id": "lote_001", "messages": ["Olá, tudo bem?", "Nosso plano custa R$ 99"]}
+
+Ou texto, com uma mensagem por linha e roteiros separados por linha em branco.
+
+Uso:
+    python batch_simulation.py roteiros.jsonl
+    python batch_simulation.py roteiros.jsonl --executor openai --modelo gpt-4o-mini
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from agent import PRICING, prompt_cache_key
+from csv_reader import resolve_data_path
+from history_policy import estimate_messages_tokens, estimate_tokens, policy_from_env
+from openai_client import get_openai_client
+from prompts import SYSTEM_MESSAGE
+from storage import get_storage
+
+# A Batch API cobra metade do preço interativo
+BATCH_DISCOUNT = 0.5
+ENDPOINT = "/v1/chat/completions"
+# Estados em que um lote da Batch API não muda mais
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def load_scripts(path):
+    """
+    Lê os roteiros de vendedor de um arquivo JSONL ou de texto
+
+    Args:
+        path: Caminho do arquivo de roteiros
+
+    Returns:
+        list: Dicionários com conversation_id e messages
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        content = file.read()
+
+    prefix = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if path.endswith(".jsonl"):
+        scripts = [json.loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        blocks = [block for block in content.split("\n\n") if block.strip()]
+        scripts = [{"messages": [line.strip() for line in block.splitlines() if line.strip()]} for block in blocks]
+
+    for number, script in enumerate(scripts, 1):
+        script.setdefault("conversation_id", f"{prefix}_lote_{number:04d}")
+    return scripts
+
+
+def batch_cost(model, usage):
+    """
+    Calcula tokens e custo de uma resposta pelo preço da Batch API
+
+    Args:
+        model: Modelo usado
+        usage: Dicionário `usage` do corpo da resposta
+
+    Returns:
+        dict: Tokens (em cache e fora dele) e custos de entrada e saída em USD
+    """
+    prices = PRICING.get(model, PRICING["gpt-4o-mini"])
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    uncached_tokens = prompt_tokens - cached_tokens
+
+    input_cost = (uncached_tokens / 1_000_000) * prices["input"] + \
+        (cached_tokens / 1_000_000) * prices["cached_input"]
+    output_cost = (completion_tokens / 1_000_000) * prices["output"]
+    return {
+        "total_tokens": usage.get("total_tokens", prompt_tokens + completion_tokens),
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": uncached_tokens,
+        "input_cost_usd": input_cost * BATCH_DISCOUNT,
+        "output_cost_usd": output_cost * BATCH_DISCOUNT,
+    }
+
+
+class LocalBatchExecutor:
+    """Executor local: responde cada requisição sem chamar a API"""
+
+    def __init__(self, responder=None):
+        """
+        Args:
+            responder: Função (mensagens) -> resposta do comprador; por padrão
+                uma resposta fixa
+        """
+        self.responder = responder or (
+            lambda messages: "Entendi. Pode me explicar melhor como isso resolveria o meu problema?"
+        )
+
+    def run(self, requests):
+        """Retorna os resultados das requisições no formato de saída da Batch API"""
+        results = []
+        for request in requests:
+            body = request["body"]
+            content = self.responder(body["messages"])
+            prompt_tokens = estimate_messages_tokens(body["messages"])
+            completion_tokens = estimate_tokens(content)
+            results.append({
+                "id": f"batch_req_{request['custom_id']}",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "object": "chat.completion",
+                        "model": body["model"],
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens,
+                        },
+                    },
+                },
+                "error": None,
+            })
+        return results
+
+
+class OpenAIBatchExecutor:
+    """Executor da Batch API da OpenAI: envia o arquivo de requisições e aguarda o lote"""
+
+    def __init__(self, client=None, poll_interval=30.0, completion_window="24h"):
+        """
+        Args:
+            client: Cliente OpenAI (padrão: cliente compartilhado)
+            poll_interval: Segundos entre consultas ao estado do lote
+            completion_window: Prazo de conclusão do lote
+        """
+        self.client = client or get_openai_client()
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+
+    def _download(self, file_id):
+        """Baixa um arquivo JSONL de resultados da Batch API"""
+        if not file_id:
+            return []
+        content = self.client.files.content(file_id).text
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    def run(self, requests):
+        """Retorna os resultados das requisições no formato de saída da Batch API"""
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8", delete=False) as file:
+            for request in requests:
+                file.write(json.dumps(request, ensure_ascii=False) + "\n")
+        try:
+            with open(file.name, "rb") as input_file:
+                uploaded = self.client.files.create(file=input_file, purpose="batch")
+        finally:
+            os.remove(file.name)
+
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        print(f"Lote {batch.id} enviado com {len(requests)} requisições")
+        while batch.status not in FINAL_STATUSES:
+            time.sleep(self.poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        print(f"Lote {batch.id} finalizado: {batch.status}")
+
+        return self._download(batch.output_file_id) + self._download(batch.error_file_id)
+
+
+class BatchSimulation:
+    """Conduz os roteiros em rodadas de lotes e grava os turnos no armazenamento"""
+
+    def __init__(self, scripts, model="gpt-4o-mini", system_message=SYSTEM_MESSAGE, executor=None,
+                 storage=None, output_dir=None):
+        """
+        Args:
+            scripts: Roteiros (dicionários com conversation_id e messages)
+            model: Modelo do OpenAI a ser usado
+            system_message: Mensagem de sistema de todas as conversas
+            executor: Executor dos lotes (padrão: LocalBatchExecutor)
+            storage: Armazenamento dos turnos (padrão: get_storage('dados.csv'))
+            output_dir: Pasta onde guardar os arquivos de requisições e
+                resultados de cada rodada (None para não guardar)
+        """
+        self.scripts = scripts
+        self.model = model
+        self.system_message = system_message
+        self.executor = executor or LocalBatchExecutor()
+        self.storage = storage or get_storage('dados.csv')
+        self.output_dir = output_dir
+        self.cache_key = prompt_cache_key(system_message) if system_message else None
+
+        # Histórico e política de histórico de cada conversa, como em ConversationContext
+        system = [{"role": "system", "content": system_message}] if system_message else []
+        self.conversations = {
+            script["conversation_id"]: {"messages": list(system), "policy": policy_from_env()}
+            for script in scripts
+        }
+
+    def _build_request(self, conversation_id, turn, user_message):
+        """
+        Adiciona a mensagem do vendedor ao histórico e monta a requisição do turno
+
+        Returns:
+            tuple: (requisição no formato da Batch API, tokens de prompt economizados)
+        """
+        conversation = self.conversations[conversation_id]
+        conversation["messages"].append({"role": "user", "content": user_message})
+        selected = conversation["policy"].select(conversation["messages"])
+        saved = estimate_messages_tokens(conversation["messages"]) - estimate_messages_tokens(selected)
+
+        body = {"model": self.model, "messages": selected}
+        if self.cache_key:
+            body["prompt_cache_key"] = self.cache_key
+        request = {"custom_id": f"{conversation_id}:{turn}", "method": "POST", "url": ENDPOINT, "body": body}
+        return request, max(saved, 0)
+
+    def _write_round(self, turn, name, lines):
+        """Guarda as requisições ou resultados de uma rodada em JSONL"""
+        if not self.output_dir:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"rodada_{turn:03d}_{name}.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for line in lines:
+                file.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def run(self):
+        """
+        Executa todas as rodadas
+
+        Returns:
+            dict: Conversas, turnos gravados, falhas, tokens, custo do lote,
+                custo interativo equivalente e duração
+        """
+        start = time.perf_counter()
+        summary = {"conversations": len(self.scripts), "turns": 0, "failures": 0,
+                   "total_tokens": 0, "cost_usd": 0.0}
+        active = {script["conversation_id"]: script["messages"] for script in self.scripts}
+        turn = 0
+
+        while active:
+            pending = {}
+            requests = []
+            for conversation_id, messages in active.items():
+                if turn < len(messages):
+                    request, saved = self._build_request(conversation_id, turn, messages[turn])
+                    pending[request["custom_id"]] = (conversation_id, messages[turn], saved)
+                    requests.append(request)
+            if not requests:
+                break
+
+            self._write_round(turn, "requisicoes", requests)
+            results = self.executor.run(requests)
+            self._write_round(turn, "resultados", results)
+
+            records = []
+            for result in results:
+                request = pending.pop(result.get("custom_id"), None)
+                if request is None:
+                    # Resultado de outra rodada ou repetido (arquivo reaproveitado): ignorado
+                    print(f"⚠️ Resultado inesperado ignorado: {result.get('custom_id')}")
+                    continue
+                conversation_id, user_message, saved = request
+                response = result.get("response") or {}
+                if result.get("error") or response.get("status_code") != 200:
+                    # Sem a resposta deste turno a conversa não pode continuar
+                    print(f"⚠️ Falha em {result['custom_id']}: {result.get('error') or response.get('body')}")
+                    summary["failures"] += 1
+                    del active[conversation_id]
+                    continue
+
+                body = response["body"]
+                assistant_message = body["choices"][0]["message"]["content"]
+                self.conversations[conversation_id]["messages"].append(
+                    {"role": "assistant", "content": assistant_message}
+                )
+                cost = batch_cost(self.model, body.get("usage") or {})
+                records.append({
+                    "conversation_id": conversation_id,
+                    "data": datetime.now().isoformat(),
+                    "total_tokens": cost["total_tokens"],
+                    "input_cost_usd": cost["input_cost_usd"],
+                    "message": user_message,
+                    "response": assistant_message,
+                    "output_cost_usd": cost["output_cost_usd"],
+                    "prompt_tokens_saved": saved,
+                    "cached_tokens": cost["cached_tokens"],
+                    "uncached_tokens": cost["uncached_tokens"],
+                    "cached_response": False,
+                })
+                summary["total_tokens"] += cost["total_tokens"]
+                summary["cost_usd"] += cost["input_cost_usd"] + cost["output_cost_usd"]
+
+            # Requisições sem resultado (ex.: lote expirado) encerram suas conversas
+            for conversation_id, _, _ in pending.values():
+                summary["failures"] += 1
+                active.pop(conversation_id, None)
+
+            if records and not self.storage.save_multiple_data(records):
+                print(f"⚠️ Erro ao gravar os turnos da rodada {turn}")
+            summary["turns"] += len(records)
+            turn += 1
+
+        summary["interactive_cost_usd"] = summary["cost_usd"] / BATCH_DISCOUNT
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+
+EXECUTORS = {
+    "local": LocalBatchExecutor,
+    "openai": OpenAIBatchExecutor,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('roteiros', help="arquivo .jsonl ou .txt com os roteiros do vendedor")
+    parser.add_argument('--executor', choices=EXECUTORS, default='local')
+    parser.add_argument('--modelo', default='gpt-4o-mini')
+    parser.add_argument('--saida', default=resolve_data_path('batch'),
+                        help="pasta dos arquivos de requisições e resultados de cada rodada")
+    args = parser.parse_args()
+
+    simulation = BatchSimulation(
+        load_scripts(args.roteiros),
+        model=args.modelo,
+        executor=EXECUTORS[args.executor](),
+        output_dir=args.saida,
+    )
+    summary = simulation.run()
+    print(f"Conversas: {summary['conversations']} | Turnos gravados: {summary['turns']} | "
+          f"Falhas: {summary['failures']} | Tokens: {summary['total_tokens']}")
+    print(f"Custo do lote: ${summary['cost_usd']:.6f} "
+          f"(interativo: ${summary['interactive_cost_usd']:.6f}) | Tempo: {summary['seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark de inicialização da interface
+
+Mede, cada um em um processo Python novo:
+
+- o tempo de import dos módulos usados pela página (prompts, storage,
+  agent_mock e agent) e quais bibliotecas pesadas cada um carrega
+- a primeira renderização de Conversation.py (AppTest do Streamlit) no modo
+  teste e no modo real, e as renderizações de sessões seguintes no mesmo
+  processo, que reaproveitam os recursos em st.cache_resource
+
+O import do próprio Streamlit fica de fora: é custo do servidor, pago uma vez.
+A página usa o armazenamento padrão em data/, como ao rodar o app. Nenhuma
+chamada é feita à API: o modo real só cria o cliente.
+
+Para detectar regressões, termina com código 1 se o modo teste carregar
+openai ou se a primeira renderização passar de --limite-ms.
+
+Uso:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --sessoes 5 --limite-ms 1500
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MODULOS = ['prompts', 'storage', 'agent_mock', 'agent']
+BIBLIOTECAS = ['openai', 'pandas', 'httpx']
+PAGINA = os.path.join(RAIZ, 'Conversation.py')
+
+
+def bibliotecas_carregadas():
+    """Retorna as bibliotecas pesadas já importadas no processo"""
+    return [nome for nome in BIBLIOTECAS if nome in sys.modules]
+
+
+def medir_import(modulo):
+    """Importa um módulo e retorna o tempo em ms e as bibliotecas carregadas"""
+    inicio = time.perf_counter()
+    importlib.import_module(modulo)
+    return {'ms': (time.perf_counter() - inicio) * 1000, 'bibliotecas': bibliotecas_carregadas()}
+
+
+def medir_renderizacao(modo, sessoes):
+    """Renderiza a página `sessoes` vezes no modo indicado e retorna os tempos em ms"""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.setdefault('OPEN', 'sk-bench')
+    tempos = []
+    for _ in range(sessoes):
+        pagina = AppTest.from_file(PAGINA, default_timeout=60)
+        if modo == 'real':
+            pagina.session_state['initialized'] = False
+            pagina.session_state['conversation'] = None
+            pagina.session_state['chat_history'] = []
+            pagina.session_state['use_mock'] = False
+            pagina.session_state['conversation_id'] = None
+            pagina.session_state['feedback_received'] = False
+            pagina.session_state['pending_job'] = None
+            pagina.session_state['erro_api'] = None
+            pagina.session_state['turno_renderizar'] = None
+        inicio = time.perf_counter()
+        pagina.run()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        if pagina.exception:
+            raise RuntimeError(pagina.exception[0].message)
+    return {'ms': tempos, 'bibliotecas': bibliotecas_carregadas()}
+
+
+def executar(*argumentos):
+    """Executa uma medição em um processo novo e retorna o resultado"""
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *argumentos],
+        check=True, capture_output=True, text=True, cwd=RAIZ,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessoes', type=int, default=3, help="renderizações por processo")
+    parser.add_argument('--limite-ms', type=float, default=None,
+                        help="tempo máximo da primeira renderização no modo teste")
+    parser.add_argument('--importar', help=argparse.SUPPRESS)
+    parser.add_argument('--renderizar', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.importar:
+        print(json.dumps(medir_import(args.importar)))
+        return
+    if args.renderizar:
+        print(json.dumps(medir_renderizacao(args.renderizar, args.sessoes)))
+        return
+
+    print(f"{'Import':<12} | {'Tempo (ms)':>10} | Bibliotecas carregadas")
+    print("-" * 60)
+    for modulo in MODULOS:
+        resultado = executar('--importar', modulo)
+        print(f"{modulo:<12} | {resultado['ms']:>10.1f} | {', '.join(resultado['bibliotecas']) or '-'}")
+
+    print()
+    print(f"{'Página':<12} | {'1ª sessão (ms)':>14} | {'Seguintes (ms)':>14} | Bibliotecas carregadas")
+    print("-" * 80)
+    falhas = []
+    for modo in ['teste', 'real']:
+        resultado = executar('--renderizar', modo, '--sessoes', str(args.sessoes))
+        primeira, seguintes = resultado['ms'][0], resultado['ms'][1:]
+        media = sum(seguintes) / len(seguintes) if seguintes else 0.0
+        print(f"{modo:<12} | {primeira:>14.1f} | {media:>14.1f} | {', '.join(resultado['bibliotecas']) or '-'}")
+
+        if modo == 'teste':
+            if 'openai' in resultado['bibliotecas']:
+                falhas.append("o modo teste carregou openai")
+            if args.limite_ms is not None and primeira > args.limite_ms:
+                falhas.append(f"primeira renderização do modo teste levou {primeira:.0f} ms (limite {args.limite_ms:.0f} ms)")
+
+    for falha in falhas:
+        print(f"Regressão: {falha}")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark das políticas de histórico
+
+Simula conversas longas e mede, para cada política, os tokens de prompt
+(estimados) enviados por turno, o total da conversa e o custo de entrada no
+gpt-4o-mini. O resumo usa extractive_summary, sem chamadas à API.
+
+Uso:
+    python benchmarks/bench_history_policy.py
+    python benchmarks/bench_history_policy.py --turnos 20 50 100 --janela 8 --orcamento 3000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_policy import (  # noqa: E402
+    HistoryPolicy, RollingSummaryPolicy, SlidingWindowPolicy, TokenBudgetPolicy, estimate_messages_tokens,
+)
+from benchmarks.datasets import gerar_registros  # noqa: E402
+
+# Mensagem de sistema com tamanho próximo à do simulador (~3.000 caracteres)
+MENSAGEM_SISTEMA = "Você é um COMPRADOR POTENCIAL em uma simulação de venda. " * 52
+
+PRECO_INPUT_POR_1M = 0.15
+
+
+def simular(politica, registros):
+    """Retorna (tokens de prompt enviados por turno, tokens que o histórico completo enviaria por turno)"""
+    mensagens = [{"role": "system", "content": MENSAGEM_SISTEMA}]
+    enviados, completos = [], []
+    for registro in registros:
+        mensagens.append({"role": "user", "content": registro['message']})
+        enviados.append(estimate_messages_tokens(politica.select(mensagens)))
+        completos.append(estimate_messages_tokens(mensagens))
+        mensagens.append({"role": "assistant", "content": registro['response']})
+    return enviados, completos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turnos', type=int, nargs='+', default=[10, 30, 100])
+    parser.add_argument('--janela', type=int, default=10, help="turnos mantidos por window e summary")
+    parser.add_argument('--orcamento', type=int, default=4000, help="tokens da política budget")
+    args = parser.parse_args()
+
+    print(f"{'Turnos':>6} | {'Política':<8} | {'Último turno':>12} | {'Total prompt':>12} | {'Economia':>8} | {'Custo input':>11}")
+    print("-" * 75)
+    for turnos in args.turnos:
+        registros = gerar_registros(turnos, turnos_por_conversa=turnos)
+        politicas = [
+            HistoryPolicy(),
+            SlidingWindowPolicy(args.janela),
+            TokenBudgetPolicy(args.orcamento),
+            RollingSummaryPolicy(keep_turns=args.janela),
+        ]
+        for politica in politicas:
+            enviados, completos = simular(politica, registros)
+            total = sum(enviados)
+            economia = 1 - total / sum(completos)
+            custo = total / 1_000_000 * PRECO_INPUT_POR_1M
+            print(f"{turnos:>6} | {politica.name:<8} | {enviados[-1]:>12} | {total:>12} | {economia:>8.0%} | ${custo:>10.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark de memória da leitura do histórico completo
+
+Mede o pico de memória (RSS) de uma exportação que percorre todos os turnos
+e soma os tokens, comparando:
+
+- get_data: caminho atual, carrega o CSV e converte tudo em lista de dicts
+- iter_records: itera o DataFrame já carregado, convertendo um bloco por vez
+- iter_csv_chunks: lê o arquivo em blocos, sem carregar o histórico
+- iter_csv_chunks + colunas: idem, lendo apenas a coluna necessária
+
+Cada modo roda em um processo separado para que o pico de um não afete o
+outro. Usa o módulo `resource`, disponível apenas em Linux/Mac.
+
+Uso:
+    python benchmarks/bench_iteration.py
+    python benchmarks/bench_iteration.py --tamanhos 100000 --chunksize 5000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_reader import GerenciadorCSV, iter_csv_chunks  # noqa: E402
+from benchmarks.datasets import gerar_csv  # noqa: E402
+
+MODOS = ['get_data', 'iter_records', 'iter_csv_chunks', 'iter_csv_chunks_colunas']
+
+
+def pico_rss_mb():
+    """Retorna o pico de RSS do processo atual em MB"""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB e Mac em bytes
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+def exportar(modo, caminho, chunksize):
+    """Percorre todos os registros no modo indicado e retorna o total de tokens"""
+    total = 0
+    if modo == 'get_data':
+        for registro in GerenciadorCSV(caminho).get_data():
+            total += registro['total_tokens']
+    elif modo == 'iter_records':
+        for registro in GerenciadorCSV(caminho).iter_records(chunksize):
+            total += registro['total_tokens']
+    elif modo == 'iter_csv_chunks':
+        for bloco in iter_csv_chunks(caminho, chunksize):
+            for registro in bloco.to_dict('records'):
+                total += registro['total_tokens']
+    else:
+        for bloco in iter_csv_chunks(caminho, chunksize, columns=['total_tokens']):
+            total += int(bloco['total_tokens'].sum())
+    return total
+
+
+def medir_modo(modo, caminho, chunksize):
+    """Executa um modo em um processo novo e retorna (total, segundos, pico MB, base MB)"""
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--executar', modo, caminho, '--chunksize', str(chunksize)],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return int(saida[0]), float(saida[1]), float(saida[2]), float(saida[3])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--chunksize', type=int, default=10_000)
+    parser.add_argument('--pasta', default=os.path.join(tempfile.gettempdir(), 'sale_simulator_bench'))
+    parser.add_argument('--executar', nargs=2, metavar=('MODO', 'CSV'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        modo, caminho = args.executar
+        base = pico_rss_mb()
+        inicio = time.perf_counter()
+        total = exportar(modo, caminho, args.chunksize)
+        print(total, time.perf_counter() - inicio, pico_rss_mb(), base)
+        return
+
+    print(f"{'Turnos':>10} | {'Modo':<24} | {'Tempo (s)':>9} | {'Pico RSS (MB)':>13} | {'Acima da base (MB)':>18}")
+    print("-" * 88)
+
+    for tamanho in args.tamanhos:
+        caminho = gerar_csv(args.pasta, tamanho)
+        totais = set()
+        for modo in MODOS:
+            total, segundos, pico, base = medir_modo(modo, caminho, args.chunksize)
+            totais.add(total)
+            print(f"{tamanho:>10} | {modo:<24} | {segundos:>9.2f} | {pico:>13.1f} | {pico - base:>18.1f}")
+        if len(totais) != 1:
+            print(f"Atenção: totais diferentes entre os modos: {sorted(totais)}")
+
+
+if __name__ == '__main__':
+    main()
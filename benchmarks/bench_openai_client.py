@@ -0,0 +1,79 @@
+"""
+Benchmark do cliente OpenAI compartilhado
+
+Simula várias conversas contra o servidor local compatível com a API de chat
+completions (benchmarks/fake_openai_server.py) e compara:
+
+- cliente novo por conversa: comportamento anterior, cada ConversationContext
+  criava seu próprio OpenAI(...) com um pool de conexões novo
+- cliente compartilhado: get_openai_client(), um pool por processo
+
+Mostra a latência da primeira mensagem de cada conversa (onde a criação do
+cliente e a conexão pesam), a latência média das demais e as métricas de
+reutilização de conexões. O endpoint local é HTTP, então o custo do handshake
+TLS da API real não aparece: o ganho em produção tende a ser maior.
+
+Uso:
+    python benchmarks/bench_openai_client.py
+    python benchmarks/bench_openai_client.py --conversas 100 --mensagens 5 --latencia-ms 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai_client  # noqa: E402
+from benchmarks.fake_openai_server import iniciar_servidor  # noqa: E402
+
+
+def simular(obter_cliente, conversas, mensagens):
+    """Envia `mensagens` por conversa e retorna (latências da 1ª mensagem, latências das demais) em ms"""
+    primeiras, demais = [], []
+    for _ in range(conversas):
+        inicio = time.perf_counter()
+        cliente = obter_cliente()
+        for numero in range(mensagens):
+            cliente.chat.completions.create(
+                model='gpt-4o-mini',
+                messages=[{'role': 'user', 'content': 'Olá'}],
+            )
+            fim = time.perf_counter()
+            (primeiras if numero == 0 else demais).append((fim - inicio) * 1000)
+            inicio = fim
+    return primeiras, demais
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conversas', type=int, default=50)
+    parser.add_argument('--mensagens', type=int, default=5)
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help="latência simulada do endpoint")
+    args = parser.parse_args()
+
+    servidor, base_url = iniciar_servidor(latencia=f"fixa:{args.latencia_ms}")
+    os.environ['OPENAI_BASE_URL'] = base_url
+    os.environ.setdefault('OPEN', 'sk-bench')
+
+    modos = [
+        ('cliente novo por conversa', openai_client.create_openai_client),
+        ('cliente compartilhado', openai_client.get_openai_client),
+    ]
+
+    print(f"{'Modo':<27} | {'1ª msg (ms)':>11} | {'Demais (ms)':>11} | {'Requisições':>11} | {'Conexões':>8} | {'Reuso':>6}")
+    print("-" * 90)
+    for nome, obter_cliente in modos:
+        openai_client.metrics.reset()
+        primeiras, demais = simular(obter_cliente, args.conversas, args.mensagens)
+        resumo = openai_client.metrics.snapshot()
+        media_demais = statistics.mean(demais) if demais else 0.0
+        print(f"{nome:<27} | {statistics.mean(primeiras):>11.2f} | {media_demais:>11.2f} | "
+              f"{resumo['requests']:>11} | {resumo['connections_opened']:>8} | {resumo['reuse_ratio']:>6.0%}")
+
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
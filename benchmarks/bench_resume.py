@@ -0,0 +1,76 @@
+"""
+Benchmark da retomada de conversas (busca por conversation_id)
+
+Compara a varredura linear antiga com o índice mantido pelo GerenciadorCSV
+para históricos de 10k, 100k e 1M turnos.
+
+Uso:
+    python benchmarks/bench_resume.py
+    python benchmarks/bench_resume.py --tamanhos 10000 100000 --repeticoes 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_reader import GerenciadorCSV  # noqa: E402
+from benchmarks.datasets import gerar_csv  # noqa: E402
+
+
+def busca_linear(data_frame, conversation_id):
+    """Busca equivalente à implementação anterior de search_data"""
+    result = data_frame.copy()
+    result = result[result['conversation_id'] == conversation_id]
+    return result.to_dict('records')
+
+
+def medir(funcao, argumentos):
+    """Retorna a mediana em milissegundos de funcao aplicada a cada argumento"""
+    tempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcao(argumento)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--pasta', default=os.path.join(tempfile.gettempdir(), 'sale_simulator_bench'))
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'Turnos':>10} | {'Carga (ms)':>11} | {'Linear (ms)':>11} | {'1ª busca (ms)':>13} | {'Indexada (ms)':>13}")
+    print("-" * 70)
+
+    for tamanho in args.tamanhos:
+        caminho = gerar_csv(args.pasta, tamanho)
+
+        inicio = time.perf_counter()
+        gerenciador = GerenciadorCSV(caminho)
+        carga = (time.perf_counter() - inicio) * 1000
+
+        ids = gerenciador.data_frame['conversation_id'].unique().tolist()
+        amostra = [rng.choice(ids) for _ in range(args.repeticoes)]
+
+        linear = medir(lambda cid: busca_linear(gerenciador.data_frame, cid), amostra)
+
+        # Primeira busca inclui a construção do índice
+        inicio = time.perf_counter()
+        gerenciador.search_data({'conversation_id': amostra[0]})
+        primeira = (time.perf_counter() - inicio) * 1000
+
+        indexada = medir(lambda cid: gerenciador.search_data({'conversation_id': cid}), amostra)
+
+        print(f"{tamanho:>10} | {carga:>11.1f} | {linear:>11.3f} | {primeira:>13.1f} | {indexada:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
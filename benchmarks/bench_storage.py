@@ -0,0 +1,186 @@
+"""
+Benchmark das operações de armazenamento
+
+Mede, para cada tamanho de histórico e cada backend, o tempo e o pico de
+memória das operações usadas pela aplicação:
+
+- carregar: abrir o armazenamento existente (construtor)
+- save_data: gravar um turno
+- save_multiple_data: gravar um lote de turnos (--lote)
+- search_data: buscar os turnos de uma conversa
+- update_data / delete_data: alterar e remover um turno por índice
+- get_data: ler o histórico inteiro como lista de dicts
+
+Os históricos são sintéticos (benchmarks/datasets.py), com mensagens de
+tamanho realista. Cada combinação de tamanho e backend roda em um processo
+separado, sobre uma cópia própria dos dados. O tempo é a mediana de
+--repeticoes chamadas (no máximo 3 para carregar e get_data); o pico de
+memória vem de uma chamada extra com tracemalloc.
+
+Todos os backends de storage.STORAGE_BACKENDS entram por padrão. Um backend
+fora do registro pode ser comparado com --extra modulo:Classe, desde que a
+classe receba o caminho no construtor e ofereça a interface de
+GerenciadorCSV. Wrappers configurados por ambiente (STORAGE_WRITE_BEHIND)
+não são aplicados.
+
+Uso:
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --tamanhos 10000 100000 --backends csv sqlite
+    python benchmarks/bench_storage.py --extra meu_store:GerenciadorRedis --json resultados/storage.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_reader import iter_csv_chunks  # noqa: E402
+from storage import STORAGE_BACKENDS, load_backend  # noqa: E402
+from benchmarks.datasets import gerar_csv, gerar_registros  # noqa: E402
+
+OPERACOES = ['carregar', 'save_data', 'save_multiple_data', 'search_data', 'update_data', 'delete_data', 'get_data']
+# Operações que percorrem o histórico inteiro: poucas repetições bastam
+PESADAS = {'carregar', 'get_data'}
+
+
+def preparar(nome, csv, pasta):
+    """Cria o armazenamento do backend com os registros do CSV e retorna seu caminho"""
+    classe, extensao = load_backend(nome)
+    destino = os.path.join(tempfile.mkdtemp(dir=pasta), 'dados' + extensao)
+    if nome == 'csv':
+        shutil.copy(csv, destino)
+        return destino
+
+    armazenamento = classe(destino)
+    if hasattr(armazenamento, 'import_csv'):
+        armazenamento.import_csv(csv)
+    else:
+        for bloco in iter_csv_chunks(csv, 50_000):
+            armazenamento.save_multiple_data(bloco.to_dict('records'))
+    if hasattr(armazenamento, 'compact'):
+        armazenamento.compact(wait=True)
+    if hasattr(armazenamento, 'close'):
+        armazenamento.close()
+    return destino
+
+
+def pico_rss_mb():
+    """Retorna o pico de RSS do processo atual em MB"""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB e Mac em bytes
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+def medir(funcao, repeticoes):
+    """Retorna (mediana em ms, pico de memória alocada em MB) de `funcao`"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(tempos), pico / 1024 / 1024
+
+
+def executar(nome, csv, tamanho, pasta, repeticoes, lote):
+    """Mede todas as operações de um backend e retorna {operação: [ms, MB]}"""
+    classe, _ = load_backend(nome)
+    destino = preparar(nome, csv, pasta)
+    rng = random.Random(42)
+    novos = iter(gerar_registros((repeticoes + 1) * (lote + 1), seed=7))
+    estado = {'armazenamento': classe(destino)}
+    ids = [f"20250101_{numero:08d}" for numero in range(max(tamanho // 10, 1))]
+
+    def carregar():
+        estado['armazenamento'] = classe(destino)
+
+    def indice():
+        return rng.randrange(estado['armazenamento'].get_records_count())
+
+    operacoes = {
+        'carregar': carregar,
+        'save_data': lambda: estado['armazenamento'].save_data(next(novos)),
+        'save_multiple_data': lambda: estado['armazenamento'].save_multiple_data([next(novos) for _ in range(lote)]),
+        'search_data': lambda: estado['armazenamento'].search_data({'conversation_id': rng.choice(ids)}),
+        'update_data': lambda: estado['armazenamento'].update_data(indice(), {'response': 'Resposta atualizada.'}),
+        'delete_data': lambda: estado['armazenamento'].delete_data(indice()),
+        'get_data': lambda: estado['armazenamento'].get_data(),
+    }
+
+    resultado = {}
+    for operacao in OPERACOES:
+        vezes = min(repeticoes, 3) if operacao in PESADAS else repeticoes
+        resultado[operacao] = medir(operacoes[operacao], vezes)
+    if hasattr(estado['armazenamento'], 'close'):
+        estado['armazenamento'].close()
+    shutil.rmtree(os.path.dirname(destino), ignore_errors=True)
+    resultado['pico_rss_mb'] = pico_rss_mb()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--backends', nargs='+', default=list(STORAGE_BACKENDS))
+    parser.add_argument('--extra', nargs='+', default=[], metavar='MODULO:CLASSE',
+                        help="backends fora de storage.STORAGE_BACKENDS")
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--lote', type=int, default=100, help="registros por save_multiple_data")
+    parser.add_argument('--pasta', default=os.path.join(tempfile.gettempdir(), 'sale_simulator_bench'))
+    parser.add_argument('--json', help="arquivo para gravar os resultados")
+    parser.add_argument('--executar', nargs=3, metavar=('BACKEND', 'CSV', 'TAMANHO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        nome, csv, tamanho = args.executar
+        print(json.dumps(executar(nome, csv, int(tamanho), args.pasta, args.repeticoes, args.lote)))
+        return
+
+    backends = args.backends + args.extra
+    resultados = []
+    for tamanho in args.tamanhos:
+        csv = gerar_csv(args.pasta, tamanho)
+        medidas = {}
+        for nome in backends:
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--executar', nome, csv, str(tamanho),
+                 '--pasta', args.pasta, '--repeticoes', str(args.repeticoes), '--lote', str(args.lote)],
+                capture_output=True, text=True,
+            )
+            if saida.returncode != 0:
+                print(f"{nome} ({tamanho} turnos) falhou:\n{saida.stderr.strip()}")
+                continue
+            medidas[nome] = json.loads(saida.stdout.strip().splitlines()[-1])
+            resultados.append({'tamanho': tamanho, 'backend': nome, **medidas[nome]})
+
+        print(f"\n{tamanho} turnos — mediana em ms / pico de memória em MB")
+        print(f"{'Operação':<20}" + "".join(f" | {nome:>20}" for nome in medidas))
+        print("-" * (20 + 23 * len(medidas)))
+        for operacao in OPERACOES:
+            print(f"{operacao:<20}" + "".join(
+                f" | {medidas[nome][operacao][0]:>10.2f} / {medidas[nome][operacao][1]:>7.1f}" for nome in medidas
+            ))
+        print(f"{'pico RSS (MB)':<20}" + "".join(f" | {medidas[nome]['pico_rss_mb']:>20.1f}" for nome in medidas))
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
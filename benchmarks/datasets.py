@@ -0,0 +1,74 @@
+"""
+Geração de históricos sintéticos de conversas para os benchmarks
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+FRASES_VENDEDOR = [
+    "Olá! Tudo bem? Gostaria de apresentar nossa solução de gestão para pequenas empresas.",
+    "Entendo sua preocupação com o preço. Posso mostrar como o investimento se paga em poucos meses?",
+    "Nosso diferencial é o suporte dedicado e a integração com os sistemas que você já usa.",
+    "Quais são hoje os maiores desafios da sua equipe no atendimento aos clientes?",
+    "Podemos agendar uma demonstração gratuita ainda esta semana?",
+]
+
+FRASES_COMPRADOR = [
+    "Interessante, mas já trabalhamos com um fornecedor há alguns anos. O que vocês fazem de diferente?",
+    "O preço me parece alto para o nosso orçamento atual. Vocês têm alguma condição especial?",
+    "Preciso entender melhor o retorno sobre o investimento antes de levar isso para a diretoria.",
+    "Não vejo urgência nisso agora, talvez no próximo trimestre faça mais sentido.",
+    "Gostei da proposta. Como funciona a implantação e quanto tempo leva?",
+]
+
+
+def gerar_registros(num_turnos, turnos_por_conversa=10, seed=42):
+    """
+    Gera registros no mesmo formato salvo por ConversationContext.send_message
+
+    Args:
+        num_turnos: Número total de turnos (linhas) a gerar
+        turnos_por_conversa: Número de turnos em cada conversa
+        seed: Semente para tornar o conjunto reprodutível
+
+    Returns:
+        list: Lista de dicionários com um turno por item
+    """
+    rng = random.Random(seed)
+    inicio = datetime(2025, 1, 1, 8, 0, 0)
+    registros = []
+
+    for i in range(num_turnos):
+        conversa = i // turnos_por_conversa
+        momento = inicio + timedelta(minutes=conversa * 30, seconds=(i % turnos_por_conversa) * 20)
+        mensagem = " ".join(rng.choice(FRASES_VENDEDOR) for _ in range(rng.randint(1, 3)))
+        resposta = " ".join(rng.choice(FRASES_COMPRADOR) for _ in range(rng.randint(1, 4)))
+        tokens = rng.randint(300, 3000)
+
+        registros.append({
+            'conversation_id': f"{inicio:%Y%m%d}_{conversa:08d}",
+            'data': momento.isoformat(),
+            'total_tokens': tokens,
+            'input_cost_usd': tokens * 0.8 / 1_000_000 * 0.15,
+            'message': mensagem,
+            'response': resposta,
+            'output_cost_usd': tokens * 0.2 / 1_000_000 * 0.60,
+        })
+
+    return registros
+
+
+def gerar_csv(pasta, num_turnos, turnos_por_conversa=10, seed=42):
+    """
+    Escreve (ou reaproveita) um CSV sintético com num_turnos linhas
+
+    Returns:
+        str: Caminho do arquivo gerado
+    """
+    caminho = os.path.join(pasta, f"dados_{num_turnos}_{turnos_por_conversa}_{seed}.csv")
+    if not os.path.exists(caminho):
+        os.makedirs(pasta, exist_ok=True)
+        pd.DataFrame(gerar_registros(num_turnos, turnos_por_conversa, seed)).to_csv(caminho, index=False)
+    return caminho
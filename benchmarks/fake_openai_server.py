@@ -0,0 +1,345 @@
+"""
+Servidor local compatível com a API de chat completions da OpenAI
+
+Substitui a API real em testes de desempenho de ponta a ponta: o caminho
+completo de ConversationContext (cliente compartilhado, limite de
+requisições, novas tentativas, streaming e cálculo de custo) roda sem rede e
+sem custo. Basta apontar o cliente para o servidor:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+
+Implementa POST /v1/chat/completions, com e sem streaming (SSE), e devolve o
+uso de tokens (estimado a partir das mensagens) inclusive no último chunk
+quando stream_options.include_usage é pedido. Prefixos de sistema repetidos
+com 1.024 tokens ou mais aparecem como cached_tokens, como no cache de
+prompt da OpenAI.
+
+Comportamento configurável:
+- latência até o primeiro token: fixa:200, uniforme:100:300, normal:200:50,
+  lognormal:200:0.5 (mediana em ms e sigma) ou exponencial:200 (média)
+- velocidade de geração em tokens por segundo e tamanho da resposta
+- cota de requisições e tokens por minuto, com cabeçalhos x-ratelimit-* e
+  429 ao estourar
+- 429 e erros 500 injetados com a probabilidade informada
+- semente para que latências, respostas e falhas sejam reprodutíveis
+
+Uso:
+    python benchmarks/fake_openai_server.py --porta 8100 --latencia lognormal:400:0.4 --tokens-por-segundo 80
+    python benchmarks/fake_openai_server.py --taxa-429 0.1 --taxa-erro 0.02 --rpm 60
+
+Em código: iniciar_servidor(...) sobe o servidor em uma thread e retorna
+(servidor, base_url); servidor.comportamento.estatisticas() traz os contadores.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datasets import FRASES_COMPRADOR  # noqa: E402
+from history_policy import estimate_messages_tokens, estimate_tokens  # noqa: E402
+
+# Tamanho mínimo e granularidade do prefixo servido pelo cache de prompt
+CACHE_MINIMO = 1024
+CACHE_BLOCO = 128
+
+
+def distribuicao_latencia(especificacao):
+    """
+    Converte uma especificação como 'uniforme:100:300' em uma função
+    (rng) -> segundos
+
+    Args:
+        especificacao: fixa:MS, uniforme:MIN:MAX, normal:MEDIA:DESVIO,
+            lognormal:MEDIANA:SIGMA, exponencial:MEDIA ou apenas MS
+    """
+    partes = str(especificacao).split(':')
+    if len(partes) == 1:
+        partes = ['fixa'] + partes
+    tipo, valores = partes[0], [float(valor) for valor in partes[1:]]
+
+    if tipo == 'fixa':
+        return lambda rng: valores[0] / 1000
+    if tipo == 'uniforme':
+        return lambda rng: rng.uniform(valores[0], valores[1]) / 1000
+    if tipo == 'normal':
+        return lambda rng: max(rng.gauss(valores[0], valores[1]), 0.0) / 1000
+    if tipo == 'lognormal':
+        return lambda rng: rng.lognormvariate(0, valores[1]) * valores[0] / 1000
+    if tipo == 'exponencial':
+        return lambda rng: rng.expovariate(1 / valores[0]) / 1000 if valores[0] > 0 else 0.0
+    raise ValueError(f"Distribuição de latência desconhecida: {especificacao}")
+
+
+class Comportamento:
+    """Configuração do servidor, cotas e contadores, compartilhados pelas threads"""
+
+    def __init__(self, latencia='0', tokens_por_segundo=0.0, tokens_resposta=40, taxa_429=0.0, taxa_erro=0.0,
+                 rpm=None, tpm=None, semente=42):
+        """
+        Args:
+            latencia: Distribuição da latência até o primeiro token (ver distribuicao_latencia)
+            tokens_por_segundo: Velocidade de geração (0 para instantânea)
+            tokens_resposta: Tamanho aproximado das respostas em tokens
+            taxa_429: Probabilidade de responder 429 mesmo dentro da cota
+            taxa_erro: Probabilidade de responder 500
+            rpm: Cota de requisições por minuto (None para ilimitada)
+            tpm: Cota de tokens por minuto (None para ilimitada)
+            semente: Semente dos sorteios
+        """
+        self.latencia = distribuicao_latencia(latencia)
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_resposta = tokens_resposta
+        self.taxa_429 = taxa_429
+        self.taxa_erro = taxa_erro
+        self.rpm = rpm
+        self.tpm = tpm
+        self.semente = semente
+
+        self._lock = threading.Lock()
+        self._numero = 0
+        self._janela = 0
+        self._requisicoes_janela = 0
+        self._tokens_janela = 0
+        self._prefixos = set()
+        self.contadores = {'requisicoes': 0, 'sucesso': 0, 'streaming': 0, 'erros_429': 0, 'erros_500': 0,
+                           'tokens_prompt': 0, 'tokens_cache': 0, 'tokens_resposta': 0}
+
+    def rng(self):
+        """Gerador da próxima requisição, derivado da semente e da ordem de chegada"""
+        with self._lock:
+            self._numero += 1
+            return random.Random(self.semente * 1_000_003 + self._numero)
+
+    def contar(self, chave, quantidade=1):
+        with self._lock:
+            self.contadores[chave] += quantidade
+
+    def consumir_cota(self, tokens):
+        """
+        Desconta a requisição da cota do minuto atual
+
+        Returns:
+            tuple: (cabeçalhos x-ratelimit-*, True se a cota estourou)
+        """
+        agora = time.time()
+        with self._lock:
+            janela = int(agora // 60)
+            if janela != self._janela:
+                self._janela, self._requisicoes_janela, self._tokens_janela = janela, 0, 0
+            excedeu = (self.rpm is not None and self._requisicoes_janela >= self.rpm) or \
+                (self.tpm is not None and self._tokens_janela + tokens > self.tpm)
+            if not excedeu:
+                self._requisicoes_janela += 1
+                self._tokens_janela += tokens
+            reinicio = f"{(janela + 1) * 60 - agora:.3f}s"
+
+            cabecalhos = {}
+            if self.rpm is not None:
+                cabecalhos['x-ratelimit-limit-requests'] = str(self.rpm)
+                cabecalhos['x-ratelimit-remaining-requests'] = str(max(self.rpm - self._requisicoes_janela, 0))
+                cabecalhos['x-ratelimit-reset-requests'] = reinicio
+            if self.tpm is not None:
+                cabecalhos['x-ratelimit-limit-tokens'] = str(self.tpm)
+                cabecalhos['x-ratelimit-remaining-tokens'] = str(max(self.tpm - self._tokens_janela, 0))
+                cabecalhos['x-ratelimit-reset-tokens'] = reinicio
+            return cabecalhos, excedeu
+
+    def tokens_em_cache(self, messages, prompt_tokens):
+        """Tokens do prefixo de sistema já visto, como o cache de prompt da OpenAI"""
+        sistema = [msg for msg in messages if msg.get('role') == 'system'][:1]
+        if not sistema or prompt_tokens < CACHE_MINIMO:
+            return 0
+        tokens_sistema = estimate_messages_tokens(sistema)
+        chave = hashlib.sha256(sistema[0].get('content', '').encode('utf-8')).hexdigest()
+        with self._lock:
+            visto = chave in self._prefixos
+            self._prefixos.add(chave)
+        if not visto or tokens_sistema < CACHE_MINIMO:
+            return 0
+        return tokens_sistema // CACHE_BLOCO * CACHE_BLOCO
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self.contadores)
+
+
+class ManipuladorOpenAI(BaseHTTPRequestHandler):
+    """Atende /v1/chat/completions mantendo a conexão aberta entre requisições"""
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo saem em escritas separadas; sem isso o ACK atrasado soma ~40ms
+    disable_nagle_algorithm = True
+    comportamento = None
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar_json(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _enviar_chunk(self, dados):
+        """Escreve um trecho no corpo com Transfer-Encoding: chunked"""
+        self.wfile.write(f"{len(dados):X}\r\n".encode('ascii') + dados + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._enviar_json(404, {'error': {'message': f"Rota não encontrada: {self.path}", 'type': 'invalid_request_error'}})
+            return
+
+        comportamento = self.comportamento
+        comportamento.contar('requisicoes')
+        requisicao = json.loads(corpo or b'{}')
+        rng = comportamento.rng()
+        messages = requisicao.get('messages', [])
+        prompt_tokens = estimate_messages_tokens(messages)
+
+        cabecalhos, excedeu = comportamento.consumir_cota(prompt_tokens + comportamento.tokens_resposta)
+        if excedeu or rng.random() < comportamento.taxa_429:
+            comportamento.contar('erros_429')
+            espera = cabecalhos.get('x-ratelimit-reset-requests') or cabecalhos.get('x-ratelimit-reset-tokens')
+            espera_ms = float(espera[:-1]) * 1000 if espera else rng.uniform(100, 1000)
+            self._enviar_json(429, {'error': {'message': 'Limite de requisições simulado', 'type': 'requests',
+                                              'code': 'rate_limit_exceeded'}},
+                              {**cabecalhos, 'retry-after-ms': f"{espera_ms:.0f}"})
+            return
+        if rng.random() < comportamento.taxa_erro:
+            comportamento.contar('erros_500')
+            self._enviar_json(500, {'error': {'message': 'Erro simulado', 'type': 'server_error'}})
+            return
+
+        time.sleep(comportamento.latencia(rng))
+
+        frases = []
+        while estimate_tokens(" ".join(frases)) < comportamento.tokens_resposta:
+            frases.append(rng.choice(FRASES_COMPRADOR))
+        resposta = " ".join(frases)
+        cached_tokens = comportamento.tokens_em_cache(messages, prompt_tokens)
+        completion_tokens = estimate_tokens(resposta)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': cached_tokens},
+        }
+        comportamento.contar('tokens_prompt', prompt_tokens)
+        comportamento.contar('tokens_cache', cached_tokens)
+        comportamento.contar('tokens_resposta', completion_tokens)
+
+        base = {'id': f"chatcmpl-falso-{rng.getrandbits(32):08x}", 'created': int(time.time()),
+                'model': requisicao.get('model', 'gpt-4o-mini')}
+        if not requisicao.get('stream'):
+            if comportamento.tokens_por_segundo:
+                time.sleep(completion_tokens / comportamento.tokens_por_segundo)
+            comportamento.contar('sucesso')
+            self._enviar_json(200, {
+                **base,
+                'object': 'chat.completion',
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': resposta},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            }, cabecalhos)
+            return
+
+        comportamento.contar('streaming')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+
+        def evento(choices, **extra):
+            chunk = {**base, 'object': 'chat.completion.chunk', 'choices': choices, **extra}
+            self._enviar_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+
+        evento([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+        for trecho in re.findall(r'\S+\s*', resposta):
+            if comportamento.tokens_por_segundo:
+                time.sleep(estimate_tokens(trecho) / comportamento.tokens_por_segundo)
+            evento([{'index': 0, 'delta': {'content': trecho}, 'finish_reason': None}])
+        evento([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if (requisicao.get('stream_options') or {}).get('include_usage'):
+            evento([], usage=usage)
+        self._enviar_chunk(b"data: [DONE]\n\n")
+        self._enviar_chunk(b"")
+        comportamento.contar('sucesso')
+
+
+class ServidorOpenAIFalso(ThreadingHTTPServer):
+    """Servidor HTTP com uma thread por conexão e fila de conexões longa para muitos clientes"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def iniciar_servidor(host='127.0.0.1', porta=0, **configuracao):
+    """
+    Sobe o servidor em uma thread de fundo
+
+    Args:
+        host: Endereço de escuta
+        porta: Porta (0 escolhe uma livre)
+        **configuracao: Parâmetros de Comportamento
+
+    Returns:
+        tuple: (servidor, base_url para OPENAI_BASE_URL)
+    """
+    manipulador = type('Manipulador', (ManipuladorOpenAI,), {'comportamento': Comportamento(**configuracao)})
+    servidor = ServidorOpenAIFalso((host, porta), manipulador)
+    servidor.comportamento = manipulador.comportamento
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8100)
+    parser.add_argument('--latencia', default='0', help="distribuição da latência até o primeiro token (ms)")
+    parser.add_argument('--tokens-por-segundo', type=float, default=0.0)
+    parser.add_argument('--tokens-resposta', type=int, default=40)
+    parser.add_argument('--taxa-429', type=float, default=0.0)
+    parser.add_argument('--taxa-erro', type=float, default=0.0)
+    parser.add_argument('--rpm', type=int, default=None)
+    parser.add_argument('--tpm', type=int, default=None)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    servidor, base_url = iniciar_servidor(
+        args.host, args.porta,
+        latencia=args.latencia,
+        tokens_por_segundo=args.tokens_por_segundo,
+        tokens_resposta=args.tokens_resposta,
+        taxa_429=args.taxa_429,
+        taxa_erro=args.taxa_erro,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        semente=args.semente,
+    )
+    print(f"Servidor OpenAI falso em {base_url}")
+    print(f"Use: OPENAI_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\nEstatísticas: {servidor.comportamento.estatisticas()}")
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
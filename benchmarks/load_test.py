@@ -0,0 +1,340 @@
+"""
+Teste de carga: quantos treinandos simultâneos um servidor aguenta
+
+Conduz N conversas simultâneas (uma thread por treinando, como as sessões do
+Streamlit) com T turnos cada e mede a latência de cada turno, separada em
+tempo de API e tempo de armazenamento:
+
+- modo mock: MockConversationContext, com a latência injetada aplicada à
+  geração da resposta. O mock não grava os turnos; o teste grava cada um no
+  mesmo formato de ConversationContext._save_turn
+- modo real: ConversationContext completo (política de histórico, limite de
+  requisições, cálculo de custo e gravação), com o cliente OpenAI trocado por
+  um cliente falso que espera a latência injetada. Nenhuma chamada é feita à
+  API. Com --servidor-falso, o cliente real (pool de conexões, novas
+  tentativas) fala por HTTP com benchmarks/fake_openai_server.py, que também
+  pode injetar 429 e erros
+
+Entre os turnos cada treinando "pensa" por um tempo aleatório (exponencial
+com a média informada). Latências, tempos de pensar e mensagens saem de
+geradores com semente, então a mesma semente gera a mesma carga.
+
+O armazenamento usa uma pasta própria (--pasta), com o backend de
+STORAGE_BACKEND ou --backend, e o crescimento do arquivo é informado no fim.
+O resultado completo é gravado em JSON (--saida) para comparar execuções.
+
+Uso:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --modo real --conversas 50 --turnos 10 --latencia-ms 800 --pensar-ms 2000
+    python benchmarks/load_test.py --modo real --servidor-falso --taxa-429 0.05 --conversas 100
+    python benchmarks/load_test.py --conversas 200 --backend sqlite --saida resultados/carga.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai.types import CompletionUsage  # noqa: E402
+from openai.types.chat import ChatCompletion  # noqa: E402
+
+from benchmarks.datasets import FRASES_COMPRADOR, FRASES_VENDEDOR  # noqa: E402
+from history_policy import estimate_messages_tokens, estimate_tokens  # noqa: E402
+
+
+class RespostaBruta:
+    """Imita o retorno de with_raw_response: cabeçalhos e parse()"""
+
+    def __init__(self, completion):
+        self.headers = {}
+        self._completion = completion
+
+    def parse(self):
+        return self._completion
+
+
+class ClienteFalso:
+    """Substitui o cliente OpenAI: espera a latência injetada e devolve uma resposta com uso de tokens"""
+
+    def __init__(self, latencia, rng):
+        self.latencia = latencia
+        self.rng = rng
+        create = SimpleNamespace(create=self._create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_parsed, with_raw_response=create))
+
+    def _create(self, model, messages, **kwargs):
+        time.sleep(sortear_latencia(self.rng, self.latencia))
+        resposta = " ".join(self.rng.choice(FRASES_COMPRADOR) for _ in range(self.rng.randint(1, 3)))
+        prompt_tokens = estimate_messages_tokens(messages)
+        completion_tokens = estimate_tokens(resposta)
+        return RespostaBruta(ChatCompletion(
+            id='chatcmpl-carga',
+            object='chat.completion',
+            created=int(time.time()),
+            model=model,
+            choices=[{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': resposta}}],
+            usage=CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+        ))
+
+    def _create_parsed(self, **kwargs):
+        return self._create(**kwargs).parse()
+
+
+def sortear_latencia(rng, media):
+    """Latência em segundos em torno da média (±50%)"""
+    return media * rng.uniform(0.5, 1.5) if media > 0 else 0.0
+
+
+def cronometrar(funcao, tempos, chave):
+    """Envolve `funcao` somando a duração de cada chamada em tempos[chave]"""
+    def envolvida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            tempos[chave] += time.perf_counter() - inicio
+    return envolvida
+
+
+def criar_conversa(modo, numero, args, rng, tempos):
+    """
+    Cria a conversa de um treinando, instrumentada para separar API e armazenamento
+
+    Returns:
+        callable: Função (mensagem) -> resposta que executa um turno
+    """
+    from prompts import SYSTEM_MESSAGE
+    from storage import get_storage
+
+    conversation_id = f"carga_{args.semente}_{numero:05d}"
+    if modo == 'real':
+        from agent import ConversationContext
+
+        conversa = ConversationContext(model=args.modelo, system_message=SYSTEM_MESSAGE)
+        conversa.conversation_id = conversation_id
+        if not args.servidor_falso:
+            conversa.client = ClienteFalso(args.latencia_ms / 1000, rng)
+        conversa._create_completion = cronometrar(conversa._create_completion, tempos, 'api')
+        conversa._save_turn = cronometrar(conversa._save_turn, tempos, 'armazenamento')
+        return conversa.send_message
+
+    from agent_mock import MockConversationContext
+
+    conversa = MockConversationContext(model=args.modelo, system_message=SYSTEM_MESSAGE)
+    conversa.conversation_id = conversation_id
+    armazenamento = get_storage(args.arquivo)
+    gerar_resposta = conversa._generate_mock_response
+
+    def gerar_com_latencia(mensagem):
+        time.sleep(sortear_latencia(rng, args.latencia_ms / 1000))
+        return gerar_resposta(mensagem)
+
+    conversa._generate_mock_response = cronometrar(gerar_com_latencia, tempos, 'api')
+    salvar = cronometrar(armazenamento.save_data, tempos, 'armazenamento')
+
+    def enviar(mensagem):
+        resposta = conversa.send_message(mensagem)
+        salvar({
+            'conversation_id': conversation_id,
+            'data': datetime.now().isoformat(),
+            'total_tokens': 0,
+            'input_cost_usd': 0.0,
+            'message': mensagem,
+            'response': resposta,
+            'output_cost_usd': 0.0,
+            'prompt_tokens_saved': 0,
+            'cached_tokens': 0,
+            'uncached_tokens': 0,
+            'cached_response': False,
+        })
+        return resposta
+
+    return enviar
+
+
+def treinando(numero, args, inicio, resultados, erros):
+    """Conduz uma conversa completa e registra (turno, api, armazenamento) de cada turno em ms"""
+    rng = random.Random(args.semente * 100_003 + numero)
+    tempos = {'api': 0.0, 'armazenamento': 0.0}
+    enviar = criar_conversa(args.modo, numero, args, rng, tempos)
+    inicio.wait()
+
+    for _ in range(args.turnos):
+        if args.pensar_ms > 0:
+            time.sleep(rng.expovariate(1000 / args.pensar_ms))
+        mensagem = " ".join(rng.choice(FRASES_VENDEDOR) for _ in range(rng.randint(1, 3)))
+        tempos['api'] = tempos['armazenamento'] = 0.0
+        comeco = time.perf_counter()
+        try:
+            enviar(mensagem)
+        except Exception as e:
+            erros.append(f"{type(e).__name__}: {e}")
+            continue
+        total = time.perf_counter() - comeco
+        resultados.append((total * 1000, tempos['api'] * 1000, tempos['armazenamento'] * 1000))
+
+
+def percentis(valores):
+    """Retorna média, p50, p95 e p99 de uma lista de valores"""
+    if not valores:
+        return {'media': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    if len(valores) == 1:
+        cortes = valores * 99
+    else:
+        cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {'media': statistics.mean(valores), 'p50': cortes[49], 'p95': cortes[94], 'p99': cortes[98]}
+
+
+def tamanho_pasta(pasta):
+    """Soma o tamanho dos arquivos de uma pasta"""
+    total = 0
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in nomes:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except OSError:
+                pass
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modo', choices=['mock', 'real'], default='mock')
+    parser.add_argument('--conversas', type=int, default=20, help="treinandos simultâneos")
+    parser.add_argument('--turnos', type=int, default=10, help="turnos por conversa")
+    parser.add_argument('--latencia-ms', type=float, default=500.0, help="latência média injetada na API")
+    parser.add_argument('--pensar-ms', type=float, default=1000.0, help="tempo médio de pensar entre turnos")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--servidor-falso', action='store_true',
+                        help="modo real via HTTP contra o servidor OpenAI falso local")
+    parser.add_argument('--taxa-429', type=float, default=0.0, help="429 injetados pelo servidor falso")
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help="erros 500 injetados pelo servidor falso")
+    parser.add_argument('--modelo', default='gpt-4o-mini')
+    parser.add_argument('--backend', help="backend de armazenamento (padrão: STORAGE_BACKEND)")
+    parser.add_argument('--pasta', default=os.path.join(tempfile.gettempdir(), 'sale_simulator_carga'))
+    parser.add_argument('--manter', action='store_true', help="não apaga o armazenamento de execuções anteriores")
+    parser.add_argument('--saida', default=None, help="arquivo JSON do resultado")
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ['STORAGE_BACKEND'] = args.backend
+    # Históricos repetidos entre treinandos não devem sair do cache de respostas
+    os.environ['RESPONSE_CACHE'] = '0'
+    os.environ.setdefault('OPEN', 'sk-carga')
+    servidor = None
+    if args.servidor_falso:
+        from benchmarks.fake_openai_server import iniciar_servidor
+
+        servidor, os.environ['OPENAI_BASE_URL'] = iniciar_servidor(
+            latencia=f"uniforme:{args.latencia_ms * 0.5}:{args.latencia_ms * 1.5}",
+            taxa_429=args.taxa_429,
+            taxa_erro=args.taxa_erro,
+            semente=args.semente,
+        )
+
+    args.pasta = os.path.abspath(args.pasta)
+    saida = os.path.abspath(args.saida or os.path.join(args.pasta, f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    pasta_dados = os.path.join(args.pasta, 'data')
+    if not args.manter:
+        shutil.rmtree(pasta_dados, ignore_errors=True)
+    os.makedirs(pasta_dados, exist_ok=True)
+    # Tempos por turno (metrics.py) ficam junto do armazenamento do teste;
+    # agregue com benchmarks/metrics_report.py --log <pasta>/data/metrics.jsonl
+    os.environ['METRICS_LOG'] = os.path.join(pasta_dados, 'metrics.jsonl')
+    # ConversationContext grava em data/dados.csv relativo à pasta atual
+    os.chdir(args.pasta)
+    args.arquivo = os.path.join(pasta_dados, 'dados.csv')
+    random.seed(args.semente)
+
+    from storage import get_storage
+
+    armazenamento = get_storage(args.arquivo)
+    bytes_inicio = tamanho_pasta(pasta_dados)
+    registros_inicio = armazenamento.get_records_count()
+
+    resultados, erros = [], []
+    inicio = threading.Barrier(args.conversas + 1)
+    threads = [
+        threading.Thread(target=treinando, args=(numero, args, inicio, resultados, erros))
+        for numero in range(args.conversas)
+    ]
+    for thread in threads:
+        thread.start()
+    inicio.wait()
+    comeco = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - comeco
+
+    if hasattr(armazenamento, 'flush'):
+        armazenamento.flush()
+    bytes_fim = tamanho_pasta(pasta_dados)
+    registros_fim = armazenamento.get_records_count()
+
+    resumo = {
+        'data': datetime.now().isoformat(),
+        'configuracao': {
+            'modo': args.modo,
+            'conversas': args.conversas,
+            'turnos': args.turnos,
+            'latencia_ms': args.latencia_ms,
+            'pensar_ms': args.pensar_ms,
+            'semente': args.semente,
+            'modelo': args.modelo,
+            'servidor_falso': args.servidor_falso,
+            'taxa_429': args.taxa_429,
+            'taxa_erro': args.taxa_erro,
+            'backend': os.environ.get('STORAGE_BACKEND', 'csv'),
+            'python': platform.python_version(),
+        },
+        'turnos': len(resultados),
+        'erros': len(erros),
+        'exemplos_de_erro': erros[:5],
+        'duracao_s': duracao,
+        'vazao_turnos_s': len(resultados) / duracao if duracao else 0.0,
+        'latencia_ms': {
+            'turno': percentis([r[0] for r in resultados]),
+            'api': percentis([r[1] for r in resultados]),
+            'armazenamento': percentis([r[2] for r in resultados]),
+        },
+        'servidor_falso': servidor.comportamento.estatisticas() if servidor else None,
+        'armazenamento': {
+            'bytes_inicio': bytes_inicio,
+            'bytes_fim': bytes_fim,
+            'crescimento_bytes': bytes_fim - bytes_inicio,
+            'registros_inicio': registros_inicio,
+            'registros_fim': registros_fim,
+        },
+    }
+
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+
+    print(f"Modo {args.modo}: {args.conversas} conversas x {args.turnos} turnos, "
+          f"latência {args.latencia_ms:.0f} ms, pensar {args.pensar_ms:.0f} ms, semente {args.semente}")
+    print(f"Turnos: {resumo['turnos']} | Erros: {resumo['erros']} | Duração: {duracao:.2f}s | "
+          f"Vazão: {resumo['vazao_turnos_s']:.1f} turnos/s")
+    print(f"{'Latência (ms)':<14} | {'média':>8} | {'p50':>8} | {'p95':>8} | {'p99':>8}")
+    print("-" * 58)
+    for nome, valores in resumo['latencia_ms'].items():
+        print(f"{nome:<14} | {valores['media']:>8.1f} | {valores['p50']:>8.1f} | {valores['p95']:>8.1f} | {valores['p99']:>8.1f}")
+    crescimento = resumo['armazenamento']
+    print(f"Armazenamento: {crescimento['registros_inicio']} -> {crescimento['registros_fim']} registros, "
+          f"+{crescimento['crescimento_bytes'] / 1024:.1f} KB")
+    print(f"Resultado salvo em {saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Relatório dos tempos por turno gravados em data/metrics.jsonl (METRICS_LOG=1)
+
+Agrega o log de métricas (metrics.py) escrito pela aplicação: para cada modo
+(real ou mock), a duração total dos turnos e de cada etapa (API, streaming,
+armazenamento, serialização, escrita e leitura do disco), com média e
+percentis p50/p95/p99. As execuções do script da página que mostraram uma
+resposta são ligadas ao turno pelo turn_id e entram como renderização.
+
+Uso:
+    python benchmarks/metrics_report.py
+    python benchmarks/metrics_report.py --log /caminho/metrics.jsonl --desde 2025-01-01 --json relatorio.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+
+
+def percentis(valores):
+    """Retorna quantidade, média, p50, p95 e p99 de uma lista de valores"""
+    if len(valores) == 1:
+        cortes = valores * 99
+    else:
+        cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {'n': len(valores), 'media': statistics.mean(valores), 'p50': cortes[49], 'p95': cortes[94], 'p99': cortes[98]}
+
+
+def agregar(registros, desde=None):
+    """Agrupa os tempos dos turnos por modo e etapa e calcula os percentis"""
+    turnos = {}
+    renderizacoes = {}
+    for registro in registros:
+        if desde is not None and registro.get('started_at', 0) < desde:
+            continue
+        if registro.get('type') == 'turn':
+            turnos[registro['turn_id']] = registro
+        elif registro.get('type') == metrics.RENDER and registro.get('turn_id'):
+            renderizacoes[registro['turn_id']] = registro['total_ms']
+
+    tempos = defaultdict(lambda: defaultdict(list))
+    erros = defaultdict(int)
+    for turn_id, turno in turnos.items():
+        modo = turno.get('mode') or '-'
+        if turno.get('status') != 'ok':
+            erros[modo] += 1
+            continue
+        tempos[modo]['total'].append(turno['total_ms'])
+        for etapa, ms in turno.get('spans', {}).items():
+            tempos[modo][etapa].append(ms)
+        if turn_id in renderizacoes:
+            tempos[modo][metrics.RENDER].append(renderizacoes[turn_id])
+
+    return {
+        modo: {
+            'erros': erros[modo],
+            'etapas': {etapa: percentis(valores) for etapa, valores in etapas.items()},
+        }
+        for modo, etapas in tempos.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', help="arquivo de métricas (padrão: o de METRICS_LOG)")
+    parser.add_argument('--desde', help="considera só turnos a partir desta data (AAAA-MM-DD)")
+    parser.add_argument('--json', help="arquivo para gravar o relatório")
+    args = parser.parse_args()
+
+    caminho = args.log or metrics.metrics_log_path()
+    if not caminho:
+        print("Log de métricas desativado: defina METRICS_LOG ou informe --log")
+        sys.exit(1)
+    if not os.path.exists(caminho):
+        print(f"Log de métricas não encontrado: {caminho}")
+        sys.exit(1)
+
+    desde = datetime.fromisoformat(args.desde).timestamp() if args.desde else None
+    relatorio = agregar(metrics.read_log(caminho), desde)
+
+    ordem = ['total'] + metrics.SPANS
+    for modo, dados in relatorio.items():
+        print(f"\nModo {modo} — tempos em ms ({dados['erros']} turnos com erro)")
+        print(f"{'Etapa':<15} | {'n':>6} | {'média':>9} | {'p50':>9} | {'p95':>9} | {'p99':>9}")
+        print("-" * 70)
+        for etapa in sorted(dados['etapas'], key=lambda nome: ordem.index(nome) if nome in ordem else len(ordem)):
+            valores = dados['etapas'][etapa]
+            print(f"{etapa:<15} | {valores['n']:>6} | {valores['media']:>9.1f} | {valores['p50']:>9.1f} | "
+                  f"{valores['p95']:>9.1f} | {valores['p99']:>9.1f}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nRelatório salvo em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Teste de estresse de escrita concorrente no GerenciadorCSV
+
+Inicia N processos escritores sobre o mesmo arquivo CSV, cada um com sua
+própria instância do gerenciador. Enquanto isso, um processo extra apaga
+periodicamente uma conversa reservada para ele, forçando regravações
+completas do arquivo no meio das inserções. Ao final verifica que nenhum
+turno dos escritores foi perdido ou duplicado.
+
+Uso:
+    python benchmarks/stress_concurrent_writes.py --processos 8 --turnos 200
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_reader import GerenciadorCSV  # noqa: E402
+
+CONVERSA_APAGADA = 'apagar'
+
+
+def escritor(caminho, processo, turnos, em_lote):
+    """Salva `turnos` registros identificados por processo e número do turno"""
+    gerenciador = GerenciadorCSV(caminho)
+    for turno in range(turnos):
+        registro = {
+            'conversation_id': f"processo_{processo}",
+            'data': f"{processo}-{turno}",
+            'total_tokens': turno,
+            'message': f"Mensagem {turno} do processo {processo}",
+            'response': "Resposta com vírgula, \"aspas\" e\nquebra de linha",
+        }
+        if em_lote and turno % 10 == 0:
+            gerenciador.save_multiple_data([registro])
+        else:
+            gerenciador.save_data(registro)
+
+
+def apagador(caminho, parar):
+    """Cria e apaga repetidamente uma conversa própria, regravando o arquivo"""
+    gerenciador = GerenciadorCSV(caminho)
+    while not parar.is_set():
+        gerenciador.save_data({'conversation_id': CONVERSA_APAGADA, 'data': 'x'})
+        gerenciador.delete_conversation(CONVERSA_APAGADA)
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processos', type=int, default=8)
+    parser.add_argument('--turnos', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'dados.csv')
+        parar = multiprocessing.Event()
+
+        processo_apagador = multiprocessing.Process(target=apagador, args=(caminho, parar))
+        processo_apagador.start()
+
+        inicio = time.perf_counter()
+        escritores = [
+            multiprocessing.Process(target=escritor, args=(caminho, i, args.turnos, i % 2 == 0))
+            for i in range(args.processos)
+        ]
+        for processo in escritores:
+            processo.start()
+        for processo in escritores:
+            processo.join()
+        duracao = time.perf_counter() - inicio
+
+        parar.set()
+        processo_apagador.join()
+
+        registros = GerenciadorCSV(caminho).get_data()
+        chaves = [r['data'] for r in registros if r['conversation_id'] != CONVERSA_APAGADA]
+        esperado = {f"{p}-{t}" for p in range(args.processos) for t in range(args.turnos)}
+
+        perdidos = esperado - set(chaves)
+        duplicados = len(chaves) - len(set(chaves))
+        total = args.processos * args.turnos
+
+        print(f"Processos: {args.processos} | Turnos por processo: {args.turnos}")
+        print(f"Tempo: {duracao:.2f}s | Vazão: {total / duracao:.0f} turnos/s")
+        print(f"Perdidos: {len(perdidos)} | Duplicados: {duplicados}")
+
+        if perdidos or duplicados or any(p.exitcode for p in escritores):
+            print("❌ FALHA")
+            sys.exit(1)
+        print("✓ Nenhum turno perdido")
+
+
+if __name__ == '__main__':
+    main()
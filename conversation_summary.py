@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# Fields kept for every conversation, in display order
+SUMMARY_FIELDS = [
+    'conversation_id', 'data', 'num_messages', 'total_tokens',
+    'input_cost_usd', 'output_cost_usd', 'first_message',
+]
+
+# Record columns needed to build a summary from scratch
+SOURCE_COLUMNS = ['conversation_id', 'data', 'message', 'total_tokens', 'input_cost_usd', 'output_cost_usd']
+
+
+def _plain(value):
+    """Convert numpy scalars to built-in Python values (e.g. for JSON)."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _number(value) -> float:
+    """Return value as a number, treating missing values as zero."""
+    if value is None or value != value:
+        return 0
+    return _plain(value)
+
+
+class ConversationSummary:
+    """
+    Per-conversation aggregates (first timestamp, turn count, token and cost
+    sums, first message) maintained incrementally as records are written,
+    so listing conversations does not scan every turn.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict]] = None):
+        """
+        Args:
+            entries: existing {conversation key: summary entry} mapping to
+                update in place (e.g. a manifest section)
+        """
+        self.entries = entries if entries is not None else {}
+
+    @staticmethod
+    def key(conversation_id) -> str:
+        """Return the summary key of a conversation id."""
+        if conversation_id is None or conversation_id != conversation_id:
+            return ''
+        return str(conversation_id)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'ConversationSummary':
+        """Build a summary from records in storage order."""
+        summary = cls()
+        summary.add_records(records)
+        return summary
+
+    @classmethod
+    def from_dataframe(cls, frame: pd.DataFrame) -> 'ConversationSummary':
+        """Build a summary from a DataFrame of records in storage order."""
+        summary = cls()
+        if frame is None or frame.empty or 'conversation_id' not in frame.columns:
+            return summary
+
+        columns = [column for column in SOURCE_COLUMNS if column in frame.columns]
+        grouped = frame[columns].groupby('conversation_id', sort=False, dropna=False)
+        first = grouped.first()
+        counts = grouped.size()
+        totals = [column for column in ('total_tokens', 'input_cost_usd', 'output_cost_usd') if column in columns]
+        sums = grouped[totals].sum()
+
+        for position, conversation_id in enumerate(counts.index):
+            row = first.iloc[position]
+            total = sums.iloc[position]
+            summary.entries[cls.key(conversation_id)] = {
+                'conversation_id': _plain(conversation_id),
+                'data': _plain(row.get('data')),
+                'num_messages': int(counts.iloc[position]),
+                'total_tokens': _number(total.get('total_tokens')),
+                'input_cost_usd': _number(total.get('input_cost_usd')),
+                'output_cost_usd': _number(total.get('output_cost_usd')),
+                'first_message': _plain(row.get('message')),
+            }
+        return summary
+
+    def add_records(self, records: Iterable[Dict]):
+        """Fold newly written records into the summary."""
+        for record in records:
+            conversation_id = record.get('conversation_id')
+            entry = self.entries.get(self.key(conversation_id))
+            if entry is None:
+                entry = self.entries[self.key(conversation_id)] = {
+                    'conversation_id': _plain(conversation_id),
+                    'data': _plain(record.get('data')),
+                    'num_messages': 0,
+                    'total_tokens': 0,
+                    'input_cost_usd': 0.0,
+                    'output_cost_usd': 0.0,
+                    'first_message': _plain(record.get('message')),
+                }
+            entry['num_messages'] += 1
+            entry['total_tokens'] += _number(record.get('total_tokens'))
+            entry['input_cost_usd'] += _number(record.get('input_cost_usd'))
+            entry['output_cost_usd'] += _number(record.get('output_cost_usd'))
+
+    def remove(self, conversation_id):
+        """Drop a deleted conversation from the summary."""
+        self.entries.pop(self.key(conversation_id), None)
+
+    def get(self, conversation_id) -> Optional[Dict]:
+        """Return the summary entry of a conversation."""
+        return self.entries.get(self.key(conversation_id))
+
+    def to_records(self) -> List[Dict]:
+        """Return one summary dictionary per conversation."""
+        return [{field: entry.get(field) for field in SUMMARY_FIELDS} for entry in self.entries.values()]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the summary as a DataFrame with SUMMARY_FIELDS columns."""
+        return pd.DataFrame(self.to_records(), columns=SUMMARY_FIELDS)
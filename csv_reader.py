@@ -1,6 +1,180 @@
 import pandas as pd
+import functools
+import io
 import os
-from typing import List, Dict, Optional
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import metrics
+from conversation_summary import ConversationSummary
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def resolve_data_path(file_path: str) -> str:
+    """
+    Return the path used for a store. If only a filename is provided, it is
+    placed under a `data/` folder next to this module.
+    """
+    if os.path.dirname(file_path):
+        return file_path
+
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    data_folder = os.path.join(root_dir, 'data')
+
+    if not os.path.exists(data_folder):
+        os.makedirs(data_folder)
+
+    return os.path.join(data_folder, file_path)
+
+
+def _lock_file(lock_file, shared: bool = False):
+    """Block until an OS-level lock on an open file is acquired."""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    else:
+        # msvcrt has no shared locks and only retries for ~10s per call
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+
+def _unlock_file(lock_file):
+    """Release a lock taken with _lock_file."""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(lock_path: str, shared: bool = False):
+    """
+    Hold an OS-level lock on `lock_path` for the duration of the block,
+    coordinating processes that share a file.
+
+    Args:
+        lock_path: path of the lock file (created if missing)
+        shared: take a shared (reader) lock instead of an exclusive one
+    """
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    with open(lock_path, 'a+b') as lock_file:
+        _lock_file(lock_file, shared)
+        try:
+            yield
+        finally:
+            _unlock_file(lock_file)
+
+
+def filter_frame(frame: pd.DataFrame, columns: Optional[List[str]] = None,
+                 filter_criteria: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Keep the rows of `frame` matching all key/value pairs in filter_criteria
+    (unknown columns are ignored, as in search_data), then keep only
+    `columns` when given.
+    """
+    for key, value in (filter_criteria or {}).items():
+        if key in frame.columns:
+            frame = frame[frame[key] == value]
+    if columns is not None:
+        frame = frame[[column for column in columns if column in frame.columns]]
+    return frame
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read-only view of the first `size` bytes of an open binary file."""
+
+    def __init__(self, file, size: int):
+        self._file = file
+        self._remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._file.read(min(len(buffer), self._remaining))
+        self._remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def iter_csv_chunks(file_path: str, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                    filter_criteria: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield the records of a CSV store as DataFrames of at most `chunksize`
+    rows, without loading the whole file. Only `columns` (plus the filtered
+    ones) are parsed, and chunks are filtered before being yielded.
+
+    The file is read as it was when iteration started: rewrites replace the
+    file atomically and appends land past the size taken under the shared
+    lock, so concurrent writers never produce torn rows.
+
+    Args:
+        file_path: filename or full path of the CSV file
+        chunksize: maximum number of rows read at a time
+        columns: columns to return (all when None)
+        filter_criteria: equality filters applied to every chunk
+    """
+    file_path = resolve_data_path(file_path)
+    if not os.path.exists(file_path):
+        return
+
+    with file_lock(file_path + '.lock', shared=True):
+        file = open(file_path, 'rb')
+        size = os.fstat(file.fileno()).st_size
+
+    with file:
+        if size == 0:
+            return
+        usecols = None
+        if columns is not None:
+            wanted = set(columns) | set(filter_criteria or {})
+            usecols = lambda column: column in wanted  # noqa: E731
+
+        reader = io.BufferedReader(_BoundedReader(file, size))
+        for chunk in pd.read_csv(reader, chunksize=chunksize, usecols=usecols):
+            chunk = filter_frame(chunk, columns, filter_criteria)
+            if not chunk.empty:
+                yield chunk
+
+
+def _synchronized(method):
+    """Run the method while holding the instance lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _write_locked(method):
+    """
+    Run a write while holding the instance lock and the cross-process file
+    lock, after merging the changes other processes made to the file.
+    Returns False when the lock cannot be taken, like a failed write.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            try:
+                with self._file_lock():
+                    self.refresh()
+                    return method(self, *args, **kwargs)
+            except OSError as e:
+                print(f"Error locking file: {e}")
+                return False
+    return wrapper
 
 
 class GerenciadorCSV:
@@ -8,27 +182,36 @@ class GerenciadorCSV:
     Manager for CSV data using pandas. Stores and retrieves dictionaries.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, append_mode: bool = True,
+                 index_columns: Optional[List[str]] = None):
         """
         Initialize manager with CSV file path. If only a filename is provided,
         the file will be created under a `data/` folder next to this module.
 
         Args:
             file_path: filename or full path for the CSV file
+            append_mode: when True, new records are appended to the end of the
+                file instead of rewriting the whole CSV on every save
+            index_columns: columns with a maintained value -> row positions
+                index used by search_data (defaults to ['conversation_id'])
         """
-        # If only a filename was provided (no directory), place it in ./data
-        if not os.path.dirname(file_path):
-            root_dir = os.path.dirname(os.path.abspath(__file__))
-            data_folder = os.path.join(root_dir, 'data')
-
-            if not os.path.exists(data_folder):
-                os.makedirs(data_folder)
-
-            self.file_path = os.path.join(data_folder, file_path)
-        else:
-            self.file_path = file_path
+        self.file_path = resolve_data_path(file_path)
+        # Shared instances are used from several Streamlit script threads
+        self._lock = threading.RLock()
+        # (inode, size, mtime) and header line of the file as last read or written
+        self._file_state = None
+        self._file_header = b''
+        self._file_lock_depth = 0
 
-        self.data_frame = None
+        self.append_mode = append_mode
+        self._data_frame = None
+        # Records already written to disk but not yet merged into the frame
+        self._pending_records: List[Dict] = []
+        self.index_columns = list(index_columns) if index_columns is not None else ['conversation_id']
+        # Built lazily on first lookup: column -> {value: [row positions]}
+        self._indexes: Dict[str, Dict] = {}
+        # Per-conversation aggregates, built on first request and kept up to date on append
+        self._summary: Optional[ConversationSummary] = None
 
         # Load existing file if present
         if os.path.exists(self.file_path):
@@ -36,32 +219,302 @@ class GerenciadorCSV:
         else:
             self.data_frame = pd.DataFrame()
     
+    @property
+    @_synchronized
+    def data_frame(self) -> pd.DataFrame:
+        """In-memory DataFrame, merging appended records lazily on access."""
+        if self._pending_records:
+            self._merge_pending()
+        return self._data_frame
+
+    @data_frame.setter
+    def data_frame(self, value: pd.DataFrame):
+        self._pending_records = []
+        self._indexes = {}
+        self._summary = None
+        self._data_frame = value
+
+    def _merge_pending(self):
+        """Merge appended records into the DataFrame with a single concat."""
+        new_df = pd.DataFrame(self._pending_records)
+        self._pending_records = []
+
+        if self._data_frame is None or self._data_frame.empty:
+            self._data_frame = new_df
+        else:
+            self._data_frame = pd.concat([self._data_frame, new_df], ignore_index=True)
+
+    def _known_columns(self) -> List[str]:
+        """Return the columns currently present in the CSV header."""
+        columns = list(self._data_frame.columns) if self._data_frame is not None else []
+        for record in self._pending_records:
+            for key in record:
+                if key not in columns:
+                    columns.append(key)
+        return columns
+
+    def _get_index(self, column: str) -> Dict:
+        """Return the index for a column, building it on first use."""
+        if column not in self._indexes:
+            frame = self.data_frame
+            if frame is None or column not in frame.columns:
+                self._indexes[column] = {}
+            else:
+                groups = frame.groupby(column, sort=False).indices
+                self._indexes[column] = {key: list(positions) for key, positions in groups.items()}
+        return self._indexes[column]
+
+    def _index_records(self, records: List[Dict], start: int):
+        """Add appended records (starting at row position `start`) to built indexes and the summary."""
+        if self._summary is not None:
+            self._summary.add_records(records)
+        for column, index in self._indexes.items():
+            for offset, record in enumerate(records):
+                value = record.get(column)
+                if value is not None and value == value:
+                    index.setdefault(value, []).append(start + offset)
+
+    def _rows_at(self, positions: List[int]) -> pd.DataFrame:
+        """Return the rows at the given positions without merging pending records."""
+        base = len(self._data_frame) if self._data_frame is not None else 0
+        frame_positions = [pos for pos in positions if pos < base]
+        pending = [self._pending_records[pos - base] for pos in positions if pos >= base]
+
+        parts = []
+        if frame_positions:
+            parts.append(self._data_frame.iloc[frame_positions])
+        if pending:
+            parts.append(pd.DataFrame(pending))
+        if not parts:
+            return pd.DataFrame(columns=self._known_columns())
+        if len(parts) == 1:
+            return parts[0]
+        return pd.concat(parts, ignore_index=True)
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """
+        Hold the lock file next to the CSV, coordinating writers (exclusive)
+        and incremental readers (shared) across processes. Re-entrant within
+        this instance.
+        """
+        if self._file_lock_depth:
+            yield
+            return
+
+        with file_lock(self.file_path + '.lock', shared):
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+
+    def _stat_file(self):
+        """Return (inode, size, mtime) of the CSV, or None if it does not exist."""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _read_header(self) -> bytes:
+        """Return the first line of the CSV file."""
+        try:
+            with open(self.file_path, 'rb') as file:
+                return file.readline()
+        except OSError:
+            return b''
+
+    def _remember_file_state(self, state=None):
+        """Record the file state after this instance read or wrote it."""
+        self._file_state = state if state is not None else self._stat_file()
+        self._file_header = self._read_header()
+
     def _load_file(self):
         """Load CSV into the internal DataFrame."""
         try:
-            self.data_frame = pd.read_csv(self.file_path)
+            # Retry if another writer changed the file while it was being read
+            for _ in range(3):
+                state = self._stat_file()
+                with metrics.span(metrics.DISK_READ):
+                    try:
+                        self.data_frame = pd.read_csv(self.file_path)
+                    except pd.errors.EmptyDataError:
+                        # Created by another writer that has not written the header yet
+                        self.data_frame = pd.DataFrame()
+                if self._stat_file() == state:
+                    break
+            self._remember_file_state(state)
         except Exception as e:
             print(f"Error loading file: {e}")
             self.data_frame = pd.DataFrame()
+            self._remember_file_state()
+
+    def _load_tail(self, offset: int) -> bool:
+        """
+        Read rows appended after `offset` into the pending records.
+        Returns False when the tail is still being written.
+        """
+        state = self._stat_file()
+        with open(self.file_path, 'rb') as file:
+            file.seek(offset)
+            tail = file.read(state[1] - offset)
+
+        if not tail.endswith(b'\n'):
+            return False
+
+        records = pd.read_csv(io.BytesIO(self._file_header + tail)).to_dict('records')
+        self._index_records(records, self.get_records_count())
+        self._pending_records.extend(records)
+        self._file_state = state
+        return True
+
+    @_synchronized
+    def refresh(self) -> bool:
+        """
+        Reload changes made to the file by other instances or processes.
+
+        Rows appended since the last read are loaded incrementally; any other
+        change (rewrite, truncation, new header) triggers a full reload.
+
+        Returns:
+            True when data was reloaded
+        """
+        state = self._stat_file()
+        if state == self._file_state:
+            return False
+
+        with self._file_lock(shared=True):
+            state = self._stat_file()
+            if state == self._file_state:
+                return False
+            if state is None:
+                # Removed by another process (e.g. a rotated Parquet hot segment)
+                self.data_frame = pd.DataFrame()
+                self._remember_file_state()
+                return True
+
+            previous = self._file_state
+            if (previous is not None and state[0] == previous[0] and state[1] > previous[1]
+                    and self._file_header and self._read_header() == self._file_header):
+                try:
+                    return self._load_tail(previous[1])
+                except Exception as e:
+                    print(f"Error loading appended rows, reloading file: {e}")
+
+            self._load_file()
+        return True
     
     def _save_file(self):
-        """Save the internal DataFrame to the CSV file."""
+        """
+        Save the internal DataFrame to the CSV file. The data is written to a
+        temporary file that atomically replaces the CSV, so readers never see
+        a partially written file.
+        """
         try:
-            self.data_frame.to_csv(self.file_path, index=False)
+            directory = os.path.dirname(os.path.abspath(self.file_path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.file_path), suffix='.tmp')
+            os.close(fd)
+            try:
+                metrics.write_file(temp_path, lambda file: self.data_frame.to_csv(file, index=False))
+                mode = os.stat(self.file_path).st_mode if os.path.exists(self.file_path) else 0o644
+                os.chmod(temp_path, mode & 0o777)
+                os.replace(temp_path, self.file_path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self._remember_file_state()
             return True
         except Exception as e:
             print(f"Error saving file: {e}")
             return False
     
+    def _append_file(self, records: List[Dict]) -> bool:
+        """
+        Append records to the end of the CSV without rewriting it.
+
+        Falls back to a full rewrite when the records introduce columns that
+        are not in the current header.
+        """
+        columns = self._known_columns()
+        new_columns = [key for record in records for key in record if key not in columns]
+        file_missing = not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0
+
+        if columns and (new_columns or file_missing):
+            self._index_records(records, self.get_records_count())
+            self._pending_records.extend(records)
+            return self._save_file()
+
+        write_header = not columns
+        if write_header:
+            columns = list(dict.fromkeys(key for record in records for key in record))
+
+        try:
+            with metrics.span(metrics.SERIALIZATION):
+                new_df = pd.DataFrame(records, columns=columns)
+            metrics.write_file(self.file_path, lambda file: new_df.to_csv(file, header=write_header, index=False),
+                               mode='w' if write_header else 'a')
+            self._remember_file_state()
+            self._index_records(records, self.get_records_count())
+            self._pending_records.extend(records)
+            return True
+        except Exception as e:
+            print(f"Error appending to file: {e}")
+            return False
+
+    @_synchronized
     def get_data(self) -> List[Dict]:
         """Return all records as a list of dictionaries."""
         if self.data_frame is None or self.data_frame.empty:
             return []
         return self.data_frame.to_dict('records')
+
+    @_synchronized
+    def get_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Return a copy of all records as a DataFrame, limited to `columns` when given."""
+        if self.data_frame is None:
+            return pd.DataFrame()
+        if columns is not None:
+            return self.data_frame[[column for column in columns if column in self.data_frame.columns]].copy()
+        return self.data_frame.copy()
     
+    def iter_chunks(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                    filter_criteria: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Yield matching records as DataFrames of at most `chunksize` rows,
+        limited to `columns` when given. Rows are sliced from the in-memory
+        DataFrame, so only one chunk is copied at a time; use iter_csv_chunks
+        to stream a file without loading it.
+        """
+        with self._lock:
+            frame = self.data_frame
+            if frame is None or frame.empty:
+                return
+            # Narrow down to the rows of an indexed value before scanning
+            filter_criteria = dict(filter_criteria or {})
+            indexed_key = next((key for key in filter_criteria if key in self.index_columns and key in frame.columns), None)
+            if indexed_key is not None:
+                frame = self._rows_at(self._get_index(indexed_key).get(filter_criteria.pop(indexed_key), []))
+
+        for start in range(0, len(frame), chunksize):
+            chunk = filter_frame(frame.iloc[start:start + chunksize], columns, filter_criteria)
+            if not chunk.empty:
+                yield chunk.copy()
+
+    def iter_records(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                     filter_criteria: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield matching records one dictionary at a time, converting a chunk at a time."""
+        for chunk in self.iter_chunks(chunksize, columns, filter_criteria):
+            yield from chunk.to_dict('records')
+
+    @_write_locked
     def save_data(self, data: Dict) -> bool:
         """Save a single record (dictionary) into the CSV."""
         try:
+            if self.append_mode:
+                return self._append_file([data])
+
             new_df = pd.DataFrame([data])
 
             if self.data_frame.empty:
@@ -74,9 +527,13 @@ class GerenciadorCSV:
             print(f"Error saving data: {e}")
             return False
     
+    @_write_locked
     def save_multiple_data(self, data_list: List[Dict]) -> bool:
         """Save multiple records (list of dicts) into the CSV."""
         try:
+            if self.append_mode:
+                return self._append_file(list(data_list)) if data_list else True
+
             new_df = pd.DataFrame(data_list)
 
             if self.data_frame.empty:
@@ -89,6 +546,7 @@ class GerenciadorCSV:
             print(f"Error saving multiple data: {e}")
             return False
     
+    @_write_locked
     def update_data(self, index: int, data: Dict) -> bool:
         """Update a record at a given index with the provided dictionary."""
         try:
@@ -97,13 +555,17 @@ class GerenciadorCSV:
                 return False
 
             for key, value in data.items():
+                if key in self._indexes:
+                    self._reindex_row(key, index, value)
                 self.data_frame.at[index, key] = value
+            self._summary = None
 
             return self._save_file()
         except Exception as e:
             print(f"Error updating data: {e}")
             return False
     
+    @_write_locked
     def delete_data(self, index: int) -> bool:
         """Delete the record at the specified index."""
         try:
@@ -111,18 +573,65 @@ class GerenciadorCSV:
                 print(f"Index {index} out of range")
                 return False
 
+            # Row positions after the deleted one shift, indexes are rebuilt lazily
             self.data_frame = self.data_frame.drop(index).reset_index(drop=True)
             return self._save_file()
         except Exception as e:
             print(f"Error deleting data: {e}")
             return False
     
+    def _reindex_row(self, column: str, position: int, value):
+        """Move a row to a new key in the index of `column`."""
+        index = self._indexes[column]
+        old_value = self.data_frame.at[position, column]
+        if old_value in index:
+            index[old_value].remove(position)
+            if not index[old_value]:
+                del index[old_value]
+        if value is not None and value == value:
+            positions = index.setdefault(value, [])
+            positions.append(position)
+            positions.sort()
+
+    @_write_locked
+    def delete_conversation(self, conversation_id) -> bool:
+        """Delete every record of a conversation."""
+        try:
+            if 'conversation_id' not in self.get_columns():
+                return True
+
+            frame = self.data_frame
+            summary = self._summary
+            self.data_frame = frame[frame['conversation_id'] != conversation_id].reset_index(drop=True)
+            if summary is not None:
+                summary.remove(conversation_id)
+                self._summary = summary
+            return self._save_file()
+        except Exception as e:
+            print(f"Error deleting conversation: {e}")
+            return False
+
+    @_synchronized
     def search_data(self, filter_criteria: Dict) -> List[Dict]:
-        """Return records matching all key/value pairs in filter_criteria."""
+        """
+        Return records matching all key/value pairs in filter_criteria.
+
+        When a criterion targets an indexed column, only the rows for that
+        value are read instead of scanning the whole DataFrame.
+        """
         try:
-            result = self.data_frame.copy()
+            columns = self._known_columns()
+            indexed_key = next((key for key in filter_criteria if key in self.index_columns and key in columns), None)
+
+            if indexed_key is not None:
+                positions = self._get_index(indexed_key).get(filter_criteria[indexed_key], [])
+                result = self._rows_at(positions)
+            else:
+                result = self.data_frame
 
             for key, value in filter_criteria.items():
+                if key == indexed_key:
+                    continue
                 if key in result.columns:
                     result = result[result[key] == value]
 
@@ -131,6 +640,7 @@ class GerenciadorCSV:
             print(f"Error searching data: {e}")
             return []
     
+    @_write_locked
     def clear_data(self) -> bool:
         """Clear all data from the CSV (resets to empty)."""
         try:
@@ -140,10 +650,23 @@ class GerenciadorCSV:
             print(f"Error clearing data: {e}")
             return False
     
+    @_synchronized
+    def get_conversation_summary(self) -> pd.DataFrame:
+        """
+        Return one row per conversation with its first timestamp, turn count,
+        token and cost sums and first message.
+        """
+        if self._summary is None:
+            self._summary = ConversationSummary.from_dataframe(self.data_frame)
+        return self._summary.to_dataframe()
+
+    @_synchronized
     def get_records_count(self) -> int:
         """Return number of records in the CSV."""
-        return len(self.data_frame) if self.data_frame is not None else 0
+        count = len(self._data_frame) if self._data_frame is not None else 0
+        return count + len(self._pending_records)
 
+    @_synchronized
     def get_columns(self) -> List[str]:
         """Return a list with the column names in the DataFrame."""
-        return list(self.data_frame.columns) if self.data_frame is not None else []
+        return self._known_columns()
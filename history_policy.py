@@ -0,0 +1,184 @@
+"""
+Políticas de histórico: decidem quais mensagens da conversa são enviadas à API
+
+O contexto completo continua em ConversationContext.messages (para a interface
+e para a persistência); a política só reduz o que é reenviado a cada turno,
+evitando que tokens de prompt e custo cresçam sem limite em conversas longas.
+A mensagem de sistema é sempre mantida.
+"""
+import os
+
+# Tokens extras por mensagem (papel e separadores) no formato de chat
+TOKENS_POR_MENSAGEM = 4
+
+
+def estimate_tokens(text):
+    """Estima os tokens de um texto (~4 caracteres por token)"""
+    return (len(text or '') + 3) // 4
+
+
+def estimate_messages_tokens(messages):
+    """Estima os tokens de prompt de uma lista de mensagens"""
+    return sum(estimate_tokens(msg.get("content")) + TOKENS_POR_MENSAGEM for msg in messages)
+
+
+def _split_system(messages):
+    """Separa as mensagens de sistema das mensagens da conversa"""
+    system = [msg for msg in messages if msg["role"] == "system"]
+    conversation = [msg for msg in messages if msg["role"] != "system"]
+    return system, conversation
+
+
+def extractive_summary(previous_summary, messages, max_chars=120, max_lines=20):
+    """
+    Resumo simples, sem chamada à API: mantém o início de cada mensagem e
+    apenas as `max_lines` linhas mais recentes, para que o resumo não cresça
+
+    Args:
+        previous_summary: Resumo acumulado até aqui ('' se não houver)
+        messages: Mensagens a incorporar ao resumo
+        max_chars: Caracteres mantidos de cada mensagem
+        max_lines: Linhas mantidas no resumo
+
+    Returns:
+        str: Novo resumo
+    """
+    papeis = {"user": "Vendedor", "assistant": "Comprador"}
+    linhas = previous_summary.split("\n") if previous_summary else []
+    for msg in messages:
+        conteudo = (msg.get("content") or "").replace("\n", " ")
+        if len(conteudo) > max_chars:
+            conteudo = conteudo[:max_chars] + "..."
+        linhas.append(f"{papeis.get(msg['role'], msg['role'])}: {conteudo}")
+    return "\n".join(linhas[-max_lines:])
+
+
+class HistoryPolicy:
+    """Política padrão: envia o histórico completo"""
+
+    name = "full"
+
+    def select(self, messages):
+        """
+        Retorna as mensagens a enviar à API
+
+        Args:
+            messages: Histórico completo, terminando na mensagem atual do usuário
+        """
+        return list(messages)
+
+    def reset(self):
+        """Descarta o estado da política (ex.: ao limpar o contexto)"""
+
+
+class SlidingWindowPolicy(HistoryPolicy):
+    """Envia apenas os últimos `max_turns` turnos (pares vendedor/comprador)"""
+
+    name = "window"
+
+    def __init__(self, max_turns=10):
+        self.max_turns = max_turns
+
+    def select(self, messages):
+        system, conversation = _split_system(messages)
+        # +1 para a mensagem atual do usuário
+        return system + conversation[-(2 * self.max_turns + 1):]
+
+
+class TokenBudgetPolicy(HistoryPolicy):
+    """Envia as mensagens mais recentes que cabem em `max_tokens` tokens estimados"""
+
+    name = "budget"
+
+    def __init__(self, max_tokens=4000):
+        self.max_tokens = max_tokens
+
+    def select(self, messages):
+        system, conversation = _split_system(messages)
+        budget = self.max_tokens - estimate_messages_tokens(system)
+
+        selected = []
+        for msg in reversed(conversation):
+            cost = estimate_messages_tokens([msg])
+            # A mensagem atual sempre vai, mesmo estourando o orçamento
+            if selected and cost > budget:
+                break
+            selected.append(msg)
+            budget -= cost
+        return system + selected[::-1]
+
+
+class RollingSummaryPolicy(HistoryPolicy):
+    """
+    Mantém os últimos `keep_turns` turnos completos e substitui os anteriores
+    por um resumo, atualizado a cada `summarize_every` turnos que saem da janela
+    """
+
+    name = "summary"
+
+    def __init__(self, keep_turns=6, summarize_every=4, summarize=None):
+        """
+        Args:
+            keep_turns: Turnos recentes enviados sem resumo
+            summarize_every: Turnos antigos acumulados que disparam um novo resumo
+            summarize: Função (resumo_anterior, mensagens) -> novo resumo;
+                por padrão usa extractive_summary, sem chamada à API
+        """
+        self.keep_turns = keep_turns
+        self.summarize_every = summarize_every
+        self.summarize = summarize or extractive_summary
+        self.reset()
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_count = 0
+
+    def select(self, messages):
+        system, conversation = _split_system(messages)
+        if self.summarized_count > len(conversation):
+            # Histórico foi limpo desde o último resumo
+            self.reset()
+
+        old_end = len(conversation) - (2 * self.keep_turns + 1)
+        if old_end - self.summarized_count >= 2 * self.summarize_every:
+            self.summary = self.summarize(self.summary, conversation[self.summarized_count:old_end])
+            self.summarized_count = old_end
+
+        if not self.summary:
+            return system + conversation
+        resumo = {"role": "system", "content": f"Resumo da conversa até aqui:\n{self.summary}"}
+        return system + [resumo] + conversation[self.summarized_count:]
+
+
+HISTORY_POLICIES = {
+    "full": HistoryPolicy,
+    "window": SlidingWindowPolicy,
+    "budget": TokenBudgetPolicy,
+    "summary": RollingSummaryPolicy,
+}
+
+
+def policy_from_env(summarize=None):
+    """
+    Cria a política configurada em HISTORY_POLICY (full, window, budget ou
+    summary), com HISTORY_MAX_TURNS, HISTORY_MAX_TOKENS e
+    HISTORY_SUMMARIZE_EVERY
+
+    Args:
+        summarize: Função de resumo usada pela política summary
+    """
+    name = (os.environ.get("HISTORY_POLICY") or "full").strip().lower()
+    if name not in HISTORY_POLICIES:
+        raise ValueError(f"Política de histórico desconhecida '{name}'. Opções: {', '.join(HISTORY_POLICIES)}")
+
+    if name == "window":
+        return SlidingWindowPolicy(int(os.environ.get("HISTORY_MAX_TURNS", 10)))
+    if name == "budget":
+        return TokenBudgetPolicy(int(os.environ.get("HISTORY_MAX_TOKENS", 4000)))
+    if name == "summary":
+        return RollingSummaryPolicy(
+            keep_turns=int(os.environ.get("HISTORY_MAX_TURNS", 6)),
+            summarize_every=int(os.environ.get("HISTORY_SUMMARIZE_EVERY", 4)),
+            summarize=summarize,
+        )
+    return HistoryPolicy()
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job:
+    """A unit of work submitted to a JobQueue and its outcome."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = PENDING
+        # Chunks produced so far when the work yields results incrementally
+        self.chunks: List = []
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    @property
+    def text(self) -> str:
+        """Text produced so far (the chunks joined)."""
+        return ''.join(str(chunk) for chunk in self.chunks)
+
+
+class JobQueue:
+    """
+    Runs submitted callables on a fixed pool of worker threads, so callers
+    get a job id back immediately and poll for the outcome. The pool size
+    caps how many jobs (e.g. API calls) run at once in the process.
+
+    When a callable returns an iterator (such as a streaming response), the
+    worker consumes it and exposes each item in Job.chunks as it arrives.
+    Finished jobs are kept for `result_ttl` seconds unless discarded.
+    """
+
+    def __init__(self, max_workers: int = 4, result_ttl: float = 3600):
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-worker')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable, *args, **kwargs) -> str:
+        """Queue `func(*args, **kwargs)` and return the job id."""
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, func: Callable, args, kwargs):
+        """Execute a job on a worker thread."""
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            result = func(*args, **kwargs)
+            if hasattr(result, '__next__'):
+                for chunk in result:
+                    job.chunks.append(chunk)
+                result = job.chunks
+            job.result = result
+            job.status = DONE
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or already discarded."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str):
+        """Forget a job once its outcome has been consumed."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _purge(self):
+        """Drop finished jobs older than result_ttl. Caller holds the lock."""
+        limit = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < limit]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict:
+        """Return job counts by status and the pool size."""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'workers': self.max_workers,
+            PENDING: statuses.count(PENDING),
+            RUNNING: statuses.count(RUNNING),
+            DONE: statuses.count(DONE),
+            FAILED: statuses.count(FAILED),
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers after the queued jobs finish."""
+        self._executor.shutdown(wait=wait)
+
+
+_shared_queue: Optional[JobQueue] = None
+_shared_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Return the process-wide job queue shared by every Streamlit session.
+    Configured by LLM_WORKERS (concurrent jobs, default 4) and
+    JOB_RESULT_TTL (seconds finished jobs are kept, default 3600).
+    """
+    global _shared_queue
+    with _shared_queue_lock:
+        if _shared_queue is None:
+            _shared_queue = JobQueue(
+                max_workers=int(os.environ.get('LLM_WORKERS', 4)),
+                result_ttl=float(os.environ.get('JOB_RESULT_TTL', 3600)),
+            )
+        return _shared_queue
@@ -0,0 +1,287 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Spans recorded during a turn, in display order
+API = 'api'                      # request until the response (or the first streamed bytes) arrives
+STREAM = 'stream'                # receiving the rest of a streamed response
+STORAGE = 'storage'              # saving the turn through the store (includes the two below)
+SERIALIZATION = 'serialization'  # turning records into CSV text
+DISK_WRITE = 'disk_write'        # writing that text to disk
+DISK_READ = 'disk_read'          # reading and parsing the store file
+RENDER = 'render'                # Streamlit script run that shows the turn
+SPANS = [API, STREAM, STORAGE, SERIALIZATION, DISK_WRITE, DISK_READ, RENDER]
+
+DEFAULT_LOG = 'metrics.jsonl'
+
+_current_turn: ContextVar = ContextVar('current_turn', default=None)
+
+
+class Turn:
+    """Wall-clock time of one conversation turn, broken down into spans."""
+
+    def __init__(self, conversation_id=None, mode: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.conversation_id = conversation_id
+        self.mode = mode
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.total_ms: Optional[float] = None
+        self.status = 'running'
+        self.spans: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float):
+        """Add `ms` milliseconds to a span (spans of the same name accumulate)."""
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def finish(self, status: str = 'ok'):
+        """Record the total duration and the outcome."""
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+        self.status = status
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = {name: round(ms, 3) for name, ms in self.spans.items()}
+        return {
+            'type': 'turn',
+            'turn_id': self.id,
+            'conversation_id': self.conversation_id,
+            'mode': self.mode,
+            'started_at': self.started_at,
+            'status': self.status,
+            'total_ms': round(self.total_ms, 3) if self.total_ms is not None else None,
+            'spans': spans,
+        }
+
+
+def current_turn() -> Optional[Turn]:
+    """Return the turn being measured in this thread or task, if any."""
+    return _current_turn.get()
+
+
+@contextmanager
+def turn(conversation_id=None, mode: Optional[str] = None):
+    """
+    Measure a turn: spans recorded inside the block are attributed to it, and
+    the finished turn is appended to the metrics log.
+    """
+    current = Turn(conversation_id, mode)
+    token = _current_turn.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.finish('error')
+        raise
+    else:
+        current.finish()
+    finally:
+        _current_turn.reset(token)
+        log_record(current.to_dict())
+
+
+def _step(current: Turn, func: Callable, *args):
+    """Call `func` with `current` as the current turn, then restore the caller's turn."""
+    token = _current_turn.set(current)
+    try:
+        return func(*args)
+    finally:
+        _current_turn.reset(token)
+
+
+def instrument_turn(mode: str) -> Callable:
+    """
+    Decorate a conversation's send method (plain or generator) so each call
+    is measured as a turn. The turn is exposed as `self.last_turn` as soon as
+    the call starts, and is complete once the call returns.
+
+    A generator is only inside its turn while it runs: the turn is set and
+    reset around each step, so the consumer's code between yields is not
+    attributed to it and the generator can be closed from another thread.
+    """
+    def decorator(method):
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator_wrapper(self, *args, **kwargs):
+                current = Turn(getattr(self, 'conversation_id', None), mode)
+                self.last_turn = current
+                inner = method(self, *args, **kwargs)
+                status = 'error'
+                try:
+                    resume, value = inner.send, None
+                    while True:
+                        try:
+                            item = _step(current, resume, value)
+                        except StopIteration as stop:
+                            status = 'ok'
+                            return stop.value
+                        try:
+                            value = yield item
+                            resume = inner.send
+                        except GeneratorExit:
+                            _step(current, inner.close)
+                            raise
+                        except BaseException as error:
+                            resume, value = inner.throw, error
+                finally:
+                    current.finish(status)
+                    log_record(current.to_dict())
+            return generator_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with turn(getattr(self, 'conversation_id', None), mode) as current:
+                self.last_turn = current
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def span(name: str):
+    """Time the block and add it to the current turn; a no-op outside a turn."""
+    current = _current_turn.get()
+    if current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.add(name, (time.perf_counter() - start) * 1000)
+
+
+class _TimedFile:
+    """File proxy that accumulates the time spent in write calls."""
+
+    def __init__(self, file):
+        self._file = file
+        self.seconds = 0.0
+
+    def write(self, data):
+        start = time.perf_counter()
+        try:
+            return self._file.write(data)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+def write_file(path: str, write: Callable, mode: str = 'w'):
+    """
+    Open `path` as UTF-8 text and call `write(file)`. Inside a turn, the time
+    spent in the file's write calls and closing it is recorded as disk_write
+    and the rest (formatting the text) as serialization.
+    """
+    current = _current_turn.get()
+    file = open(path, mode, encoding='utf-8', newline='')
+    if current is None:
+        with file:
+            write(file)
+        return
+
+    timed = _TimedFile(file)
+    start = time.perf_counter()
+    try:
+        write(timed)
+    finally:
+        formatted = time.perf_counter() - start - timed.seconds
+        closing = time.perf_counter()
+        file.close()
+        timed.seconds += time.perf_counter() - closing
+        current.add(SERIALIZATION, formatted * 1000)
+        current.add(DISK_WRITE, timed.seconds * 1000)
+
+
+_log_lock = threading.Lock()
+
+
+def metrics_log_path() -> Optional[str]:
+    """
+    Return the metrics log file, or None when logging is disabled.
+
+    Logging is opt-in through METRICS_LOG: 1/on writes data/metrics.jsonl,
+    any other value is a path or a filename placed in data/. Unset or 0/off
+    disables the log.
+    """
+    value = os.environ.get('METRICS_LOG', '').strip()
+    if value.lower() in ('', '0', 'false', 'no', 'off'):
+        return None
+    if value.lower() in ('1', 'true', 'yes', 'on'):
+        value = DEFAULT_LOG
+    # Imported here: csv_reader records its own spans through this module
+    from csv_reader import resolve_data_path
+    return resolve_data_path(value)
+
+
+def _rotate_if_full(path: str):
+    """
+    Move the log to `<path>.1` (replacing the previous one) once it reaches
+    METRICS_LOG_MAX_MB (default 50). Caller holds the log lock.
+    """
+    max_bytes = float(os.environ.get('METRICS_LOG_MAX_MB', 50)) * 1024 * 1024
+    try:
+        if os.path.getsize(path) >= max_bytes:
+            os.replace(path, path + '.1')
+    except OSError:
+        pass
+
+
+def log_record(record: Dict) -> bool:
+    """Append one record as a JSON line to the metrics log."""
+    path = metrics_log_path()
+    if path is None:
+        return False
+    try:
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with _log_lock:
+            _rotate_if_full(path)
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(line)
+        return True
+    except Exception as e:
+        print(f"Error writing metrics log: {e}")
+        return False
+
+
+def log_render(ms: float, conversation_id=None, turn_id: Optional[str] = None, page: Optional[str] = None) -> bool:
+    """Append the duration of a Streamlit script run to the metrics log."""
+    return log_record({
+        'type': RENDER,
+        'turn_id': turn_id,
+        'conversation_id': conversation_id,
+        'page': page,
+        'started_at': time.time() - ms / 1000,
+        'total_ms': round(ms, 3),
+    })
+
+
+def read_log(path: Optional[str] = None):
+    """Yield the records of a metrics log, skipping malformed lines."""
+    path = path or metrics_log_path()
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Process-wide clients shared by every conversation, keyed by API key
+_clients: Dict[Optional[str], OpenAI] = {}
+# Async connections belong to the event loop that opened them, so async
+# clients are shared per loop
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _env_number(name: str, default: float) -> float:
+    """Return a numeric environment variable, or `default` when unset."""
+    value = os.environ.get(name, '').strip()
+    return float(value) if value else default
+
+
+def client_limits() -> httpx.Limits:
+    """
+    Return the connection pool limits for OpenAI clients, configured by
+    OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE_CONNECTIONS and
+    OPENAI_KEEPALIVE_EXPIRY (seconds an idle connection is kept open).
+    """
+    return httpx.Limits(
+        max_connections=int(_env_number('OPENAI_MAX_CONNECTIONS', 100)),
+        max_keepalive_connections=int(_env_number('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 20)),
+        keepalive_expiry=_env_number('OPENAI_KEEPALIVE_EXPIRY', 30.0),
+    )
+
+
+def client_timeout() -> httpx.Timeout:
+    """
+    Return the request timeouts for OpenAI clients, configured by
+    OPENAI_TIMEOUT (read/write/pool) and OPENAI_CONNECT_TIMEOUT.
+    """
+    return httpx.Timeout(_env_number('OPENAI_TIMEOUT', 60.0), connect=_env_number('OPENAI_CONNECT_TIMEOUT', 5.0))
+
+
+class ConnectionMetrics:
+    """
+    Counts requests sent by the shared clients and the TCP connections they
+    opened; every request that did not open a connection reused a pooled one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def _record(self, event_name: str):
+        """Count an httpcore trace event."""
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.connections_opened += 1
+
+    def _trace(self, event_name: str, info: Dict):
+        self._record(event_name)
+
+    async def _atrace(self, event_name: str, info: Dict):
+        self._record(event_name)
+
+    def on_request(self, request: httpx.Request):
+        """httpx request hook: count the request and trace its connection."""
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self._trace
+
+    async def on_async_request(self, request: httpx.Request):
+        """Async variant of on_request."""
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self._atrace
+
+    @property
+    def connections_reused(self) -> int:
+        """Number of requests served by an already open connection."""
+        return max(self.requests - self.connections_opened, 0)
+
+    def snapshot(self) -> Dict:
+        """Return the counters and the reuse ratio."""
+        with self._lock:
+            requests, opened = self.requests, self.connections_opened
+        reused = max(requests - opened, 0)
+        return {
+            'requests': requests,
+            'connections_opened': opened,
+            'connections_reused': reused,
+            'reuse_ratio': reused / requests if requests else 0.0,
+        }
+
+    def reset(self):
+        """Set every counter back to zero."""
+        with self._lock:
+            self.requests = 0
+            self.connections_opened = 0
+
+
+# Connection metrics of every client created by this module
+metrics = ConnectionMetrics()
+
+
+def create_openai_client(api_key: Optional[str] = None) -> OpenAI:
+    """
+    Create a new OpenAI client with the configured pool limits and timeouts.
+    Most callers should use get_openai_client instead.
+    """
+    http_client = httpx.Client(
+        limits=client_limits(),
+        timeout=client_timeout(),
+        event_hooks={'request': [metrics.on_request]},
+    )
+    # Retries are handled by rate_limiter, which shares the backoff across conversations
+    return OpenAI(api_key=api_key or os.environ.get('OPEN'), http_client=http_client, max_retries=0)
+
+
+def create_async_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Create a new AsyncOpenAI client with the configured pool limits and timeouts."""
+    http_client = httpx.AsyncClient(
+        limits=client_limits(),
+        timeout=client_timeout(),
+        event_hooks={'request': [metrics.on_async_request]},
+    )
+    return AsyncOpenAI(api_key=api_key or os.environ.get('OPEN'), http_client=http_client, max_retries=0)
+
+
+def get_openai_client(api_key: Optional[str] = None) -> OpenAI:
+    """
+    Return the process-wide OpenAI client, creating it on first use.
+
+    Every conversation shares its connection pool, so only the first request
+    pays for the TCP/TLS handshake and later ones reuse kept-alive
+    connections.
+
+    Args:
+        api_key: API key, defaults to the OPEN environment variable
+    """
+    api_key = api_key or os.environ.get('OPEN')
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = create_openai_client(api_key)
+        return client
+
+
+def get_async_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Return the AsyncOpenAI client shared by the running event loop. Outside
+    an event loop a new, unshared client is returned.
+
+    Args:
+        api_key: API key, defaults to the OPEN environment variable
+    """
+    api_key = api_key or os.environ.get('OPEN')
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return create_async_openai_client(api_key)
+
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = clients[api_key] = create_async_openai_client(api_key)
+        return client
+
+
+async def close_async_clients():
+    """Close the async clients shared by the running event loop."""
+    with _clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
@@ -1,8 +1,19 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import os
 from datetime import datetime
 
+from storage import get_storage
+
+# Perfil opcional da execução inteira da página (PROFILING=1 ou ?profile=1 na URL);
+# profiling só é importado quando o perfil foi pedido
+if os.environ.get("PROFILING") or st.query_params.get("profile"):
+    import profiling
+    if profiling.enabled(st.query_params):
+        profiling.show_summary(profiling.run_script(__file__, globals()))
+        st.stop()
+
 # Configuração da página
 st.set_page_config(
     page_title="Visualizar Conversas",
@@ -11,17 +22,9 @@ st.set_page_config(
 )
 
 # ===== FUNÇÕES AUXILIARES =====
-def carregar_conversas():
-    """Carrega as conversas do arquivo CSV"""
-    csv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'dados.csv')
-    if not os.path.exists(csv_path):
-        return None
-    try:
-        df = pd.read_csv(csv_path)
-        return df
-    except Exception as e:
-        st.error(f"Erro ao carregar arquivo: {e}")
-        return None
+def carregar_conversa(conversation_id):
+    """Carrega todas as mensagens de uma única conversa"""
+    return pd.DataFrame(get_storage('dados.csv').search_data({'conversation_id': conversation_id}))
 
 def formatar_data(data_str):
     """Formata a data para exibição"""
@@ -32,54 +35,50 @@ def formatar_data(data_str):
         return data_str
 
 def deletar_conversa(conversation_id):
-    """Deleta uma conversa específica do arquivo CSV"""
-    csv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'dados.csv')
-    
+    """Deleta uma conversa específica do armazenamento"""
     try:
-        # Carregar dados atuais
-        df = pd.read_csv(csv_path)
-        
-        # Filtrar dados removendo a conversa específica
-        df_filtrado = df[df['conversation_id'] != conversation_id]
-        
-        # Salvar arquivo atualizado
-        df_filtrado.to_csv(csv_path, index=False)
+        if not get_storage('dados.csv').delete_conversation(conversation_id):
+            return False, f"Erro ao deletar conversa {conversation_id}"
         
         return True, f"Conversa {conversation_id} deletada com sucesso!"
     except Exception as e:
         return False, f"Erro ao deletar conversa: {str(e)}"
 
-def obter_resumo_conversas(df):
-    """Obtém um resumo de todas as conversas"""
-    # Obter primeira mensagem de cada conversa
-    primeira_mensagem = df.groupby('conversation_id')['message'].first().reset_index()
-    primeira_mensagem.columns = ['conversation_id', 'primeira_mensagem']
-    
-    resumo = df.groupby('conversation_id').agg({
-        'data': 'first',
-        'message': 'count',
-        'total_tokens': 'sum',
-        'input_cost_usd': 'sum',
-        'output_cost_usd': 'sum'
-    }).reset_index()
+def obter_resumo_conversas():
+    """
+    Obtém um resumo de todas as conversas. O resumo é mantido pelo armazenamento
+    a cada gravação, então o custo depende do número de conversas e não de turnos.
+    """
+    try:
+        resumo = get_storage('dados.csv').get_conversation_summary()
+    except Exception as e:
+        st.error(f"Erro ao carregar arquivo: {e}")
+        return None
     
-    # Juntar com primeira mensagem
-    resumo = resumo.merge(primeira_mensagem, on='conversation_id')
+    # Mesma ordem da lista anterior (agrupada por conversation_id)
+    resumo = resumo.sort_values('conversation_id', key=lambda ids: ids.astype(str)).reset_index(drop=True)
     
-    resumo.columns = ['conversation_id', 'Data', 'Num. Mensagens', 'Total Tokens', 'Custo Input (USD)', 'Custo Output (USD)', 'Primeira Mensagem']
+    resumo = resumo.rename(columns={
+        'data': 'Data',
+        'num_messages': 'Num. Mensagens',
+        'total_tokens': 'Total Tokens',
+        'input_cost_usd': 'Custo Input (USD)',
+        'output_cost_usd': 'Custo Output (USD)',
+        'first_message': 'Primeira Mensagem',
+    })
     resumo['Custo Total (USD)'] = resumo['Custo Input (USD)'] + resumo['Custo Output (USD)']
     resumo['Data'] = resumo['Data'].apply(formatar_data)
     
     # Truncar primeira mensagem se muito longa
     resumo['Primeira Mensagem'] = resumo['Primeira Mensagem'].apply(
-        lambda x: x[:100] + '...' if len(x) > 100 else x
+        lambda x: x[:100] + '...' if isinstance(x, str) and len(x) > 100 else x
     )
     
     return resumo
 
-def exibir_conversa(df, conversation_id):
+def exibir_conversa(conversation_id):
     """Exibe as mensagens de uma conversa específica"""
-    conversa = df[df['conversation_id'] == conversation_id].sort_index()
+    conversa = carregar_conversa(conversation_id)
     
     # Cabeçalho com título e botão de deletar
     col_titulo, col_deletar = st.columns([3, 1])
@@ -103,6 +102,16 @@ def exibir_conversa(df, conversation_id):
         data_primeira = conversa['data'].iloc[0]
         st.metric("Data", formatar_data(data_primeira))
     
+    # Cache de prompt (turnos salvos antes da contagem não entram no cálculo)
+    if 'cached_tokens' in conversa.columns and 'uncached_tokens' in conversa.columns:
+        cache = conversa[['cached_tokens', 'uncached_tokens']].dropna()
+        tokens_entrada = cache['cached_tokens'].sum() + cache['uncached_tokens'].sum()
+        if tokens_entrada > 0:
+            st.caption(
+                f"💾 Cache de prompt: {cache['cached_tokens'].sum() / tokens_entrada:.0%} dos tokens de entrada "
+                f"({int(cache['cached_tokens'].sum())} de {int(tokens_entrada)}) em {len(cache)} turnos"
+            )
+    
     st.markdown("---")
     
     # Exibir mensagens
@@ -124,8 +133,12 @@ def exibir_conversa(df, conversation_id):
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.write(f"**Tokens:** {int(row['total_tokens'])}")
+                if row.get('cached_response') in (True, 'True'):
+                    st.write("⚡ Resposta do cache local (sem custo)")
             with col2:
                 st.write(f"**Custo Input:** ${row['input_cost_usd']:.6f}")
+                if pd.notna(row.get('cached_tokens')):
+                    st.write(f"**Tokens em cache:** {int(row['cached_tokens'])}")
             with col3:
                 st.write(f"**Custo Output:** ${row['output_cost_usd']:.6f}")
 
@@ -137,18 +150,15 @@ st.markdown("---")
 if 'dados_atualizados' not in st.session_state:
     st.session_state.dados_atualizados = False
 
-df = carregar_conversas()
+resumo = obter_resumo_conversas()
 
-if df is not None and not df.empty:
+if resumo is not None and not resumo.empty:
     # Criar abas
     tab1, tab2 = st.tabs(["📋 Lista de Conversas", "💬 Visualizar Conversa"])
     
     with tab1:
         st.subheader("Todas as Conversas Salvas")
         
-        # Obter resumo
-        resumo = obter_resumo_conversas(df)
-        
         # Exibir estatísticas gerais
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -277,19 +287,20 @@ if df is not None and not df.empty:
             st.markdown("---")
         
         # Lista de IDs de conversas
-        conversation_ids = df['conversation_id'].unique().tolist()
+        conversation_ids = resumo['conversation_id'].tolist()
         conversation_ids.sort(reverse=True)  # Mais recentes primeiro
+        datas_conversas = dict(zip(resumo['conversation_id'], resumo['Data']))
         
         # Selectbox para escolher a conversa
         selected_id = st.selectbox(
             "Escolha o ID da conversa:",
             options=conversation_ids,
-            format_func=lambda x: f"{x} ({formatar_data(df[df['conversation_id']==x]['data'].iloc[0])})"
+            format_func=lambda x: f"{x} ({datas_conversas[x]})"
         )
         
         if selected_id:
             st.markdown("---")
-            exibir_conversa(df, selected_id)
+            exibir_conversa(selected_id)
 
 else:
     st.warning("⚠️ Nenhuma conversa encontrada no arquivo dados.csv")
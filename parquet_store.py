@@ -0,0 +1,452 @@
+import glob
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from conversation_summary import SOURCE_COLUMNS, ConversationSummary
+from csv_reader import GerenciadorCSV, file_lock, filter_frame, resolve_data_path
+
+
+class GerenciadorParquet:
+    """
+    Manager for records kept as a columnar archive. New records are appended
+    to a small CSV hot segment; once it grows past `hot_max_rows` it is
+    rotated and compacted into an immutable Parquet segment by a background
+    thread, so writers are never blocked by compaction. Exposes the same
+    interface as GerenciadorCSV.
+
+    Several processes can share an archive: segment numbers are allocated,
+    and segments rotated, compacted or rewritten, only while holding a lock
+    file in the archive directory.
+    """
+
+    HOT_FILE = 'hot.csv'
+    LOCK_FILE = 'archive.lock'
+    SEGMENT_PATTERN = re.compile(r'^(segment|compacting)-(\d+)\.(parquet|csv)$')
+
+    def __init__(self, file_path: str, hot_max_rows: int = 5000):
+        """
+        Initialize manager with the archive directory. If only a name is
+        provided, the directory will be created under a `data/` folder next
+        to this module.
+
+        Args:
+            file_path: directory name or full path for the archive
+            hot_max_rows: number of rows in the hot segment that triggers
+                a background compaction
+        """
+        self.file_path = resolve_data_path(file_path)
+        os.makedirs(self.file_path, exist_ok=True)
+
+        self.hot_max_rows = hot_max_rows
+        self._lock = threading.RLock()
+        # Held while a segment is compacted; writers only take _lock, while
+        # rewrites take this one first so they never race a compaction
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        # Row counts of rotated hot segments waiting for compaction
+        self._compacting_counts: Dict[str, int] = {}
+        # Per-conversation aggregates, built on first request and kept up to date on save
+        self._summary: Optional[ConversationSummary] = None
+
+        self._hot = GerenciadorCSV(os.path.join(self.file_path, self.HOT_FILE))
+
+        # Resume compactions interrupted by a previous shutdown
+        if any(path.endswith('.csv') for _, path in self._list_segments()):
+            self._start_compaction()
+
+    def _list_segments(self) -> List[tuple]:
+        """
+        Return (seq, path) for every immutable or compacting segment in order.
+        A Parquet segment wins over the CSV it was compacted from.
+        """
+        segments = {}
+        for path in glob.glob(os.path.join(self.file_path, '*-*.*')):
+            match = self.SEGMENT_PATTERN.match(os.path.basename(path))
+            if not match:
+                continue
+            seq = int(match.group(2))
+            if match.group(3) == 'parquet' or seq not in segments:
+                segments[seq] = path
+        return sorted(segments.items())
+
+    def _archive_lock(self):
+        """
+        Hold the cross-process lock of the archive. Take it before _lock; it
+        also serializes the threads of this process.
+        """
+        return file_lock(os.path.join(self.file_path, self.LOCK_FILE))
+
+    def _new_seq(self) -> int:
+        """
+        Return the next free segment number, re-scanning the directory so
+        segments created by other processes are seen. Callers hold the
+        archive lock until the segment file exists.
+        """
+        return max([seq for seq, _ in self._list_segments()], default=0) + 1
+
+    def refresh(self) -> bool:
+        """
+        Reload changes other processes made to the hot segment. Segments are
+        listed on every read, so they need no refresh.
+
+        Returns:
+            True when data was reloaded
+        """
+        with self._lock:
+            if not self._hot.refresh():
+                return False
+            self._summary = None
+            return True
+
+    def _segment_columns(self, path: str) -> List[str]:
+        """Return the column names stored in a segment."""
+        if path.endswith('.parquet'):
+            return list(pq.read_schema(path, memory_map=True).names)
+        return list(pd.read_csv(path, nrows=0).columns)
+
+    def _read_segment(self, path: str, columns: Optional[List[str]] = None,
+                      filter_criteria: Optional[Dict] = None) -> pd.DataFrame:
+        """Read a segment, projecting columns and pushing equality filters down."""
+        available = self._segment_columns(path)
+        criteria = [(key, value) for key, value in (filter_criteria or {}).items() if key in available]
+        wanted = None
+        if columns is not None:
+            wanted = [column for column in available if column in columns or column in dict(criteria)]
+
+        if path.endswith('.parquet'):
+            filters = [(key, '==', value) for key, value in criteria] or None
+            try:
+                frame = pq.read_table(path, columns=wanted, filters=filters, memory_map=True).to_pandas()
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, TypeError):
+                # Value type does not match the stored column, filter in pandas
+                frame = pq.read_table(path, columns=wanted, memory_map=True).to_pandas()
+        else:
+            frame = pd.read_csv(path, usecols=wanted)
+
+        for key, value in criteria:
+            frame = frame[frame[key] == value]
+        if columns is not None:
+            frame = frame[[column for column in columns if column in frame.columns]]
+        return frame
+
+    @staticmethod
+    def _write_segment(frame: pd.DataFrame, path: str):
+        """Atomically write a segment in the format given by its extension."""
+        if path.endswith('.parquet'):
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path + '.tmp')
+        else:
+            frame.to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    def _read(self, columns: Optional[List[str]] = None, filter_criteria: Optional[Dict] = None) -> pd.DataFrame:
+        """Read every segment plus the hot segment into a single DataFrame."""
+        for _ in range(3):
+            with self._lock:
+                segments = [path for _, path in self._list_segments()]
+                hot = self._hot.search_data(filter_criteria) if filter_criteria else None
+                hot_frame = pd.DataFrame(hot) if hot is not None else self._hot.data_frame
+            try:
+                parts = [self._read_segment(path, columns, filter_criteria) for path in segments]
+                break
+            except FileNotFoundError:
+                # A compaction replaced a segment while reading, take a new snapshot
+                continue
+        else:
+            raise RuntimeError("Archive kept changing while reading")
+
+        if columns is not None and not hot_frame.empty:
+            hot_frame = hot_frame[[column for column in columns if column in hot_frame.columns]]
+        parts.append(hot_frame)
+
+        parts = [part for part in parts if not part.empty]
+        if not parts:
+            return pd.DataFrame(columns=columns) if columns is not None else pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def _rotate_hot(self):
+        """Move the hot segment aside for compaction and start a new one."""
+        with self._archive_lock(), self._lock:
+            # No writer can append to the hot segment while it is renamed
+            with self._hot._file_lock():
+                self._hot.refresh()
+                count = self._hot.get_records_count()
+                if count == 0:
+                    return
+
+                compacting_path = os.path.join(self.file_path, f"compacting-{self._new_seq():08d}.csv")
+                os.replace(self._hot.file_path, compacting_path)
+            self._compacting_counts[compacting_path] = count
+            self._hot = GerenciadorCSV(os.path.join(self.file_path, self.HOT_FILE))
+
+        self._start_compaction()
+
+    def _start_compaction(self):
+        """Start the background compaction thread if it is not running."""
+        with self._lock:
+            if self._compaction_thread is not None:
+                return
+            self._compaction_thread = threading.Thread(target=self._compact_pending, daemon=True)
+            self._compaction_thread.start()
+
+    def _compact_pending(self):
+        """Convert every rotated CSV segment into an immutable Parquet segment."""
+        while True:
+            with self._lock:
+                pending = [path for _, path in self._list_segments() if path.endswith('.csv')]
+                if not pending:
+                    self._compaction_thread = None
+                    return
+
+            for csv_path in pending:
+                parquet_path = csv_path.replace('compacting-', 'segment-')[:-len('.csv')] + '.parquet'
+                try:
+                    with self._compaction_lock, self._archive_lock():
+                        if not os.path.exists(csv_path):
+                            # Removed by a rewrite or compacted by another process
+                            continue
+                        frame = pd.read_csv(csv_path)
+                        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), parquet_path + '.tmp')
+                        with self._lock:
+                            os.replace(parquet_path + '.tmp', parquet_path)
+                            os.remove(csv_path)
+                            self._compacting_counts.pop(csv_path, None)
+                except Exception as e:
+                    print(f"Error compacting segment {csv_path}: {e}")
+                    with self._lock:
+                        self._compaction_thread = None
+                    return
+
+    def _wait_compaction(self):
+        """Block until the background compaction has finished."""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join()
+
+    def _rewrite(self, frame: pd.DataFrame) -> bool:
+        """
+        Replace the whole archive with a single segment holding `frame`.
+        Callers must hold _compaction_lock, the archive lock and _lock.
+        """
+        old_segments = [path for _, path in self._list_segments()]
+
+        if not frame.empty:
+            self._write_segment(frame, os.path.join(self.file_path, f"segment-{self._new_seq():08d}.parquet"))
+
+        for path in old_segments:
+            os.remove(path)
+        with self._hot._file_lock():
+            if os.path.exists(self._hot.file_path):
+                os.remove(self._hot.file_path)
+        self._hot = GerenciadorCSV(os.path.join(self.file_path, self.HOT_FILE))
+        self._compacting_counts.clear()
+        self._summary = None
+        return True
+
+    def compact(self, wait: bool = True):
+        """Force compaction of the hot segment, optionally waiting for it."""
+        self._rotate_hot()
+        if wait:
+            self._wait_compaction()
+
+    def get_data(self) -> List[Dict]:
+        """Return all records as a list of dictionaries."""
+        try:
+            return self._read().to_dict('records')
+        except Exception as e:
+            print(f"Error reading data: {e}")
+            return []
+
+    def get_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Return all records as a DataFrame, reading only `columns` when given.
+        Parquet segments are memory-mapped and only the requested columns are
+        decoded.
+        """
+        try:
+            return self._read(columns)
+        except Exception as e:
+            print(f"Error reading data: {e}")
+            return pd.DataFrame()
+
+    def iter_chunks(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                    filter_criteria: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Yield matching records as DataFrames of at most `chunksize` rows,
+        limited to `columns` when given. Parquet segments are decoded one
+        record batch at a time, reading only the needed columns.
+        """
+        for _ in range(3):
+            with self._lock:
+                try:
+                    # Open every segment now so compactions and rewrites that
+                    # remove files while the caller iterates do not affect it
+                    sources = []
+                    for _, path in self._list_segments():
+                        if path.endswith('.parquet'):
+                            sources.append(pq.ParquetFile(path, memory_map=True))
+                        else:
+                            # Rotated hot segments are small, read them now
+                            sources.append([self._read_segment(path, columns, filter_criteria)])
+                    sources.append(list(self._hot.iter_chunks(chunksize, columns, filter_criteria)))
+                    break
+                except FileNotFoundError:
+                    continue
+        else:
+            raise RuntimeError("Archive kept changing while reading")
+
+        for source in sources:
+            if isinstance(source, list):
+                yield from (chunk for chunk in source if not chunk.empty)
+                continue
+
+            wanted = None
+            if columns is not None:
+                needed = set(columns) | set(filter_criteria or {})
+                wanted = [column for column in source.schema_arrow.names if column in needed]
+            for batch in source.iter_batches(batch_size=chunksize, columns=wanted):
+                chunk = filter_frame(batch.to_pandas(), columns, filter_criteria)
+                if not chunk.empty:
+                    yield chunk
+
+    def iter_records(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                     filter_criteria: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield matching records one dictionary at a time, converting a chunk at a time."""
+        for chunk in self.iter_chunks(chunksize, columns, filter_criteria):
+            yield from chunk.to_dict('records')
+
+    def save_data(self, data: Dict) -> bool:
+        """Append a single record to the hot segment."""
+        return self.save_multiple_data([data])
+
+    def save_multiple_data(self, data_list: List[Dict]) -> bool:
+        """Append multiple records to the hot segment."""
+        try:
+            with self._lock:
+                if not self._hot.save_multiple_data(list(data_list)):
+                    return False
+                if self._summary is not None:
+                    self._summary.add_records(data_list)
+                needs_rotation = self._hot.get_records_count() >= self.hot_max_rows
+            if needs_rotation:
+                self._rotate_hot()
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def update_data(self, index: int, data: Dict) -> bool:
+        """Update a record at a given index, rewriting the archive."""
+        try:
+            with self._compaction_lock, self._archive_lock(), self._lock:
+                self._hot.refresh()
+                frame = self._read()
+                if index < 0 or index >= len(frame):
+                    print(f"Index {index} out of range")
+                    return False
+
+                for key, value in data.items():
+                    frame.at[index, key] = value
+                return self._rewrite(frame)
+        except Exception as e:
+            print(f"Error updating data: {e}")
+            return False
+
+    def delete_data(self, index: int) -> bool:
+        """Delete the record at the specified index, rewriting the archive."""
+        try:
+            with self._compaction_lock, self._archive_lock(), self._lock:
+                self._hot.refresh()
+                frame = self._read()
+                if index < 0 or index >= len(frame):
+                    print(f"Index {index} out of range")
+                    return False
+
+                return self._rewrite(frame.drop(index).reset_index(drop=True))
+        except Exception as e:
+            print(f"Error deleting data: {e}")
+            return False
+
+    def delete_conversation(self, conversation_id) -> bool:
+        """Delete every record of a conversation, rewriting only the segments that hold it."""
+        try:
+            with self._compaction_lock, self._archive_lock(), self._lock:
+                for _, path in self._list_segments():
+                    if self._read_segment(path, ['conversation_id'], {'conversation_id': conversation_id}).empty:
+                        continue
+                    frame = self._read_segment(path)
+                    frame = frame[frame['conversation_id'] != conversation_id]
+                    if frame.empty:
+                        os.remove(path)
+                        self._compacting_counts.pop(path, None)
+                    else:
+                        self._write_segment(frame, path)
+                        self._compacting_counts[path] = len(frame)
+                if self._summary is not None:
+                    self._summary.remove(conversation_id)
+                return self._hot.delete_conversation(conversation_id)
+        except Exception as e:
+            print(f"Error deleting conversation: {e}")
+            return False
+
+    def search_data(self, filter_criteria: Dict) -> List[Dict]:
+        """Return records matching all key/value pairs in filter_criteria."""
+        try:
+            return self._read(filter_criteria=filter_criteria).to_dict('records')
+        except Exception as e:
+            print(f"Error searching data: {e}")
+            return []
+
+    def clear_data(self) -> bool:
+        """Remove all segments and records."""
+        try:
+            with self._compaction_lock, self._archive_lock(), self._lock:
+                return self._rewrite(pd.DataFrame())
+        except Exception as e:
+            print(f"Error clearing data: {e}")
+            return False
+
+    def get_conversation_summary(self) -> pd.DataFrame:
+        """
+        Return one row per conversation with its first timestamp, turn count,
+        token and cost sums and first message.
+        """
+        with self._lock:
+            if self._summary is None:
+                self._summary = ConversationSummary.from_dataframe(self._read(SOURCE_COLUMNS))
+            return self._summary.to_dataframe()
+
+    def get_records_count(self) -> int:
+        """Return number of records, using Parquet metadata for compacted segments."""
+        with self._lock:
+            count = self._hot.get_records_count()
+            for _, path in self._list_segments():
+                if path.endswith('.parquet'):
+                    count += pq.read_metadata(path).num_rows
+                else:
+                    if path not in self._compacting_counts:
+                        self._compacting_counts[path] = len(pd.read_csv(path, usecols=[0]))
+                    count += self._compacting_counts[path]
+            return count
+
+    def get_columns(self) -> List[str]:
+        """Return a list with the column names across all segments."""
+        with self._lock:
+            columns = []
+            for _, path in self._list_segments():
+                for column in self._segment_columns(path):
+                    if column not in columns:
+                        columns.append(column)
+            for column in self._hot.get_columns():
+                if column not in columns:
+                    columns.append(column)
+            return columns
+
+    def close(self):
+        """Wait for pending compactions to finish."""
+        self._wait_compaction()
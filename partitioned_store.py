@@ -0,0 +1,484 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from conversation_summary import ConversationSummary
+from csv_reader import GerenciadorCSV, file_lock, iter_csv_chunks, resolve_data_path
+
+
+class GerenciadorParticionado:
+    """
+    Manager for records split into hash partitions of conversation_id. Each
+    partition is a CSV handled by its own GerenciadorCSV, so lookups and
+    deletes of one conversation only open one partition. A JSON manifest
+    lists every conversation with its partition and its summary (first
+    timestamp, record count, token and cost sums, first message); writes
+    append their change to a manifest log that is periodically compacted
+    into the manifest snapshot.
+    Exposes the same interface as GerenciadorCSV; positional indexes follow
+    partition order.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    # Manifest log entries folded into a new snapshot at a time
+    COMPACT_EVERY = 1000
+
+    def __init__(self, file_path: str, num_partitions: int = 16):
+        """
+        Initialize manager with the partition directory. If only a name is
+        provided, the directory will be created under a `data/` folder next
+        to this module.
+
+        Args:
+            file_path: directory name or full path for the partitions
+            num_partitions: number of hash buckets for new directories; an
+                existing manifest keeps its own partition count
+        """
+        self.file_path = resolve_data_path(file_path)
+        os.makedirs(self.file_path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._partitions: Dict[int, GerenciadorCSV] = {}
+        self._manifest_path = os.path.join(self.file_path, self.MANIFEST_FILE)
+        self._manifest_version = None
+        # Bytes and entries of the manifest log already applied
+        self._log_offset = 0
+        self._log_lines = 0
+        self._manifest = {'num_partitions': num_partitions, 'columns': [], 'conversations': {}}
+        self._load_manifest()
+        self.num_partitions = self._manifest['num_partitions']
+
+    def _key(self, conversation_id) -> str:
+        """Return the manifest key of a conversation id."""
+        return ConversationSummary.key(conversation_id)
+
+    def _partition_of(self, conversation_id) -> int:
+        """Return the partition number holding a conversation."""
+        return zlib.crc32(self._key(conversation_id).encode('utf-8')) % self.num_partitions
+
+    def _partition(self, number: int) -> GerenciadorCSV:
+        """Return the store of a partition, loading it on first use."""
+        with self._lock:
+            store = self._partitions.get(number)
+            if store is None:
+                store = self._partitions[number] = GerenciadorCSV(
+                    os.path.join(self.file_path, f"part-{number:04d}.csv")
+                )
+            else:
+                store.refresh()
+            return store
+
+    def _existing_partitions(self) -> List[int]:
+        """Return the numbers of partitions that have a file on disk."""
+        return [
+            number for number in range(self.num_partitions)
+            if os.path.exists(os.path.join(self.file_path, f"part-{number:04d}.csv"))
+        ]
+
+    def _log_path(self) -> Optional[str]:
+        """Return the manifest log that follows the current snapshot."""
+        name = self._manifest.get('log')
+        return os.path.join(self.file_path, name) if name else None
+
+    def _load_manifest(self):
+        """Catch up with changes other instances or processes made to the manifest."""
+        try:
+            # The snapshot is always replaced atomically, so the inode changes on every compaction
+            stat = os.stat(self._manifest_path)
+        except OSError:
+            return
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version != self._manifest_version:
+            with open(self._manifest_path, 'r', encoding='utf-8') as file:
+                self._manifest = json.load(file)
+            self._manifest_version = version
+            self._log_offset = 0
+            self._log_lines = 0
+        self._read_log()
+
+    def _read_log(self):
+        """Apply the complete lines appended to the manifest log since the last read."""
+        path = self._log_path()
+        if path is None:
+            return
+        try:
+            with open(path, 'rb') as file:
+                file.seek(self._log_offset)
+                data = file.read()
+        except FileNotFoundError:
+            # Compacted by another process: the next read sees the new snapshot
+            return
+        # A writer may be in the middle of a line
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            self._apply_change(json.loads(line))
+            self._log_lines += 1
+        self._log_offset += end
+
+    def _apply_change(self, change: Dict):
+        """Apply one manifest log entry to the in-memory manifest."""
+        if change.get('clear'):
+            self._manifest['conversations'] = {}
+            self._manifest['columns'] = []
+        for key, entry in change.get('set', {}).items():
+            if entry is None:
+                self._manifest['conversations'].pop(key, None)
+            else:
+                self._manifest['conversations'][key] = entry
+        for column in change.get('columns', []):
+            if column not in self._manifest['columns']:
+                self._manifest['columns'].append(column)
+
+    def _compact_manifest(self):
+        """
+        Write the whole manifest as a new snapshot followed by an empty log,
+        and remove the previous log. Caller holds the manifest lock.
+        """
+        old_log = self._log_path()
+        self._manifest['generation'] = self._manifest.get('generation', 0) + 1
+        self._manifest['log'] = f"manifest-{self._manifest['generation']:06d}.log"
+        open(self._log_path(), 'w').close()
+
+        fd, temp_path = tempfile.mkstemp(dir=self.file_path, prefix='.manifest', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(self._manifest, file, ensure_ascii=False)
+        os.replace(temp_path, self._manifest_path)
+        stat = os.stat(self._manifest_path)
+        self._manifest_version = (stat.st_ino, stat.st_mtime_ns)
+        self._log_offset = 0
+        self._log_lines = 0
+
+        if old_log and os.path.exists(old_log):
+            os.remove(old_log)
+
+    def _update_manifest(self, change):
+        """
+        Record a manifest change under a cross-process lock. `change(manifest)`
+        returns the log entry ({'set': {key: entry or None}, 'columns': [...],
+        'clear': True}) computed from the up-to-date manifest. The entry is
+        appended to the manifest log, so a turn costs one short line instead
+        of rewriting every conversation; the log is folded into the snapshot
+        every COMPACT_EVERY entries.
+        """
+        with self._lock, file_lock(self._manifest_path + '.lock'):
+            self._load_manifest()
+            if self._log_path() is None:
+                # Manifest written before the log existed (or not written yet)
+                self._compact_manifest()
+
+            entry = change(self._manifest)
+            if entry.get('columns'):
+                entry['columns'] = [
+                    column for column in dict.fromkeys(entry['columns']) if column not in self._manifest['columns']
+                ]
+            entry = {name: value for name, value in entry.items() if value}
+            if not entry:
+                return
+
+            line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+            with open(self._log_path(), 'ab') as file:
+                file.write(line)
+            self._apply_change(entry)
+            self._log_offset += len(line)
+            self._log_lines += 1
+
+            if self._log_lines >= self.COMPACT_EVERY:
+                self._compact_manifest()
+
+    def _count_in_manifest(self, records: List[Dict]):
+        """Return a manifest change adding `records` to their conversations."""
+        def change(manifest):
+            keys = {self._key(record.get('conversation_id')) for record in records}
+            entries = {key: dict(manifest['conversations'][key]) for key in keys if key in manifest['conversations']}
+            ConversationSummary(entries).add_records(records)
+            for record in records:
+                conversation_id = record.get('conversation_id')
+                entries[self._key(conversation_id)]['partition'] = self._partition_of(conversation_id)
+            columns = [key for record in records for key in record.keys()]
+            return {'set': entries, 'columns': columns}
+        return change
+
+    def _recount_conversations(self, conversation_ids):
+        """Recompute manifest entries of the given conversations from their partitions."""
+        entries = {}
+        for conversation_id in conversation_ids:
+            records = self._partition(self._partition_of(conversation_id)).search_data(
+                {'conversation_id': conversation_id}
+            )
+            entry = ConversationSummary.from_records(records).get(conversation_id)
+            if entry is not None:
+                entry['partition'] = self._partition_of(conversation_id)
+            entries[self._key(conversation_id)] = entry
+
+        self._update_manifest(lambda manifest: {'set': entries})
+
+    def _locate(self, index: int):
+        """Return (partition store, index inside it) for a global positional index."""
+        if index < 0:
+            return None, None
+        for number in self._existing_partitions():
+            store = self._partition(number)
+            count = store.get_records_count()
+            if index < count:
+                return store, index
+            index -= count
+        return None, None
+
+    def list_conversations(self) -> List[Dict]:
+        """Return the manifest entry (partition and summary) of every conversation."""
+        with self._lock:
+            self._load_manifest()
+            return [dict(entry) for entry in self._manifest['conversations'].values()]
+
+    def get_conversation_summary(self) -> pd.DataFrame:
+        """
+        Return one row per conversation with its first timestamp, turn count,
+        token and cost sums and first message, read from the manifest.
+        """
+        with self._lock:
+            self._load_manifest()
+            return ConversationSummary(self._manifest['conversations']).to_dataframe()
+
+    def refresh(self) -> bool:
+        """Reload the manifest if it changed on disk."""
+        with self._lock:
+            previous = (self._manifest_version, self._log_offset)
+            self._load_manifest()
+            return (self._manifest_version, self._log_offset) != previous
+
+    def get_data(self) -> List[Dict]:
+        """Return all records as a list of dictionaries."""
+        data = []
+        for number in self._existing_partitions():
+            data.extend(self._partition(number).get_data())
+        return data
+
+    def get_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Return all records as a DataFrame, limited to `columns` when given."""
+        frames = [self._partition(number).get_dataframe(columns=columns) for number in self._existing_partitions()]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns) if columns is not None else pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_chunks(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                    filter_criteria: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Yield matching records as DataFrames of at most `chunksize` rows,
+        limited to `columns` when given. Partition files are streamed from
+        disk without being loaded, and a conversation_id criterion restricts
+        the scan to one partition.
+        """
+        filter_criteria = filter_criteria or {}
+        if 'conversation_id' in filter_criteria:
+            numbers = [self._partition_of(filter_criteria['conversation_id'])]
+        else:
+            numbers = self._existing_partitions()
+
+        for number in numbers:
+            path = os.path.join(self.file_path, f"part-{number:04d}.csv")
+            yield from iter_csv_chunks(path, chunksize, columns, filter_criteria)
+
+    def iter_records(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                     filter_criteria: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield matching records one dictionary at a time, converting a chunk at a time."""
+        for chunk in self.iter_chunks(chunksize, columns, filter_criteria):
+            yield from chunk.to_dict('records')
+
+    def save_data(self, data: Dict) -> bool:
+        """Save a single record into the partition of its conversation."""
+        return self.save_multiple_data([data])
+
+    def save_multiple_data(self, data_list: List[Dict]) -> bool:
+        """Save multiple records, grouped by partition."""
+        try:
+            groups: Dict[int, List[Dict]] = {}
+            for record in data_list:
+                groups.setdefault(self._partition_of(record.get('conversation_id')), []).append(record)
+
+            saved = []
+            for number, records in groups.items():
+                if not self._partition(number).save_multiple_data(records):
+                    break
+                saved.extend(records)
+
+            if saved:
+                self._update_manifest(self._count_in_manifest(saved))
+            return len(saved) == len(data_list)
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def update_data(self, index: int, data: Dict) -> bool:
+        """Update a record at a given (partition order) index."""
+        try:
+            with self._lock:
+                store, local_index = self._locate(index)
+                if store is None:
+                    print(f"Index {index} out of range")
+                    return False
+
+                record = store.get_dataframe().iloc[local_index].to_dict()
+                old_id = record.get('conversation_id')
+                record.update(data)
+                new_id = record.get('conversation_id')
+
+                if self._partition_of(new_id) == self._partition_of(old_id):
+                    if not store.update_data(local_index, data):
+                        return False
+                else:
+                    # The record moves to the partition of its new conversation
+                    if not store.delete_data(local_index):
+                        return False
+                    if not self._partition(self._partition_of(new_id)).save_data(record):
+                        return False
+
+                self._recount_conversations([old_id, new_id])
+                self._update_manifest(lambda manifest: {'columns': list(data.keys())})
+                return True
+        except Exception as e:
+            print(f"Error updating data: {e}")
+            return False
+
+    def delete_data(self, index: int) -> bool:
+        """Delete the record at the specified (partition order) index."""
+        try:
+            with self._lock:
+                store, local_index = self._locate(index)
+                if store is None:
+                    print(f"Index {index} out of range")
+                    return False
+
+                conversation_id = store.get_dataframe(columns=['conversation_id']).iloc[local_index].get('conversation_id')
+                if not store.delete_data(local_index):
+                    return False
+                self._recount_conversations([conversation_id])
+                return True
+        except Exception as e:
+            print(f"Error deleting data: {e}")
+            return False
+
+    def delete_conversation(self, conversation_id) -> bool:
+        """Delete every record of a conversation, touching only its partition."""
+        try:
+            with self._lock:
+                if not self._partition(self._partition_of(conversation_id)).delete_conversation(conversation_id):
+                    return False
+                self._update_manifest(lambda manifest: {'set': {self._key(conversation_id): None}})
+                return True
+        except Exception as e:
+            print(f"Error deleting conversation: {e}")
+            return False
+
+    def search_data(self, filter_criteria: Dict) -> List[Dict]:
+        """
+        Return records matching all key/value pairs in filter_criteria. A
+        conversation_id criterion restricts the search to one partition.
+        """
+        try:
+            if 'conversation_id' in filter_criteria:
+                numbers = [self._partition_of(filter_criteria['conversation_id'])]
+            else:
+                numbers = self._existing_partitions()
+
+            results = []
+            for number in numbers:
+                results.extend(self._partition(number).search_data(filter_criteria))
+            return results
+        except Exception as e:
+            print(f"Error searching data: {e}")
+            return []
+
+    def clear_data(self) -> bool:
+        """Clear every partition and the manifest."""
+        try:
+            with self._lock:
+                for number in self._existing_partitions():
+                    if not self._partition(number).clear_data():
+                        return False
+
+                self._update_manifest(lambda manifest: {'clear': True})
+                return True
+        except Exception as e:
+            print(f"Error clearing data: {e}")
+            return False
+
+    def get_records_count(self) -> int:
+        """Return number of records, read from the manifest."""
+        with self._lock:
+            self._load_manifest()
+            return sum(entry['num_messages'] for entry in self._manifest['conversations'].values())
+
+    def get_columns(self) -> List[str]:
+        """Return the column names, read from the manifest."""
+        with self._lock:
+            self._load_manifest()
+            return list(self._manifest['columns'])
+
+    def rebuild_manifest(self):
+        """Recompute the manifest by scanning every partition."""
+        conversations = {}
+        columns = []
+        for number in self._existing_partitions():
+            frame = self._partition(number).get_dataframe()
+            for column in frame.columns:
+                if column not in columns:
+                    columns.append(column)
+            for key, entry in ConversationSummary.from_dataframe(frame).entries.items():
+                entry['partition'] = number
+                conversations[key] = entry
+
+        with self._lock, file_lock(self._manifest_path + '.lock'):
+            self._manifest['conversations'] = conversations
+            self._manifest['columns'] = columns
+            self._compact_manifest()
+
+    def import_csv(self, csv_path: str, chunksize: int = 50_000) -> int:
+        """
+        Bulk import an existing CSV file (e.g. data/dados.csv).
+
+        Returns:
+            Number of imported records
+        """
+        imported = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            records = chunk.to_dict('records')
+            if not self.save_multiple_data(records):
+                raise RuntimeError(f"Failed to import rows {imported}-{imported + len(records)}")
+            imported += len(records)
+        return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned storage tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help="import an existing CSV into a partition directory")
+    migrate.add_argument('csv_path', help="CSV to import, e.g. data/dados.csv")
+    migrate.add_argument('target', help="target directory, e.g. data/dados.parts")
+    migrate.add_argument('--partitions', type=int, default=16)
+    migrate.add_argument('--chunksize', type=int, default=50_000)
+
+    rebuild = subparsers.add_parser('rebuild-manifest', help="recompute the manifest from the partitions")
+    rebuild.add_argument('target', help="partition directory, e.g. data/dados.parts")
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        store = GerenciadorParticionado(args.target, num_partitions=args.partitions)
+        count = store.import_csv(args.csv_path, chunksize=args.chunksize)
+        print(f"Imported {count} records from {args.csv_path} into {store.file_path}")
+    elif args.command == 'rebuild-manifest':
+        store = GerenciadorParticionado(args.target)
+        store.rebuild_manifest()
+        print(f"Manifest rebuilt: {store.get_records_count()} records")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+DEFAULT_DIR = 'profiles'
+QUERY_PARAM = 'profile'
+TRUTHY = ('1', 'true', 'yes', 'on')
+
+# Guards against profiling the re-executed script a second time
+_state = threading.local()
+
+# tracemalloc is process-wide: it runs while at least one profile is active
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def enabled(query_params=None) -> bool:
+    """
+    Return True when the current script run should be profiled: PROFILING is
+    set to a truthy value, or the page URL has ?profile=1.
+    """
+    if getattr(_state, 'active', False):
+        return False
+    if os.environ.get('PROFILING', '').strip().lower() in TRUTHY:
+        return True
+    if query_params is None:
+        return False
+    return str(query_params.get(QUERY_PARAM, '')).strip().lower() in TRUTHY
+
+
+def profiles_dir() -> str:
+    """
+    Return the directory profiles are saved to: PROFILING_DIR as a path or a
+    folder name inside data/ (default data/profiles).
+    """
+    from csv_reader import resolve_data_path
+    return resolve_data_path(os.environ.get('PROFILING_DIR') or DEFAULT_DIR)
+
+
+def top_count() -> int:
+    """Number of functions and allocation sites kept (PROFILING_TOP, default 25)."""
+    return int(os.environ.get('PROFILING_TOP', 25))
+
+
+def _start_tracing() -> Optional[tracemalloc.Snapshot]:
+    """Start tracemalloc, or return a baseline snapshot if it is already tracing."""
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users += 1
+        if tracemalloc.is_tracing():
+            return tracemalloc.take_snapshot()
+        tracemalloc.start()
+        return None
+
+
+def _stop_tracing(baseline: Optional[tracemalloc.Snapshot]):
+    """Return (allocation statistics, peak bytes) and stop tracing if no other profile needs it."""
+    global _tracing_users
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        if baseline is not None:
+            stats = snapshot.compare_to(baseline, 'lineno')
+        else:
+            stats = snapshot.statistics('lineno')
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+    return stats, peak
+
+
+class Profile:
+    """
+    Context manager that records a block with cProfile and tracemalloc and
+    saves the results to the profiles directory:
+
+    - <name>.prof: raw cProfile stats (pstats, snakeviz)
+    - <name>.txt: top functions by cumulative time and top allocation sites
+
+    The allocation sites are the memory still allocated when the block ends,
+    grouped by source line. When another profile is already tracing, only
+    the growth during this block is counted and the peak is process-wide.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None, top: Optional[int] = None):
+        self.name = name
+        self.directory = directory or profiles_dir()
+        self.top = top or top_count()
+        self.started_at = datetime.now()
+        self.duration_ms = 0.0
+        self.peak_kb = 0.0
+        self.functions: List[Dict] = []
+        self.allocations: List[Dict] = []
+        self.path: Optional[str] = None
+        self.interrupted = False
+        self._profiler = cProfile.Profile()
+
+    def __enter__(self):
+        self._baseline = _start_tracing()
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._profiler.disable()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        allocations, peak = _stop_tracing(self._baseline)
+        # Streamlit ends a run early with an exception (st.rerun, st.stop)
+        self.interrupted = exc_type is not None
+        self.peak_kb = peak / 1024
+        self.functions = self._top_functions()
+        growth = self._baseline is not None
+        self.allocations = [
+            {
+                'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_kb': (stat.size_diff if growth else stat.size) / 1024,
+                'count': stat.count_diff if growth else stat.count,
+            }
+            for stat in allocations[:self.top]
+        ]
+        self.save()
+        return False
+
+    def _top_functions(self) -> List[Dict]:
+        """Return the top functions by cumulative time."""
+        stats = pstats.Stats(self._profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [
+            {
+                'function': function,
+                'location': f"{filename}:{line}",
+                'calls': calls,
+                'tottime_ms': tottime * 1000,
+                'cumtime_ms': cumtime * 1000,
+            }
+            for (filename, line, function), (_, calls, tottime, cumtime, _) in rows[:self.top]
+        ]
+
+    def report(self) -> str:
+        """Return the text report saved next to the raw stats."""
+        output = io.StringIO()
+        status = ' (interrupted by rerun/stop)' if self.interrupted else ''
+        output.write(f"{self.name} at {self.started_at.isoformat()}: "
+                     f"{self.duration_ms:.1f} ms, peak {self.peak_kb:.0f} KB{status}\n\n")
+        pstats.Stats(self._profiler, stream=output).sort_stats('cumulative').print_stats(self.top)
+        output.write(f"Top {self.top} allocation sites (live at the end of the run)\n")
+        for allocation in self.allocations:
+            output.write(f"{allocation['size_kb']:>12.1f} KB {allocation['count']:>8} blocks  {allocation['site']}\n")
+        return output.getvalue()
+
+    def save(self) -> bool:
+        """Write the .prof and .txt files."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, f"{self.started_at:%Y%m%d_%H%M%S_%f}_{self.name}")
+            self._profiler.dump_stats(base + '.prof')
+            with open(base + '.txt', 'w', encoding='utf-8') as file:
+                file.write(self.report())
+            self.path = base + '.txt'
+            return True
+        except Exception as e:
+            print(f"Error saving profile: {e}")
+            return False
+
+
+def run_script(path: str, namespace: Dict, name: Optional[str] = None) -> Profile:
+    """
+    Execute a script file again inside a Profile, in the given namespace.
+
+    Streamlit pages call this from their first lines, so the whole run of the
+    page is measured; enabled() returns False during the nested run, so the
+    page then runs normally. Exceptions (including Streamlit's rerun and
+    stop) propagate after the profile is saved.
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding='utf-8') as file:
+        code = compile(file.read(), path, 'exec')
+    profile = Profile(name)
+    _state.active = True
+    try:
+        with profile:
+            exec(code, namespace)
+    finally:
+        _state.active = False
+    return profile
+
+
+def show_summary(profile: Profile, key: str = 'profile_summary'):
+    """Render a sidebar toggle that shows the profile of this run in the page."""
+    import streamlit as st
+
+    with st.sidebar:
+        st.markdown("---")
+        st.caption(f"🔬 Execução perfilada: {profile.duration_ms:.0f} ms, pico de {profile.peak_kb:.0f} KB")
+        if profile.path:
+            st.caption(f"Salvo em {profile.path}")
+        show = st.toggle("Mostrar resumo do perfil", key=key)
+    if not show:
+        return
+
+    st.markdown("---")
+    st.subheader("🔬 Perfil desta execução")
+    st.markdown("**Funções com maior tempo acumulado**")
+    st.dataframe(profile.functions, use_container_width=True, hide_index=True)
+    st.markdown("**Linhas com mais memória alocada**")
+    st.dataframe(profile.allocations, use_container_width=True, hide_index=True)
@@ -0,0 +1,274 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import openai
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Default quotas (requests and tokens per minute) of the models in the
+# ConversationContext pricing table; the limiter adapts to the real quota
+# reported by the x-ratelimit-* response headers
+RATE_LIMITS = {
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200_000},
+    "gpt-4o": {"rpm": 500, "tpm": 30_000},
+    "gpt-3.5-turbo": {"rpm": 3_500, "tpm": 200_000},
+    "gpt-4": {"rpm": 500, "tpm": 10_000},
+}
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Completion tokens reserved per request before the real usage is known
+ESTIMATED_COMPLETION_TOKENS = 300
+
+# Errors worth retrying: quota, network and server-side failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a reset duration such as '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `capacity` units per minute.
+    Callers reserve units up front and wait for the returned delay, so
+    concurrent callers queue in arrival order instead of racing.
+    """
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.available = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Units refilled per second."""
+        return self.capacity / 60.0
+
+    def _refill(self, now: float):
+        """Add the units accumulated since the last update. Caller holds the lock."""
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` units and return the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # A single request larger than the bucket still goes through once it is full
+            self.available -= min(amount, self.capacity)
+            wait = max(self._blocked_until - now, 0.0)
+            if self.available < 0:
+                wait = max(wait, -self.available / self.rate)
+            return wait
+
+    def update(self, limit: Optional[float] = None, remaining: Optional[float] = None,
+               reset: Optional[float] = None):
+        """Adapt the bucket to the quota reported by the server."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit and limit != self.capacity:
+                self.available += limit - self.capacity
+                self.capacity = float(limit)
+            if remaining is not None and remaining < self.available:
+                self.available = float(remaining)
+            if remaining == 0 and reset:
+                self._blocked_until = max(self._blocked_until, now + reset)
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by every
+    conversation using the same model in this process.
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waited_seconds = 0.0
+        self.retries = 0
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Reserve one request and `estimated_tokens` tokens, returning the wait in seconds."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        self.waited_seconds += wait
+        return wait
+
+    def acquire(self, estimated_tokens: int):
+        """Block until a request of `estimated_tokens` tokens fits in the quota."""
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, estimated_tokens: int):
+        """Async variant of acquire."""
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """Adapt both buckets to the x-ratelimit-* headers of a response."""
+        if headers is None:
+            return
+
+        def number(name):
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        self.requests.update(
+            limit=number('x-ratelimit-limit-requests'),
+            remaining=number('x-ratelimit-remaining-requests'),
+            reset=parse_duration(headers.get('x-ratelimit-reset-requests')),
+        )
+        self.tokens.update(
+            limit=number('x-ratelimit-limit-tokens'),
+            remaining=number('x-ratelimit-remaining-tokens'),
+            reset=parse_duration(headers.get('x-ratelimit-reset-tokens')),
+        )
+
+    def pause(self, seconds: float):
+        """Hold every caller sharing this limiter for `seconds`."""
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
+
+    def stats(self) -> Dict:
+        """Return the current quota state and counters."""
+        return {
+            'rpm': self.requests.capacity,
+            'tpm': self.tokens.capacity,
+            'requests_available': self.requests.available,
+            'tokens_available': self.tokens.available,
+            'waited_seconds': self.waited_seconds,
+            'retries': self.retries,
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """
+    Return the process-wide limiter of a model. Unknown models use the
+    gpt-4o-mini quota; OPENAI_RPM and OPENAI_TPM override the defaults.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limits = RATE_LIMITS.get(model, RATE_LIMITS[DEFAULT_MODEL])
+            limiter = _limiters[model] = RateLimiter(
+                rpm=float(os.environ.get('OPENAI_RPM') or limits['rpm']),
+                tpm=float(os.environ.get('OPENAI_TPM') or limits['tpm']),
+            )
+        return limiter
+
+
+def max_retries() -> int:
+    """Number of retries after a failed request (OPENAI_MAX_RETRIES, default 5)."""
+    return int(os.environ.get('OPENAI_MAX_RETRIES', 5))
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Return how long to wait before retrying: the server's retry-after hint
+    when present, otherwise exponential backoff with full jitter.
+    """
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    if headers.get('retry-after-ms'):
+        return float(headers['retry-after-ms']) / 1000
+    hint = parse_duration(headers.get('retry-after'))
+    if hint is not None:
+        return hint
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+
+
+def _on_error(limiter: RateLimiter, error: Exception, attempt: int, retries: int) -> float:
+    """Record a failed attempt and return the delay before the next one, or raise."""
+    if not isinstance(error, RETRYABLE_ERRORS) or attempt >= retries:
+        raise error
+
+    delay = retry_delay(error, attempt)
+    limiter.retries += 1
+    if isinstance(error, openai.RateLimitError):
+        # Hold every session sharing the quota, not only this one
+        limiter.update_from_headers(error.response.headers)
+        limiter.pause(delay)
+    print(f"OpenAI request failed ({type(error).__name__}), retry {attempt + 1}/{retries} in {delay:.2f}s")
+    return delay
+
+
+def call_with_retry(request: Callable, limiter: RateLimiter, estimated_tokens: int,
+                    retries: Optional[int] = None):
+    """
+    Run `request` (a with_raw_response call) inside the rate limit, retrying
+    retryable errors with backoff. Returns the parsed response.
+    """
+    retries = max_retries() if retries is None else retries
+    attempt = 0
+    while True:
+        limiter.acquire(estimated_tokens)
+        try:
+            raw = request()
+        except Exception as error:
+            time.sleep(_on_error(limiter, error, attempt, retries))
+            attempt += 1
+            continue
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
+
+
+async def call_with_retry_async(request: Callable, limiter: RateLimiter, estimated_tokens: int,
+                                retries: Optional[int] = None):
+    """Async variant of call_with_retry; `request` returns an awaitable."""
+    retries = max_retries() if retries is None else retries
+    attempt = 0
+    while True:
+        await limiter.acquire_async(estimated_tokens)
+        try:
+            raw = await request()
+        except Exception as error:
+            await asyncio.sleep(_on_error(limiter, error, attempt, retries))
+            attempt += 1
+            continue
+        limiter.update_from_headers(raw.headers)
+        # with_raw_response parses synchronously on the async client as well
+        return raw.parse()
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from csv_reader import resolve_data_path
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+
+class ResponseCache:
+    """
+    Cache of chat completion responses keyed by a hash of the model and the
+    messages sent. Entries live in an in-memory LRU tier and in an on-disk
+    tier (one JSON file per entry) shared by processes using the same
+    directory. Both tiers expire entries after `ttl` seconds; the disk tier
+    evicts least recently used files once it grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256,
+                 max_bytes: int = 50 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        """
+        Args:
+            directory: on-disk tier location (None keeps the cache in memory only)
+            max_entries: entries kept in the in-memory tier
+            max_bytes: size limit of the on-disk tier
+            ttl: seconds an entry stays valid
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._memory: OrderedDict = OrderedDict()
+        self._disk_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, messages: List[Dict]) -> str:
+        """Return the cache key of a request."""
+        payload = json.dumps({'model': model, 'messages': messages}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Return the file of an entry in the on-disk tier."""
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _remember(self, key: str, expires_at: float, value: Dict):
+        """Store an entry in the in-memory tier. Caller holds the lock."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        """Return (expires_at, value) from the on-disk tier, removing expired entries."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('expires_at', 0) <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['expires_at'], entry['value']
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached value of `key`, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        entry = self._read_disk(key) if self.directory else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, *entry)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Dict):
+        """Cache a JSON-serializable value under `key`."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+        if not self.directory:
+            return
+
+        try:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps({'expires_at': expires_at, 'value': value}, ensure_ascii=False).encode('utf-8')
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error writing response cache entry: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            if self._disk_bytes is None or self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Drop files unused for longer than the TTL, then least recently used
+        ones until the on-disk tier fits in max_bytes. Caller holds the lock.
+        """
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.max_bytes and mtime + self.ttl > now:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self.directory:
+                max_bytes, self.max_bytes = self.max_bytes, -1
+                self._evict()
+                self.max_bytes = max_bytes
+
+    def stats(self) -> Dict:
+        """Return hit and miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide response cache when RESPONSE_CACHE is enabled,
+    otherwise None.
+
+    Configured by RESPONSE_CACHE_DIR (default data/response_cache),
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_MB and RESPONSE_CACHE_TTL
+    (seconds).
+    """
+    global _shared_cache
+    if os.environ.get('RESPONSE_CACHE', '').strip().lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                directory=resolve_data_path(os.environ.get('RESPONSE_CACHE_DIR') or 'response_cache'),
+                max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256)),
+                max_bytes=int(float(os.environ.get('RESPONSE_CACHE_MAX_MB', 50)) * 1024 * 1024),
+                ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 7 * 24 * 3600)),
+            )
+        return _shared_cache
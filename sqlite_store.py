@@ -0,0 +1,441 @@
+import argparse
+import math
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from conversation_summary import SOURCE_COLUMNS, SUMMARY_FIELDS
+from csv_reader import resolve_data_path
+
+
+def _summary_key(column: str) -> str:
+    """
+    SQL expression of the summary key of a conversation_id column: the id as
+    text, with missing ids grouped under '' as in ConversationSummary.key.
+    """
+    return f"COALESCE(CAST({column} AS TEXT), '')"
+
+
+class GerenciadorSQLite:
+    """
+    Manager for records stored in a local SQLite database. Exposes the same
+    interface as GerenciadorCSV, but saves are single-row inserts and
+    lookups by conversation_id or data use indexes.
+    """
+
+    TABLE = 'records'
+    SUMMARY_TABLE = 'conversation_summary'
+
+    SUMMARY_TRIGGERS = ['trg_summary_insert', 'trg_summary_delete', 'trg_summary_update']
+
+    # Aggregates of conversations, used to (re)build their summary rows; callers
+    # add a WHERE on the key and GROUP BY SUMMARY_GROUP
+    SUMMARY_GROUP = _summary_key('r.conversation_id')
+    SUMMARY_SELECT = f"""
+        SELECT {SUMMARY_GROUP},
+               (SELECT f.data FROM {TABLE} f WHERE {_summary_key('f.conversation_id')} = {SUMMARY_GROUP}
+                ORDER BY f.row_id LIMIT 1),
+               COUNT(*),
+               COALESCE(SUM(r.total_tokens), 0),
+               COALESCE(SUM(r.input_cost_usd), 0),
+               COALESCE(SUM(r.output_cost_usd), 0),
+               (SELECT f.message FROM {TABLE} f WHERE {_summary_key('f.conversation_id')} = {SUMMARY_GROUP}
+                ORDER BY f.row_id LIMIT 1)
+        FROM {TABLE} r
+    """
+
+    def __init__(self, file_path: str, index_columns: Optional[List[str]] = None):
+        """
+        Initialize manager with the database path. If only a filename is
+        provided, the file will be created under a `data/` folder next to
+        this module.
+
+        Args:
+            file_path: filename or full path for the SQLite database
+            index_columns: columns that get a SQL index (defaults to
+                ['conversation_id', 'data'])
+        """
+        self.file_path = resolve_data_path(file_path)
+
+        self.index_columns = list(index_columns) if index_columns is not None else ['conversation_id', 'data']
+        self._lock = threading.RLock()
+        self._columns: List[str] = []
+
+        # Autocommit mode; multi-statement writes open explicit transactions
+        self._connection = sqlite3.connect(self.file_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        """Quote an identifier for use in SQL statements."""
+        return '"' + str(name).replace('"', '""') + '"'
+
+    @staticmethod
+    def _to_sql_value(value):
+        """Convert pandas/numpy scalars to values sqlite3 can bind."""
+        if value is None:
+            return None
+        if hasattr(value, 'item'):
+            value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return value
+
+    def _create_schema(self):
+        """Create the records table, its indexes and the summary table if they do not exist."""
+        columns = list(SOURCE_COLUMNS)
+        for column in self.index_columns:
+            if column not in columns:
+                columns.append(column)
+
+        with self._lock:
+            column_sql = ', '.join(self._quote(column) for column in columns)
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} (row_id INTEGER PRIMARY KEY AUTOINCREMENT, {column_sql})"
+            )
+            self._refresh_columns()
+            self._ensure_columns(columns)
+            for column in self.index_columns:
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self._quote('idx_' + self.TABLE + '_' + column)} "
+                    f"ON {self.TABLE} ({self._quote(column)})"
+                )
+            self._create_summary()
+
+    def _create_summary(self):
+        """
+        Create the per-conversation summary table, kept up to date by triggers
+        on every insert, update and delete, and backfill it on first use.
+
+        Records without a conversation_id share one summary row keyed '', as
+        in the CSV summary. A summary table from an earlier version, whose key
+        was untyped and nullable, is dropped and rebuilt.
+        """
+        table, summary, group = self.TABLE, self.SUMMARY_TABLE, self.SUMMARY_GROUP
+        old_key, new_key = _summary_key('OLD.conversation_id'), _summary_key('NEW.conversation_id')
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            key_column = next((row for row in self._connection.execute(f"PRAGMA table_info({summary})")
+                               if row[1] == 'conversation_id'), None)
+            if key_column is not None and key_column[2].upper() == 'TEXT' and key_column[3]:
+                self._connection.execute('COMMIT')
+                return
+
+            for trigger in self.SUMMARY_TRIGGERS:
+                self._connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self._connection.execute(f"DROP TABLE IF EXISTS {summary}")
+            for statement in [
+                f"""CREATE TABLE {summary} (
+                    conversation_id TEXT NOT NULL PRIMARY KEY, data, num_messages INTEGER,
+                    total_tokens, input_cost_usd, output_cost_usd, first_message
+                )""",
+                # Lets the summary queries look up a conversation by its key
+                f"""CREATE INDEX IF NOT EXISTS {self._quote('idx_' + table + '_summary_key')}
+                    ON {table} ({_summary_key('conversation_id')})""",
+                f"""CREATE TRIGGER trg_summary_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {summary}
+                    VALUES ({new_key}, NEW.data, 1, COALESCE(NEW.total_tokens, 0),
+                            COALESCE(NEW.input_cost_usd, 0), COALESCE(NEW.output_cost_usd, 0), NEW.message)
+                    ON CONFLICT(conversation_id) DO UPDATE SET
+                        num_messages = num_messages + 1,
+                        total_tokens = total_tokens + excluded.total_tokens,
+                        input_cost_usd = input_cost_usd + excluded.input_cost_usd,
+                        output_cost_usd = output_cost_usd + excluded.output_cost_usd;
+                END""",
+                f"""CREATE TRIGGER trg_summary_delete AFTER DELETE ON {table} BEGIN
+                    DELETE FROM {summary} WHERE conversation_id = {old_key};
+                    INSERT INTO {summary}
+                    {self.SUMMARY_SELECT} WHERE {group} = {old_key} GROUP BY {group};
+                END""",
+                f"""CREATE TRIGGER trg_summary_update AFTER UPDATE ON {table} BEGIN
+                    DELETE FROM {summary} WHERE conversation_id IN ({old_key}, {new_key});
+                    INSERT INTO {summary}
+                    {self.SUMMARY_SELECT} WHERE {group} IN ({old_key}, {new_key}) GROUP BY {group};
+                END""",
+                f"INSERT INTO {summary} {self.SUMMARY_SELECT} GROUP BY {group}",
+            ]:
+                self._connection.execute(statement)
+            self._connection.execute('COMMIT')
+        except Exception:
+            self._connection.execute('ROLLBACK')
+            raise
+
+    def _refresh_columns(self):
+        """Reload the list of data columns from the table definition."""
+        rows = self._connection.execute(f"PRAGMA table_info({self.TABLE})").fetchall()
+        self._columns = [row[1] for row in rows if row[1] != 'row_id']
+
+    def _ensure_columns(self, keys):
+        """Add columns that are not in the table yet."""
+        for key in keys:
+            if key in self._columns:
+                continue
+            try:
+                self._connection.execute(f"ALTER TABLE {self.TABLE} ADD COLUMN {self._quote(key)}")
+            except sqlite3.OperationalError:
+                # Another process may have added the column concurrently
+                pass
+            self._refresh_columns()
+
+    def _row_id_at(self, index: int) -> Optional[int]:
+        """Return the row_id of the record at a positional index."""
+        if index < 0:
+            return None
+        row = self._connection.execute(
+            f"SELECT row_id FROM {self.TABLE} ORDER BY row_id LIMIT 1 OFFSET ?", (index,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _insert(self, records: List[Dict]):
+        """Insert records using the union of their keys as the column list."""
+        keys = list(dict.fromkeys(key for record in records for key in record))
+        self._ensure_columns(keys)
+
+        column_sql = ', '.join(self._quote(key) for key in keys)
+        placeholders = ', '.join('?' for _ in keys)
+        self._connection.executemany(
+            f"INSERT INTO {self.TABLE} ({column_sql}) VALUES ({placeholders})",
+            [[self._to_sql_value(record.get(key)) for key in keys] for record in records],
+        )
+
+    def _select(self, where: str = '', params=()) -> List[Dict]:
+        """Run a SELECT over all data columns and return dictionaries."""
+        column_sql = ', '.join(self._quote(column) for column in self._columns)
+        cursor = self._connection.execute(
+            f"SELECT {column_sql} FROM {self.TABLE} {where} ORDER BY row_id", params
+        )
+        return [dict(zip(self._columns, row)) for row in cursor.fetchall()]
+
+    def get_data(self) -> List[Dict]:
+        """Return all records as a list of dictionaries."""
+        try:
+            with self._lock:
+                self._refresh_columns()
+                return self._select()
+        except Exception as e:
+            print(f"Error reading data: {e}")
+            return []
+
+    def get_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Return all records as a DataFrame, selecting only `columns` when given."""
+        try:
+            with self._lock:
+                self._refresh_columns()
+                selected = self._columns if columns is None else [column for column in columns if column in self._columns]
+                column_sql = ', '.join(self._quote(column) for column in selected)
+                return pd.read_sql_query(
+                    f"SELECT {column_sql} FROM {self.TABLE} ORDER BY row_id", self._connection
+                )
+        except Exception as e:
+            print(f"Error reading data: {e}")
+            return pd.DataFrame()
+
+    def iter_chunks(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                    filter_criteria: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Yield matching records as DataFrames of at most `chunksize` rows,
+        selecting only `columns` when given. Filters become a WHERE clause
+        and rows are fetched incrementally through a separate connection, so
+        writers are not blocked while the caller iterates.
+        """
+        with self._lock:
+            self._refresh_columns()
+            selected = self._columns if columns is None else [column for column in columns if column in self._columns]
+            criteria = [(key, value) for key, value in (filter_criteria or {}).items() if key in self._columns]
+        if not selected:
+            return
+
+        column_sql = ', '.join(self._quote(column) for column in selected)
+        where = ''
+        if criteria:
+            where = 'WHERE ' + ' AND '.join(f"{self._quote(key)} = ?" for key, _ in criteria)
+        params = [self._to_sql_value(value) for _, value in criteria]
+
+        # WAL gives the SELECT a consistent snapshot for its whole duration
+        connection = sqlite3.connect(self.file_path, timeout=30, check_same_thread=False)
+        try:
+            for chunk in pd.read_sql_query(
+                f"SELECT {column_sql} FROM {self.TABLE} {where} ORDER BY row_id",
+                connection, params=params, chunksize=chunksize,
+            ):
+                if not chunk.empty:
+                    yield chunk
+        finally:
+            connection.close()
+
+    def iter_records(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                     filter_criteria: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield matching records one dictionary at a time, converting a chunk at a time."""
+        for chunk in self.iter_chunks(chunksize, columns, filter_criteria):
+            yield from chunk.to_dict('records')
+
+    def save_data(self, data: Dict) -> bool:
+        """Insert a single record (dictionary)."""
+        try:
+            with self._lock:
+                self._insert([data])
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def save_multiple_data(self, data_list: List[Dict]) -> bool:
+        """Insert multiple records (list of dicts) in a single transaction."""
+        try:
+            with self._lock:
+                self._connection.execute('BEGIN IMMEDIATE')
+                try:
+                    if data_list:
+                        self._insert(list(data_list))
+                    self._connection.execute('COMMIT')
+                except Exception:
+                    self._connection.execute('ROLLBACK')
+                    raise
+            return True
+        except Exception as e:
+            print(f"Error saving multiple data: {e}")
+            return False
+
+    def update_data(self, index: int, data: Dict) -> bool:
+        """Update a record at a given index with the provided dictionary."""
+        try:
+            with self._lock:
+                row_id = self._row_id_at(index)
+                if row_id is None:
+                    print(f"Index {index} out of range")
+                    return False
+
+                self._ensure_columns(data.keys())
+                assignments = ', '.join(f"{self._quote(key)} = ?" for key in data)
+                self._connection.execute(
+                    f"UPDATE {self.TABLE} SET {assignments} WHERE row_id = ?",
+                    [self._to_sql_value(value) for value in data.values()] + [row_id],
+                )
+            return True
+        except Exception as e:
+            print(f"Error updating data: {e}")
+            return False
+
+    def delete_data(self, index: int) -> bool:
+        """Delete the record at the specified index."""
+        try:
+            with self._lock:
+                row_id = self._row_id_at(index)
+                if row_id is None:
+                    print(f"Index {index} out of range")
+                    return False
+
+                self._connection.execute(f"DELETE FROM {self.TABLE} WHERE row_id = ?", (row_id,))
+            return True
+        except Exception as e:
+            print(f"Error deleting data: {e}")
+            return False
+
+    def delete_conversation(self, conversation_id) -> bool:
+        """Delete every record of a conversation."""
+        try:
+            with self._lock:
+                self._connection.execute(
+                    f"DELETE FROM {self.TABLE} WHERE conversation_id = ?", (self._to_sql_value(conversation_id),)
+                )
+            return True
+        except Exception as e:
+            print(f"Error deleting conversation: {e}")
+            return False
+
+    def search_data(self, filter_criteria: Dict) -> List[Dict]:
+        """Return records matching all key/value pairs in filter_criteria."""
+        try:
+            with self._lock:
+                self._refresh_columns()
+                criteria = [(key, value) for key, value in filter_criteria.items() if key in self._columns]
+                where = ''
+                if criteria:
+                    where = 'WHERE ' + ' AND '.join(f"{self._quote(key)} = ?" for key, _ in criteria)
+                return self._select(where, [self._to_sql_value(value) for _, value in criteria])
+        except Exception as e:
+            print(f"Error searching data: {e}")
+            return []
+
+    def clear_data(self) -> bool:
+        """Remove all records."""
+        try:
+            with self._lock:
+                self._connection.execute(f"DELETE FROM {self.TABLE}")
+            return True
+        except Exception as e:
+            print(f"Error clearing data: {e}")
+            return False
+
+    def get_conversation_summary(self) -> pd.DataFrame:
+        """
+        Return one row per conversation with its first timestamp, turn count,
+        token and cost sums and first message.
+        """
+        try:
+            with self._lock:
+                return pd.read_sql_query(f"SELECT * FROM {self.SUMMARY_TABLE}", self._connection)[SUMMARY_FIELDS]
+        except Exception as e:
+            print(f"Error reading conversation summary: {e}")
+            return pd.DataFrame(columns=SUMMARY_FIELDS)
+
+    def get_records_count(self) -> int:
+        """Return number of records in the database."""
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def get_columns(self) -> List[str]:
+        """Return a list with the data column names."""
+        with self._lock:
+            self._refresh_columns()
+            return list(self._columns)
+
+    def import_csv(self, csv_path: str, chunksize: int = 50_000) -> int:
+        """
+        Bulk import an existing CSV file (e.g. data/dados.csv).
+
+        Args:
+            csv_path: path of the CSV to import
+            chunksize: number of rows inserted per transaction
+
+        Returns:
+            Number of imported records
+        """
+        imported = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            records = chunk.to_dict('records')
+            if not self.save_multiple_data(records):
+                raise RuntimeError(f"Failed to import rows {imported}-{imported + len(records)}")
+            imported += len(records)
+        return imported
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite storage tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help="import an existing CSV into a SQLite database")
+    migrate.add_argument('csv_path', help="CSV to import, e.g. data/dados.csv")
+    migrate.add_argument('db_path', help="target database, e.g. data/dados.db")
+    migrate.add_argument('--chunksize', type=int, default=50_000)
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        store = GerenciadorSQLite(args.db_path)
+        count = store.import_csv(args.csv_path, chunksize=args.chunksize)
+        store.close()
+        print(f"Imported {count} records from {args.csv_path} into {store.file_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import importlib
+import os
+import threading
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from csv_reader import resolve_data_path
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Storage engines selectable through the STORAGE_BACKEND setting, as
+# ("module:Class", extension); a backend's module is imported only when selected
+STORAGE_BACKENDS = {
+    'csv': ('csv_reader:GerenciadorCSV', '.csv'),
+    'sqlite': ('sqlite_store:GerenciadorSQLite', '.db'),
+    # Directory with a CSV hot segment and compacted Parquet segments (pyarrow)
+    'parquet': ('parquet_store:GerenciadorParquet', ''),
+    # Directory with one CSV per hash bucket of conversation_id and a manifest
+    'partitioned': ('partitioned_store:GerenciadorParticionado', '.parts'),
+}
+
+DEFAULT_BACKEND = 'csv'
+
+# Process-wide stores shared by every session, keyed by (backend, absolute path)
+_shared_stores = {}
+_shared_stores_lock = threading.Lock()
+
+
+def _env_flag(name: str) -> bool:
+    """Return True when an environment variable is set to a truthy value."""
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def load_backend(name: str) -> Tuple[type, str]:
+    """
+    Import a storage backend and return (store class, file extension).
+
+    Args:
+        name: a name from STORAGE_BACKENDS or a "module:Class" reference to a
+            store outside the registry (extension '')
+    """
+    target, extension = STORAGE_BACKENDS.get(name, (name, ''))
+    if ':' not in target:
+        raise ValueError(f"Unknown storage backend '{name}'. Options: {', '.join(STORAGE_BACKENDS)}")
+    module, class_name = target.split(':', 1)
+    return getattr(importlib.import_module(module), class_name), extension
+
+
+def _create_store(store_class, path: str):
+    """Instantiate a store, wrapping it for write-behind when configured."""
+    store = store_class(path)
+    if _env_flag('STORAGE_WRITE_BEHIND'):
+        from write_behind import GerenciadorWriteBehind
+        store = GerenciadorWriteBehind(
+            store,
+            batch_size=int(os.environ.get('STORAGE_WRITE_BEHIND_BATCH', 50)),
+            flush_interval=float(os.environ.get('STORAGE_WRITE_BEHIND_INTERVAL', 1.0)),
+            max_pending=int(os.environ.get('STORAGE_WRITE_BEHIND_MAX_PENDING', 1000)),
+            max_retries=int(os.environ.get('STORAGE_WRITE_BEHIND_MAX_RETRIES', 5)),
+        )
+    return store
+
+
+def get_storage(file_path: str = 'dados.csv', backend: Optional[str] = None, shared: bool = True):
+    """
+    Return the conversation store selected by configuration.
+
+    Shared stores are created once per path and process, so every Streamlit
+    session reuses the same loaded data. Before being returned, a shared
+    store picks up changes other processes made to its file.
+
+    With STORAGE_WRITE_BEHIND enabled, the store is wrapped in a
+    GerenciadorWriteBehind that persists turns in background batches
+    (STORAGE_WRITE_BEHIND_BATCH records or STORAGE_WRITE_BEHIND_INTERVAL
+    seconds, whichever comes first).
+
+    Args:
+        file_path: filename or path of the store; the extension is replaced
+            by the one used by the selected backend
+        backend: backend name, defaults to the STORAGE_BACKEND environment
+            variable (csv, sqlite, parquet or partitioned)
+        shared: when False, a new private store instance is created
+
+    Returns:
+        A store exposing the GerenciadorCSV interface
+    """
+    backend = (backend or os.environ.get('STORAGE_BACKEND') or DEFAULT_BACKEND).lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'. Options: {', '.join(STORAGE_BACKENDS)}")
+
+    store_class, extension = load_backend(backend)
+    path = resolve_data_path(os.path.splitext(file_path)[0] + extension)
+    if not shared:
+        return _create_store(store_class, path)
+
+    key = (backend, os.path.abspath(path))
+    with _shared_stores_lock:
+        store = _shared_stores.get(key)
+        if store is None:
+            store = _shared_stores[key] = _create_store(store_class, path)
+
+    if hasattr(store, 'refresh'):
+        store.refresh()
+    return store
@@ -0,0 +1,288 @@
+import atexit
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from conversation_summary import ConversationSummary
+
+
+class GerenciadorWriteBehind:
+    """
+    Write-behind wrapper around a store with the GerenciadorCSV interface.
+    Saves are queued in memory and written in batches by a background thread
+    through `save_multiple_data`. Reads merge the queued records, so callers
+    always see their own writes.
+    """
+
+    def __init__(self, store, batch_size: int = 50, flush_interval: float = 1.0, max_pending: int = 1000,
+                 max_retries: int = 5):
+        """
+        Args:
+            store: wrapped store (GerenciadorCSV, GerenciadorSQLite, ...)
+            batch_size: number of queued records that triggers a flush
+            flush_interval: maximum seconds a record waits in the queue
+            max_pending: queue bound; saves block while it is full
+            max_retries: consecutive failed writes after which flushing gives
+                up (records stay queued) until the next flush() call
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.max_retries = max(max_retries, 1)
+
+        self._condition = threading.Condition()
+        # Held while the store is written or read, so a batch is never
+        # visible twice (queued and stored) or missing from a read
+        self._store_lock = threading.RLock()
+        self._pending: List[Dict] = []
+        self._flushing: List[Dict] = []
+        self._oldest_pending: Optional[float] = None
+        self._flush_requested = False
+        self._closed = False
+        # Consecutive failed batch writes
+        self._failures = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __getattr__(self, name):
+        # Anything not overridden (file_path, refresh, compact, ...) goes to the store
+        return getattr(self.store, name)
+
+    def _run(self):
+        """Background loop flushing the queue by size or age."""
+        while True:
+            with self._condition:
+                while not self._closed and not self._flush_due():
+                    timeout = None
+                    if self._oldest_pending is not None:
+                        timeout = max(0.0, self._oldest_pending + self.flush_interval - time.monotonic())
+                    self._condition.wait(timeout)
+
+                if self._closed:
+                    return
+                self._take_batch()
+
+            self._write_batch()
+
+    def _flush_due(self) -> bool:
+        """Return True when the queue must be written now."""
+        if not self._pending:
+            return False
+        if self._flush_requested:
+            return True
+        if self._failures >= self.max_retries:
+            return False
+        if len(self._pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self._oldest_pending >= self.flush_interval
+
+    def _take_batch(self):
+        """Move queued records to the in-flight batch. Caller holds the condition."""
+        self._flushing = self._pending
+        self._pending = []
+        self._oldest_pending = None
+        self._flush_requested = False
+
+    def _write_batch(self) -> bool:
+        """Write the in-flight batch, putting it back in the queue on failure."""
+        # The batch leaves _flushing in the same critical section that writes
+        # it, so readers never see it both stored and queued
+        with self._store_lock:
+            saved = self.store.save_multiple_data(self._flushing) if self._flushing else True
+
+            with self._condition:
+                if saved:
+                    self._failures = 0
+                else:
+                    self._failures += 1
+                    if self._failures >= self.max_retries:
+                        print(f"Error flushing {len(self._flushing)} queued records, giving up after "
+                              f"{self._failures} attempts (records stay queued)")
+                    else:
+                        print(f"Error flushing {len(self._flushing)} queued records, retrying")
+                    self._pending = self._flushing + self._pending
+                    self._oldest_pending = time.monotonic()
+                self._flushing = []
+                self._condition.notify_all()
+        return saved
+
+    def _unflushed(self) -> List[Dict]:
+        """Snapshot of records not yet in the store, oldest first."""
+        with self._condition:
+            return self._flushing + self._pending
+
+    def _enqueue(self, records: List[Dict]) -> bool:
+        """Queue records, blocking while the queue is full."""
+        with self._condition:
+            if self._closed:
+                return self.store.save_multiple_data(records)
+
+            for record in records:
+                while len(self._pending) + len(self._flushing) >= self.max_pending:
+                    if self._failures >= self.max_retries:
+                        print("Error saving data: write-behind queue is full and the store keeps failing")
+                        return False
+                    self._flush_requested = True
+                    self._condition.notify_all()
+                    self._condition.wait()
+
+                if self._oldest_pending is None:
+                    self._oldest_pending = time.monotonic()
+                self._pending.append(dict(record))
+
+            self._condition.notify_all()
+        return True
+
+    def flush(self) -> bool:
+        """
+        Block until every queued record has been written to the store.
+        Returns False if the store fails max_retries times in a row.
+        """
+        with self._condition:
+            self._failures = 0
+            while self._pending or self._flushing:
+                if self._failures >= self.max_retries:
+                    return False
+                if self._closed or not self._thread.is_alive():
+                    break
+                self._flush_requested = True
+                self._condition.notify_all()
+                self._condition.wait(self.flush_interval)
+
+            if not self._pending:
+                return True
+
+            # Background thread is gone, write what is left from this thread
+            self._take_batch()
+        return self._write_batch() and not self._unflushed()
+
+    def close(self):
+        """Flush the queue and stop the background thread."""
+        if self._closed:
+            return
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        # Records queued while closing
+        self.flush()
+
+    @staticmethod
+    def _matches(record: Dict, filter_criteria: Dict, columns: List[str]) -> bool:
+        """Apply search_data semantics (unknown columns are ignored) to a queued record."""
+        return all(record.get(key) == value for key, value in filter_criteria.items() if key in columns)
+
+    def save_data(self, data: Dict) -> bool:
+        """Queue a single record."""
+        return self._enqueue([data])
+
+    def save_multiple_data(self, data_list: List[Dict]) -> bool:
+        """Queue multiple records."""
+        return self._enqueue(list(data_list))
+
+    def get_data(self) -> List[Dict]:
+        """Return stored and queued records as a list of dictionaries."""
+        with self._store_lock:
+            return self.store.get_data() + self._unflushed()
+
+    def get_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Return stored and queued records as a DataFrame."""
+        with self._store_lock:
+            frame = self.store.get_dataframe(columns=columns)
+            unflushed = self._unflushed()
+
+        if not unflushed:
+            return frame
+        queued = pd.DataFrame(unflushed)
+        if columns is not None:
+            queued = queued[[column for column in columns if column in queued.columns]]
+        if frame.empty:
+            return queued
+        return pd.concat([frame, queued], ignore_index=True)
+
+    def search_data(self, filter_criteria: Dict) -> List[Dict]:
+        """Return stored and queued records matching filter_criteria."""
+        with self._store_lock:
+            stored = self.store.search_data(filter_criteria)
+            unflushed = self._unflushed()
+
+        columns = self.get_columns()
+        return stored + [record for record in unflushed if self._matches(record, filter_criteria, columns)]
+
+    def iter_chunks(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                    filter_criteria: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """
+        Flush the queue and yield matching records in chunks from the store.
+        Records saved while iterating are not included.
+        """
+        self.flush()
+        yield from self.store.iter_chunks(chunksize, columns, filter_criteria)
+
+    def iter_records(self, chunksize: int = 10_000, columns: Optional[List[str]] = None,
+                     filter_criteria: Optional[Dict] = None) -> Iterator[Dict]:
+        """Flush the queue and yield matching records one dictionary at a time."""
+        for chunk in self.iter_chunks(chunksize, columns, filter_criteria):
+            yield from chunk.to_dict('records')
+
+    def update_data(self, index: int, data: Dict) -> bool:
+        """Flush the queue and update the record at a given index."""
+        self.flush()
+        with self._store_lock:
+            return self.store.update_data(index, data)
+
+    def delete_data(self, index: int) -> bool:
+        """Flush the queue and delete the record at the specified index."""
+        self.flush()
+        with self._store_lock:
+            return self.store.delete_data(index)
+
+    def delete_conversation(self, conversation_id) -> bool:
+        """Flush the queue and delete every record of a conversation."""
+        self.flush()
+        with self._store_lock:
+            return self.store.delete_conversation(conversation_id)
+
+    def clear_data(self) -> bool:
+        """Drop queued records and clear the store."""
+        with self._condition:
+            self._pending = []
+            self._oldest_pending = None
+        self.flush()
+        with self._store_lock:
+            return self.store.clear_data()
+
+    def get_conversation_summary(self) -> pd.DataFrame:
+        """Return the store's conversation summary including queued records."""
+        with self._store_lock:
+            frame = self.store.get_conversation_summary()
+            unflushed = self._unflushed()
+
+        if not unflushed:
+            return frame
+        summary = ConversationSummary({
+            ConversationSummary.key(entry['conversation_id']): entry for entry in frame.to_dict('records')
+        })
+        summary.add_records(unflushed)
+        return summary.to_dataframe()
+
+    def get_records_count(self) -> int:
+        """Return number of stored and queued records."""
+        with self._store_lock:
+            return self.store.get_records_count() + len(self._unflushed())
+
+    def get_columns(self) -> List[str]:
+        """Return the column names of stored and queued records."""
+        with self._store_lock:
+            columns = list(self.store.get_columns())
+            unflushed = self._unflushed()
+        for record in unflushed:
+            for key in record:
+                if key not in columns:
+                    columns.append(key)
+        return columns